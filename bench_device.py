@@ -0,0 +1,195 @@
+"""
+    ----------------------------------------------------------------------------
+    MONITORING LOOP BENCHMARK (ON THE PICO)
+    > Operation:
+        - The device counterpart of benchmark.py: runs the same loop bodies
+          of main.py, soil-moisture-monitor.py and temperature_control.py on
+          the board itself, without the simulator
+        - Times each stage with ticks_us and measures the heap allocated per
+          stage with gc.mem_alloc deltas (gc disabled within a cycle, so a
+          collection cannot hide an allocation)
+        - Leaves out the notify stage: the board is not on WiFi while it runs,
+          benchmark.py measures notify against the simulated APIs
+        - The DHT22 is read at most every 2 s, so after the first cycle the
+          sensor stage reads it from DHTCache; the led stage includes the
+          blink's real sleeps (instant on the simulator's clock)
+        - Needs buni/ and the three scripts on the board's flash
+    > Usage:
+        mpremote run bench_device.py
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import gc
+import sys
+import time
+
+# ===== CONFIGURATION =====
+CYCLES = 20               # timed cycles per configuration
+MEMORY_CYCLES = 10        # cycles measured for allocations
+STAGES = ("sensor", "classify", "format", "led")
+
+# ===== MEASUREMENT =====
+class Stages:
+    """Accumulates time (us) or allocated bytes per stage within one cycle."""
+    def __init__(self, measure_memory=False):
+        self.measure_memory = measure_memory
+        self.current = dict.fromkeys(STAGES, 0)
+        self.totals = dict.fromkeys(STAGES, 0)
+        self.worst = dict.fromkeys(STAGES, 0)
+        self.cycles = 0
+
+    def __call__(self, name, fn, *args):
+        if self.measure_memory:
+            before = gc.mem_alloc()
+            result = fn(*args)
+            self.current[name] += gc.mem_alloc() - before
+            return result
+        t0 = time.ticks_us()
+        result = fn(*args)
+        self.current[name] += time.ticks_diff(time.ticks_us(), t0)
+        return result
+
+    def end_cycle(self):
+        # totals and worst case only: a list of cycles would itself fill the heap
+        for stage in STAGES:
+            self.totals[stage] += self.current[stage]
+            self.worst[stage] = max(self.worst[stage], self.current[stage])
+            self.current[stage] = 0
+        self.cycles += 1
+
+def run(setup, alerts, cycles=CYCLES, memory_cycles=MEMORY_CYCLES):
+    """Benchmark one loop body (from `setup`) with `alerts` alerts firing each cycle."""
+    name, cycle = setup(alerts)
+    timing = Stages()
+    t0 = time.ticks_us()
+    for _ in range(cycles):
+        cycle(timing)
+        timing.end_cycle()
+    total_us = time.ticks_diff(time.ticks_us(), t0)
+
+    memory = Stages(measure_memory=True)
+    try:
+        for _ in range(memory_cycles):
+            gc.collect()
+            gc.disable()
+            cycle(memory)
+            gc.enable()
+            memory.end_cycle()
+    finally:
+        gc.enable()
+
+    print("{:<26} alerts={}  {:>8.0f} cycles/s".format(name, alerts, cycles * 1e6 / total_us))
+    for stage in STAGES:
+        if not timing.totals[stage]:
+            continue
+        print("    {:<9} mean {:>8.1f} us  max {:>8} us  alloc {:>6.0f} B/cycle  max {:>6} B".format(
+            stage, timing.totals[stage] / cycles, timing.worst[stage],
+            memory.totals[stage] / memory_cycles, memory.worst[stage]))
+
+# ===== LOOP BODIES =====
+def _quiet(*args, **kwargs):
+    pass
+
+def _load(name):
+    """A script as a module, with its prints dropped so the serial port does not set the pace."""
+    module = __import__(name)
+    module.print = _quiet
+    return module
+
+def _rules(m, alerts, channels):
+    """
+    The script's rules with the first `alerts` always past their limit and
+    the others never, and the StreamStats they read.
+    """
+    from buni.stats import StreamStats
+    from buni import rules
+    from buni.rules import RuleSet, ABOVE
+    rules.print = _quiet                 # the ALERT line each rule prints when raised
+    forced = []
+    for i, (name, channel, op, limit, hysteresis, severity, hold, unit) in enumerate(m.RULES):
+        fire = i < alerts
+        limit = -10 ** 6 if fire == (op == ABOVE) else 10 ** 6
+        forced.append((name, channel, op, limit, 0, severity, 0, unit))
+    stats = StreamStats(channels)
+    return RuleSet(forced, stats.names), stats
+
+def soil_monitor(alerts):
+    m = _load("soil-moisture-monitor")
+    rules, stats = _rules(m, alerts, m.HISTORY_CHANNELS)
+    led = m.LEDController(m.LED_PIN)
+    dht_sensor = m.DHT22Sensor(m.DHT_PIN)
+    soil = m.SoilMoisture(m.SOIL_ADC_PIN)
+    tds = m.TDSSensor(m.TDS_ADC_PIN)
+    digest = m.AlertDigest(window=0)
+    history = m.History(m.HISTORY_CHANNELS, m.HISTORY_SIZE)
+
+    def cycle(stage):
+        temp, hum = stage("sensor", dht_sensor.read)
+        soil_pct, soil_raw = stage("sensor", soil.read_percent)
+        tds_info = stage("sensor", tds.read_tds, temp if temp is not None else 25.0)
+        stage("sensor", history.append, time.time(), temp, hum, soil_pct, tds_info["tds"])
+        rules.reset()
+        alerting = stage("classify", m.check_alerts, rules, stats, temp, hum, soil_pct, tds_info["tds"], digest)
+        stage("format", m.print_readings, temp, hum, soil_raw, soil_pct, tds_info, soil.spread)
+        if alerting:
+            stage("led", led.blink, 3, 0.15, 0.15)
+        else:
+            stage("led", led.blink, 1, 0.05, 0.05)
+        if digest.due():
+            stage("format", digest.flush_into, m.MESSAGE)
+    return "soil-moisture-monitor.py", cycle
+
+def main_py(alerts):
+    m = _load("main")
+    rules, stats = _rules(m, alerts, m.CHANNELS)
+    led = m.LEDController(m.LED_PIN_NUM)
+    sensors = m.SensorManager(m.DHT_PIN_NUM, m.ADC_PIN_NUM)
+    digest = m.AlertDigest(window=0)
+    history = m.History(m.CHANNELS, m.HISTORY_SIZE)
+
+    def cycle(stage):
+        temp, hum = stage("sensor", sensors.read_dht)
+        tds_val = stage("sensor", sensors.read_tds, temp if temp is not None else 25)
+        stage("sensor", history.append, time.time(), temp, hum, tds_val)
+        rules.reset()
+        is_alert = stage("classify", m.check_conditions, rules, stats, temp, hum, tds_val, digest)
+        stage("led", led.alert if is_alert else led.normal)
+        if digest.due():
+            stage("format", digest.flush_into, m.MESSAGE)
+    return "main.py", cycle
+
+def temperature_control(alerts):
+    m = _load("temperature_control")
+    m.setup()
+    m.TEMPERATURE_THRESHOLD = -100.0 if alerts >= 1 else 1000.0
+    m.rules = m.make_rules()
+
+    def cycle(stage):
+        temperature = stage("sensor", m.read_temperature)
+        humidity = stage("sensor", lambda: round(m.dht_cache.read()[1], 1))
+        stage("sensor", m.history.append, time.time(), temperature, humidity)
+        stage("classify", m.control_relay_based_on_temperature, temperature)
+        stage("format", m.display_status, temperature, humidity)
+    return "temperature_control.py", cycle
+
+SUITE = (
+    (soil_monitor, (0, 1, 2, 4)),
+    (main_py, (0, 1, 3)),
+    (temperature_control, (0, 1)),
+)
+
+def main():
+    if not hasattr(gc, "mem_alloc"):
+        sys.exit("bench_device.py runs on the Pico (mpremote run bench_device.py); "
+                 "use benchmark.py on a PC")
+    for setup, alert_counts in SUITE:
+        for alerts in alert_counts:
+            run(setup, alerts)
+    gc.collect()
+    print("heap free {} B, allocated {} B".format(gc.mem_free(), gc.mem_alloc()))
+
+if __name__ == "__main__":
+    main()
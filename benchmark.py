@@ -0,0 +1,293 @@
+"""
+    ----------------------------------------------------------------------------
+    MONITORING LOOP BENCHMARK
+    > Operation:
+        - Runs the loop bodies of main.py, soil-moisture-monitor.py and
+          temperature_control.py on the simulated hardware (sim/)
+        - Times each stage of a cycle: sensor read, classification,
+          formatting, LED, notify
+        - Measures memory allocated per cycle and stage (tracemalloc peak);
+          a CPython tool, as the simulator needs CPython (asyncio, tempfile,
+          selectors); bench_device.py gives the heap figures on the Pico
+        - Repeats with 0..N active alerts to show how cost grows with alerts
+        - Saves results as JSON; --compare flags stages that got slower
+    > Usage:
+        python benchmark.py [--cycles N] [--out bench_results.json]
+                            [--compare old_results.json]
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import sim
+
+# ===== CONFIGURATION =====
+CYCLES = 500              # timed cycles per configuration
+MEMORY_CYCLES = 100       # cycles measured for allocations (slower)
+REGRESSION_RATIO = 1.25   # --compare: flag stages this much slower
+CYCLE_SECONDS = 5         # virtual time between cycles, so the DHT22 is measured every cycle
+STAGES = ("sensor", "classify", "format", "led", "notify")
+REPO = os.path.dirname(os.path.abspath(__file__))
+
+_perf_ns = time.perf_counter_ns   # real clock; sim only patches sleep/time/ticks
+_wall_time = time.time            # saved before sim.install() replaces it
+
+# ===== MEASUREMENT =====
+class Stages:
+    """Accumulates time (ns) or allocated bytes per stage within one cycle."""
+    def __init__(self, measure_memory=False):
+        self.measure_memory = measure_memory
+        self.current = dict.fromkeys(STAGES, 0)
+        self.cycles = []
+
+    def __call__(self, name, fn, *args):
+        if self.measure_memory:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            result = fn(*args)
+            # peak catches temporaries that were freed again
+            self.current[name] += tracemalloc.get_traced_memory()[1] - before
+            return result
+        t0 = _perf_ns()
+        result = fn(*args)
+        self.current[name] += _perf_ns() - t0
+        return result
+
+    def end_cycle(self):
+        self.cycles.append(self.current)
+        self.current = dict.fromkeys(STAGES, 0)
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def run(setup, alerts, cycles=CYCLES, memory_cycles=MEMORY_CYCLES):
+    """Benchmark one loop body (from `setup`) with `alerts` alerts firing each cycle."""
+    world = sim.install(seed=1)
+    world.dht_fail_rate = 0.0
+    world.wifi_fail_rate = 0.0
+    world.http_fail_rate = 0.0
+    name, cycle = setup(alerts)
+
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        timing = Stages()
+        t0 = _perf_ns()
+        for _ in range(cycles):
+            world.clock.advance(CYCLE_SECONDS)
+            cycle(timing)
+            timing.end_cycle()
+        total_ns = _perf_ns() - t0
+
+        memory = Stages(measure_memory=True)
+        tracemalloc.start()
+        try:
+            for _ in range(memory_cycles):
+                world.clock.advance(CYCLE_SECONDS)
+                cycle(memory)
+                memory.end_cycle()
+        finally:
+            tracemalloc.stop()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    result = {
+        "script": name,
+        "alerts": alerts,
+        "cycles": cycles,
+        "cycles_per_sec": cycles * 1e9 / total_ns,
+        "stages": {},
+    }
+    for stage in STAGES:
+        times = [c[stage] for c in timing.cycles]
+        if not any(times):
+            continue
+        allocs = [c[stage] for c in memory.cycles]
+        result["stages"][stage] = {
+            "mean_us": sum(times) / len(times) / 1000,
+            "p95_us": _percentile(times, 95) / 1000,
+            "alloc_bytes": sum(allocs) / len(allocs),
+        }
+    return result
+
+# ===== LOOP BODIES =====
+def _load(filename, module_name):
+    import importlib.util
+    if REPO not in sys.path:
+        sys.path.insert(1, REPO)
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(REPO, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _connect_wifi():
+    import network
+    wlan = network.WLAN(network.STA_IF)
+    wlan.active(True)
+    wlan.connect("sim", "sim")
+    sim.WORLD.clock.advance(sim.WORLD.wifi_connect_time)
+
+def _rules(m, alerts, channels):
+    """
+    The script's rules with the first `alerts` always past their limit and
+    the others never, and the StreamStats they read.
+    """
+    from buni.stats import StreamStats
+    from buni.rules import RuleSet, ABOVE
+    forced = []
+    for i, (name, channel, op, limit, hysteresis, severity, hold, unit) in enumerate(m.RULES):
+        fire = i < alerts
+        limit = -10 ** 6 if fire == (op == ABOVE) else 10 ** 6
+        forced.append((name, channel, op, limit, 0, severity, 0, unit))
+    stats = StreamStats(channels)
+    return RuleSet(forced, stats.names), stats
+
+def soil_monitor(alerts):
+    m = _load("soil-moisture-monitor.py", "soil_moisture_monitor")
+    m.LOG_DIR = None
+    rules, stats = _rules(m, alerts, m.HISTORY_CHANNELS)
+    _connect_wifi()
+    led = m.LEDController(m.LED_PIN)
+    dht_sensor = m.DHT22Sensor(m.DHT_PIN)
+    soil = m.SoilMoisture(m.SOIL_ADC_PIN)
+    tds = m.TDSSensor(m.TDS_ADC_PIN)
+    wa = m.NotificationQueue(m.WhatsAppNotifier(m.CALLMEBOT_PHONE, m.CALLMEBOT_APIKEY))
+    tg = m.NotificationQueue(m.TelegramNotifier(m.TELEGRAM_BOT_TOKEN, m.TELEGRAM_CHAT_ID))
+    digest = m.AlertDigest(window=0)     # worst case: a message every cycle
+    history = m.History(m.HISTORY_CHANNELS, m.HISTORY_SIZE)
+
+    def cycle(stage):
+        temp, hum = stage("sensor", dht_sensor.read)
+        soil_pct, soil_raw = stage("sensor", soil.read_percent)
+        tds_info = stage("sensor", tds.read_tds, temp if temp is not None else 25.0)
+        stage("sensor", history.append, time.time(), temp, hum, soil_pct, tds_info["tds"])
+        rules.reset()                    # worst case: every alert raised again each cycle
+        alerting = stage("classify", m.check_alerts, rules, stats, temp, hum, soil_pct, tds_info["tds"], digest)
+        stage("format", m.print_readings, temp, hum, soil_raw, soil_pct, tds_info, soil.spread)
+        if alerting:
+            stage("led", led.blink, 3, 0.15, 0.15)
+        else:
+            stage("led", led.blink, 1, 0.05, 0.05)
+        if digest.due():
+            msg = bytes(stage("format", digest.flush_into, m.MESSAGE))
+            stage("notify", m.send_alert, msg, wa, tg)
+        stage("notify", wa.pump)
+        stage("notify", tg.pump)
+    return "soil-moisture-monitor.py", cycle
+
+def main_py(alerts):
+    m = _load("main.py", "main_script")
+    m.LOG_DIR = None
+    rules, stats = _rules(m, alerts, m.CHANNELS)
+    _connect_wifi()
+    led = m.LEDController(m.LED_PIN_NUM)
+    sensors = m.SensorManager(m.DHT_PIN_NUM, m.ADC_PIN_NUM)
+    wa = m.NotificationQueue(m.WhatsApp(m.PHONE_NUMBER, m.WA_API_KEY))
+    tg = m.NotificationQueue(m.Telegram(m.TG_BOT_TOKEN, m.TG_CHAT_ID))
+    digest = m.AlertDigest(window=0)
+    history = m.History(m.CHANNELS, m.HISTORY_SIZE)
+
+    def cycle(stage):
+        temp, hum = stage("sensor", sensors.read_dht)
+        tds_val = stage("sensor", sensors.read_tds, temp if temp is not None else 25)
+        stage("sensor", history.append, time.time(), temp, hum, tds_val)
+        rules.reset()
+        is_alert = stage("classify", m.check_conditions, rules, stats, temp, hum, tds_val, digest)
+        stage("led", led.alert if is_alert else led.normal)
+        if digest.due():
+            stage("notify", m.send_digest, digest, wa, tg)
+        stage("notify", wa.pump)
+        stage("notify", tg.pump)
+    return "main.py", cycle
+
+def temperature_control(alerts):
+    m = _load("temperature_control.py", "temperature_control")
+    m.setup()
+    m.TEMPERATURE_THRESHOLD = -100.0 if alerts >= 1 else 1000.0
+    m.rules = m.make_rules()
+
+    def cycle(stage):
+        temperature = stage("sensor", m.read_temperature)
+        humidity = stage("sensor", lambda: round(m.dht_cache.read()[1], 1))
+        stage("sensor", m.history.append, time.time(), temperature, humidity)
+        stage("classify", m.control_relay_based_on_temperature, temperature)
+        stage("format", m.display_status, temperature, humidity)
+    return "temperature_control.py", cycle
+
+SUITE = (
+    (soil_monitor, (0, 1, 2, 4)),
+    (main_py, (0, 1, 3)),
+    (temperature_control, (0, 1)),
+)
+
+# ===== REPORTING =====
+def compare(results, baseline_path):
+    """Print stages whose mean time grew by more than REGRESSION_RATIO."""
+    with open(baseline_path) as f:
+        baseline = {(r["script"], r["alerts"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    for r in results:
+        old = baseline.get((r["script"], r["alerts"]))
+        if old is None:
+            continue
+        for stage, now in r["stages"].items():
+            before = old["stages"].get(stage)
+            if before and now["mean_us"] > before["mean_us"] * REGRESSION_RATIO:
+                regressions += 1
+                print("REGRESSION {} alerts={} {}: {:.1f} -> {:.1f} us".format(
+                    r["script"], r["alerts"], stage, before["mean_us"], now["mean_us"]))
+    print("{} regression(s) against {}".format(regressions, baseline_path))
+    return regressions
+
+def main(argv):
+    cycles = CYCLES
+    out = "bench_results.json"
+    baseline = None
+    i = 0
+    while i < len(argv):
+        if argv[i] == "--cycles":
+            cycles = int(argv[i + 1])
+            i += 1
+        elif argv[i] == "--out":
+            out = argv[i + 1]
+            i += 1
+        elif argv[i] == "--compare":
+            baseline = argv[i + 1]
+            i += 1
+        i += 1
+
+    results = []
+    for setup, alert_counts in SUITE:
+        for alerts in alert_counts:
+            r = run(setup, alerts, cycles, min(cycles, MEMORY_CYCLES))
+            results.append(r)
+            print("{:<26} alerts={}  {:>8.0f} cycles/s".format(r["script"], alerts, r["cycles_per_sec"]))
+            for stage, s in r["stages"].items():
+                print("    {:<9} mean {:>8.1f} us  p95 {:>8.1f} us  alloc {:>8.0f} B/cycle".format(
+                    stage, s["mean_us"], s["p95_us"], s["alloc_bytes"]))
+
+    report = {
+        "python": sys.version.split()[0],
+        "implementation": sys.implementation.name,
+        "alloc_metric": "tracemalloc peak",
+        "timestamp": int(_wall_time()),
+        "results": results,
+    }
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print("Saved", out)
+    if baseline:
+        return 1 if compare(results, baseline) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,23 @@
+"""
+    ----------------------------------------------------------------------------
+    BUNI DEVICE LIBRARY
+    > Operation:
+        - Helper modules shared by the device scripts in the repository
+          folder (main.py, soil-moisture-monitor.py, temperature_control.py,
+          ...) and by the gateway
+        - Sensor path: adc_burst, calibration, dht_cache, history,
+          alert_digest, flash_log, notify_queue, outbox, node, boot_profile
+        - Network path: wifi_manager, http_client, circuit_breaker, frames,
+          deadband, mqtt; the scripts reach these through net.py so they
+          load on first use, after the first reading
+        - Importing the package imports nothing else, so a script only pays
+          for the modules it uses
+        - Freeze it into the firmware with manifest.py (or precompile with
+          mpy-cross) so modules load without compiling on the Pico
+        - Demos / benchmarks run from the repository folder, e.g.
+              python -m buni.circuit_breaker
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
@@ -0,0 +1,133 @@
+"""
+    ----------------------------------------------------------------------------
+    BURST ADC SAMPLING
+    > Operation:
+        - Takes N back-to-back read_u16() samples into a preallocated
+          array('H') and reduces them to one value
+        - Reductions: median, trimmed mean or plain (decimating) average
+        - Reports the spread (max - min) of each burst so noisy readings can
+          be spotted
+        - Stops early when the microsecond budget is used up
+        - No allocation per sample; sorting is done in place
+        - Run this file for a samples-per-second benchmark of each method
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+from array import array
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    # CPython fallback (host testing)
+    import time
+
+    def ticks_us():
+        return time.perf_counter_ns() // 1000
+
+    def ticks_diff(a, b):
+        return a - b
+
+# ===== CONFIGURATION =====
+MEDIAN = 0
+TRIMMED_MEAN = 1
+AVERAGE = 2
+METHOD_NAMES = ("median", "trimmed mean", "average")
+
+BURST_SAMPLES = 16     # samples per reading
+BUDGET_US = 2000       # max time spent sampling per reading
+TRIM = 4               # trimmed mean: fraction 1/TRIM dropped from each end
+
+class BurstSampler:
+    def __init__(self, adc, samples=BURST_SAMPLES, method=MEDIAN, budget_us=BUDGET_US):
+        self.adc = adc
+        self.samples = samples
+        self.method = method
+        self.budget_us = budget_us
+        self.buf = array("H", [0] * samples)
+        self.count = 0       # samples actually taken in the last burst
+        self.spread = 0      # max - min of the last burst
+
+    def read(self):
+        """Take one burst and return the reduced raw value (0..65535)."""
+        buf = self.buf
+        read_u16 = self.adc.read_u16
+        budget = self.budget_us
+        start = ticks_us()
+        n = 0
+        for i in range(self.samples):
+            buf[i] = read_u16()
+            n += 1
+            if ticks_diff(ticks_us(), start) >= budget:
+                break
+        self.count = n
+        if self.method == AVERAGE:
+            return self._average(n)
+        self._sort(n)
+        self.spread = buf[n - 1] - buf[0]
+        if self.method == TRIMMED_MEAN:
+            return self._trimmed_mean(n)
+        mid = n >> 1
+        if n & 1:
+            return buf[mid]
+        return (buf[mid - 1] + buf[mid]) >> 1
+
+    def _sort(self, n):
+        # insertion sort: in place, fast for the small bursts used here
+        buf = self.buf
+        for i in range(1, n):
+            v = buf[i]
+            j = i - 1
+            while j >= 0 and buf[j] > v:
+                buf[j + 1] = buf[j]
+                j -= 1
+            buf[j + 1] = v
+
+    def _trimmed_mean(self, n):
+        buf = self.buf
+        k = n // TRIM
+        total = 0
+        for i in range(k, n - k):
+            total += buf[i]
+        return total // (n - 2 * k)
+
+    def _average(self, n):
+        buf = self.buf
+        total = 0
+        lo = 65535
+        hi = 0
+        for i in range(n):
+            v = buf[i]
+            total += v
+            if v < lo:
+                lo = v
+            if v > hi:
+                hi = v
+        self.spread = hi - lo
+        return total // n
+
+# ===== BENCHMARK =====
+if __name__ == "__main__":
+    try:
+        from machine import ADC, Pin
+        adc = ADC(Pin(27))
+    except ImportError:
+        import random
+
+        class _NoisyADC:
+            def read_u16(self):
+                return 45000 + int(random.gauss(0, 800))
+
+        adc = _NoisyADC()
+
+    rounds = 2000
+    for method in (MEDIAN, TRIMMED_MEAN, AVERAGE):
+        sampler = BurstSampler(adc, samples=16, method=method, budget_us=1000000)
+        t0 = ticks_us()
+        for _ in range(rounds):
+            sampler.read()
+        elapsed = ticks_diff(ticks_us(), t0)
+        print("{:>12}: {:.0f} samples/s, {:.0f} us/reading, last spread {}".format(
+            METHOD_NAMES[method], rounds * sampler.samples * 1e6 / elapsed,
+            elapsed / rounds, sampler.spread))
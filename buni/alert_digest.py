@@ -0,0 +1,114 @@
+"""
+    ----------------------------------------------------------------------------
+    ALERT DIGEST
+    > Operation:
+        - Collects alerts by type instead of dropping them during a cooldown
+        - Per type keeps first-seen, last-seen, count and min/max value
+        - flush() renders everything seen in the window as one compact
+          message, so a long incident costs one message per window per
+          channel instead of one per cycle
+        - flush_into() writes the same message into a reusable
+          MessageBuilder (msgbuild.py) without building strings
+        - The first alert after a quiet window is sent straight away
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import time
+
+from buni.msgbuild import MessageBuilder
+
+# ===== CONFIGURATION =====
+ALERT_WINDOW = 300     # seconds between digests while alerts keep coming
+
+# Entry layout (one small list per alert type); name and unit kept as UTF-8 bytes
+_FIRST, _LAST, _COUNT, _MIN, _MAX, _UNIT, _NAME = range(7)
+
+class AlertDigest:
+    def __init__(self, window=ALERT_WINDOW):
+        self.window = window
+        self.entries = {}              # name -> [first, last, count, min, max, unit, name]
+        self.order = []                # names in first-seen order
+        self.last_flush = None
+        # Counters
+        self.events = 0
+        self.digests = 0
+
+    def add(self, name, value=None, unit="", now=None):
+        """Record one occurrence of alert `name` with its reading."""
+        if now is None:
+            now = time.time()
+        self.events += 1
+        entry = self.entries.get(name)
+        if entry is None:
+            self.entries[name] = [now, now, 1, value, value, unit.encode(), name.encode()]
+            self.order.append(name)
+            return
+        entry[_LAST] = now
+        entry[_COUNT] += 1
+        if value is not None:
+            if entry[_MIN] is None or value < entry[_MIN]:
+                entry[_MIN] = value
+            if entry[_MAX] is None or value > entry[_MAX]:
+                entry[_MAX] = value
+
+    def due(self, now=None):
+        """True when there is something to send and the window has elapsed."""
+        if not self.order:
+            return False
+        if self.last_flush is None:
+            return True
+        if now is None:
+            now = time.time()
+        return now - self.last_flush >= self.window
+
+    def flush(self, now=None):
+        """Return the digest message for the collected alerts and start a new window."""
+        return bytes(self.flush_into(MessageBuilder(), now)).decode()
+
+    def flush_into(self, builder, now=None):
+        """
+        Write the digest message into `builder` (after a reset) and start a
+        new window. Returns builder.view().
+        """
+        if now is None:
+            now = time.time()
+        b = builder.reset()
+        b.write(b"ALERT: ")
+        first = True
+        for name in self.order:
+            e = self.entries[name]
+            if not first:
+                b.write(b" | ")
+            first = False
+            b.write(e[_NAME])
+            if e[_COUNT] > 1:
+                b.write(b" x").write_int(e[_COUNT])
+            if e[_MIN] is not None:
+                b.write_byte(0x20).write_number(e[_MIN])
+                if e[_MIN] != e[_MAX]:
+                    b.write(b"..").write_number(e[_MAX])
+                b.write(e[_UNIT])
+            if e[_COUNT] > 1:
+                b.write(b" (").write_clock(e[_FIRST]).write_byte(0x2D).write_clock(e[_LAST]).write_byte(0x29)
+        self.entries.clear()
+        self.order.clear()
+        self.last_flush = now
+        self.digests += 1
+        return b.view()
+
+# ===== DEMO =====
+if __name__ == "__main__":
+    digest = AlertDigest(window=60)
+    sent = 0
+    for t in range(0, 3600, 5):              # one hour of 5 s cycles
+        digest.add("High temperature", 31 + (t % 50) / 10, "C", now=t)
+        if t % 15 == 0:
+            digest.add("High TDS", 800 + t // 10, "ppm", now=t)
+        if digest.due(now=t):
+            msg = digest.flush(now=t)
+            sent += 1
+    print("events:", digest.events, "messages:", sent)
+    print("last digest:", msg)
@@ -0,0 +1,85 @@
+"""
+    ----------------------------------------------------------------------------
+    BOOT PROFILER
+    > Operation:
+        - Records named milestones as milliseconds since reset (ticks_ms
+          starts at 0 on reset on the Pico; on CPython the base is when
+          this module was imported, so import it first)
+        - Each name is recorded once, so mark() can sit inside the loop
+          (e.g. "wifi up" on the first cycle the link is up)
+        - report() prints the milestones not printed yet, the first time
+          with the reset cause (power on, watchdog, ...); the heap in use is
+          shown where gc has mem_alloc
+        - The scripts mark "imports", "hardware" and "first reading" and
+          report at the first valid reading, so the cost of a cold boot or
+          a watchdog reset is visible on the console
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import gc
+import time
+
+try:
+    from time import ticks_ms, ticks_diff
+    _BASE_MS = 0                       # ticks count from reset
+except ImportError:
+    # CPython fallback
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+    _BASE_MS = ticks_ms()
+
+_RESET_NAMES = ("PWRON_RESET", "HARD_RESET", "WDT_RESET", "DEEPSLEEP_RESET", "SOFT_RESET")
+
+def reset_cause():
+    """Name of the last reset cause ('WDT_RESET', ...) or None off-device."""
+    try:
+        import machine
+        cause = machine.reset_cause()
+    except (ImportError, AttributeError):
+        return None
+    for name in _RESET_NAMES:
+        if getattr(machine, name, None) == cause:
+            return name
+    return str(cause)
+
+class BootProfile:
+    def __init__(self):
+        self.marks = []                # (name, ms since reset, heap bytes or None)
+        self.printed = 0               # marks already shown by report()
+
+    def mark(self, name):
+        """Record a milestone the first time it is reached; returns True then."""
+        for n, _, _ in self.marks:
+            if n == name:
+                return False
+        heap = gc.mem_alloc() if hasattr(gc, "mem_alloc") else None
+        self.marks.append((name, ticks_diff(ticks_ms(), _BASE_MS), heap))
+        return True
+
+    def elapsed(self, name):
+        """ms since reset at a milestone, or None if it was not reached."""
+        for n, ms, _ in self.marks:
+            if n == name:
+                return ms
+        return None
+
+    def report(self):
+        """Print the milestones recorded since the last report."""
+        if self.printed == 0 and self.marks:
+            print("Boot profile (reset cause: {}):".format(reset_cause()))
+        last = self.marks[self.printed - 1][1] if self.printed else 0
+        for name, ms, heap in self.marks[self.printed:]:
+            line = "  {:<14} {:>7} ms  (+{} ms)".format(name, ms, ms - last)
+            if heap is not None:
+                line += "  heap {} B".format(heap)
+            print(line)
+            last = ms
+        self.printed = len(self.marks)
+
+PROFILE = BootProfile()
@@ -0,0 +1,137 @@
+"""
+    ----------------------------------------------------------------------------
+    SENSOR CALIBRATION TABLES
+    > Operation:
+        - Builds integer lookup tables once from the calibration constants
+          (DRY_VALUE / WET_VALUE for soil, vref for TDS)
+        - Soil: raw ADC -> moisture % is one table index
+        - TDS: raw ADC -> ppm is one table index, a multiply and a shift
+          (fixed-point temperature compensation, updated only when the
+          temperature changes)
+        - No float math and no allocation per conversion
+        - Tables are indexed by raw >> SHIFT (SHIFT = 0 gives exact results
+          at 64 KB / 128 KB of RAM)
+        - The TDS table holds ppm * 16 in uint16, so vref is limited to
+          about 4.59 V; a higher one raises ValueError when the table is
+          built
+        - Run this file to compare the tables with the float formulas over
+          all 65536 raw values; it prints the maximum errors for each SHIFT
+          and vref tried (tests/test_calibration.py asserts them)
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+from array import array
+
+# ===== CONFIGURATION =====
+SHIFT = 4              # table index = raw >> SHIFT (4 -> 4096 entries)
+TDS_K = 560.0          # probe scale constant (same as the float formula)
+TDS_FACTOR = 0.5       # EC -> TDS conversion factor
+TEMP_COEFF = 0.02      # compensation per degC around 25 degC
+_TDS_FRAC = 4          # table stores ppm * 2**_TDS_FRAC
+_COMP_FRAC = 12        # compensation factor is 2**_COMP_FRAC fixed point
+
+class SoilTable:
+    """Raw ADC -> moisture percent (0 = dry, 100 = wet)."""
+    def __init__(self, dry, wet, shift=SHIFT):
+        self.dry = int(dry)
+        self.wet = int(wet)
+        self.shift = shift
+        size = (65535 >> shift) + 1
+        self.table = bytearray(size)
+        half = (1 << shift) >> 1
+        for i in range(size):
+            self.table[i] = self._exact(min(65535, (i << shift) + half))
+
+    def _exact(self, raw):
+        # integer form of int(100 - (raw - wet) * 100 / (dry - wet))
+        if self.wet >= self.dry:
+            # misconfigured calibration; same clamp as the float version
+            return 0 if raw >= self.dry else 100
+        if raw >= self.dry:
+            return 0
+        if raw <= self.wet:
+            return 100
+        return 100 + (-(raw - self.wet) * 100) // (self.dry - self.wet)
+
+    def percent(self, raw):
+        return self.table[raw >> self.shift]
+
+class TDSTable:
+    """Raw ADC -> TDS in ppm with temperature compensation."""
+    def __init__(self, vref=3.3, shift=SHIFT):
+        self.vref = float(vref)
+        self.shift = shift
+        size = (65535 >> shift) + 1
+        # ppm at 25 degC per raw count, in fixed point
+        scale = self.vref * 1000.0 / TDS_K * TDS_FACTOR * 1000.0 / 65535.0 * (1 << _TDS_FRAC)
+        if 65535 * scale + 0.5 >= 65536:
+            raise ValueError("vref {} V is too high for the TDS table (max {:.2f} V)".format(
+                vref, 65535.5 / (scale / self.vref * 65535)))
+        half = (1 << shift) >> 1
+        self.table = array("H", [0] * size)
+        for i in range(size):
+            self.table[i] = int(min(65535, (i << shift) + half) * scale + 0.5)
+        self._temp = None
+        self._inv_comp = 1 << _COMP_FRAC
+        self._round = 1 << (_TDS_FRAC + _COMP_FRAC - 1)
+
+    def set_temperature(self, temperature_c):
+        """Update the compensation factor (only recomputed when the temperature changes)."""
+        if temperature_c == self._temp:
+            return
+        self._temp = temperature_c
+        coeff = 1.0 + TEMP_COEFF * (temperature_c - 25.0)
+        if coeff <= 0:
+            coeff = 1.0
+        self._inv_comp = int((1 << _COMP_FRAC) / coeff + 0.5)
+
+    def ppm(self, raw, temperature_c=25.0):
+        if temperature_c != self._temp:
+            self.set_temperature(temperature_c)
+        return (self.table[raw >> self.shift] * self._inv_comp + self._round) >> (_TDS_FRAC + _COMP_FRAC)
+
+    def voltage(self, raw):
+        return raw * self.vref / 65535.0
+
+# ===== ACCURACY CHECK =====
+def _float_percent(raw, dry, wet):
+    # reference: SoilMoisture.read_percent / read_moisture_percentage
+    if raw >= dry:
+        return 0
+    if raw <= wet:
+        return 100
+    return int(100 - ((raw - wet) / (dry - wet)) * 100)
+
+def _float_tds(raw, temperature_c, vref=3.3):
+    # reference: TDSSensor.read_tds
+    voltage = (raw / 65535.0) * vref
+    ec = (voltage * 1000.0) / TDS_K
+    ec_25 = ec / (1.0 + TEMP_COEFF * (temperature_c - 25.0))
+    return int(round(ec_25 * TDS_FACTOR * 1000.0))
+
+def verify(dry=65535, wet=31405, vref=3.3, shift=SHIFT):
+    """Return max abs error of both tables over every raw value."""
+    soil = SoilTable(dry, wet, shift)
+    tds = TDSTable(vref, shift)
+    soil_err = 0
+    for raw in range(65536):
+        soil_err = max(soil_err, abs(soil.percent(raw) - _float_percent(raw, dry, wet)))
+    tds_err = 0
+    for temperature_c in (5.0, 15.0, 25.0, 32.5, 40.0):
+        for raw in range(65536):
+            tds_err = max(tds_err, abs(tds.ppm(raw, temperature_c) - _float_tds(raw, temperature_c, vref)))
+    return soil_err, tds_err
+
+if __name__ == "__main__":
+    for shift in (0, 2, SHIFT):
+        for vref in (3.0, 3.3, 4.5):
+            soil_err, tds_err = verify(vref=vref, shift=shift)
+            print("shift {}, vref {} V: max soil error {} %, max TDS error {} ppm".format(
+                shift, vref, soil_err, tds_err))
+    try:
+        TDSTable(5.0)
+    except ValueError as e:
+        print("vref 5.0 V:", e)
@@ -0,0 +1,266 @@
+"""
+    ----------------------------------------------------------------------------
+    TIMER-DRIVEN ADC CAPTURE
+    > Operation:
+        - A machine.Timer interrupt samples one or more ADCs at a fixed rate
+          (up to the kHz range), independent of prints, LED blinks and HTTP
+          calls in the main loop
+        - The interrupt handler only stores the raw read_u16() values and
+          ticks_us() into a preallocated ring buffer and moves the head
+          index; it allocates nothing and takes no lock (the handler only
+          writes `head`, the consumer only writes `tail`)
+        - Every BATCH samples the handler hands over with
+          micropython.schedule; the scheduled code checks the sample
+          spacing (jitter), adds the samples to per channel sums and calls
+          on_batch(capture, first, count) if given
+        - read(channel) returns the mean and spread of everything captured
+          since the previous read, e.g. a 5 s TDS average of 5000 samples
+        - When the ring is full new samples are dropped and counted as
+          overruns (the scheduled code could not keep up, e.g. during a
+          long blocking call)
+        - The ring is sized for MAX_BLOCK_MS of samples at the chosen rate
+          (the longest blocking call of the monitor loop: a TLS handshake
+          and a request) plus a batch; a rate needing more than
+          MAX_RING_SIZE slots is refused with ValueError
+        - Run on the simulator for jitter and overrun figures against
+          sampling in the main loop:  python -m buni.capture
+          (tests/test_capture.py checks no overruns or missed samples at
+          the rates it accepts)
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import time
+from array import array
+
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    # CPython fallback
+    def ticks_us():
+        return time.perf_counter_ns() // 1000
+
+    def ticks_diff(a, b):
+        return a - b
+
+try:
+    from micropython import schedule, alloc_emergency_exception_buf
+    alloc_emergency_exception_buf(100)  # lets an exception in the handler be reported
+except ImportError:
+    # CPython fallback: run the handover straight away
+    def schedule(func, arg):
+        func(arg)
+
+# ===== CONFIGURATION =====
+RATE_HZ = 1000         # samples per second per channel
+MAX_BLOCK_MS = 3000    # longest the main loop holds off scheduled code (a TLS handshake and a request)
+MAX_RING_SIZE = 4096   # largest ring made; a rate needing more is refused
+BATCH = 64             # samples per scheduled handover
+LATE_FACTOR = 1.5      # an interval this many periods long counts as a missed sample
+
+def ring_size(rate_hz, batch=BATCH, block_ms=MAX_BLOCK_MS):
+    """Smallest power of two holding `block_ms` of samples plus a batch."""
+    need = rate_hz * block_ms // 1000 + batch + 1
+    size = 1
+    while size < need:
+        size <<= 1
+    return size
+
+class Capture:
+    def __init__(self, adcs, rate_hz=RATE_HZ, size=None, batch=BATCH, timer_id=-1, on_batch=None):
+        if size is None:
+            size = ring_size(rate_hz, batch)
+            if size > MAX_RING_SIZE:
+                raise ValueError("{} Hz needs a {} sample ring to ride out {} ms (max {})".format(
+                    rate_hz, size, MAX_BLOCK_MS, MAX_RING_SIZE))
+        if size & (size - 1):
+            raise ValueError("ring size must be a power of two")
+        from machine import Timer
+        self.timer = Timer(timer_id)
+        self.reads = tuple(adc.read_u16 for adc in adcs)  # bound once, not in the handler
+        self.channels = len(adcs)
+        self.rate_hz = rate_hz
+        self.period_us = 1000000 // rate_hz
+        self.size = size
+        self.mask = size - 1
+        self.batch = batch
+        self.on_batch = on_batch
+        self.values = array("H", [0] * (size * self.channels))
+        self.stamps = array("L", [0] * size)   # ticks_us of each sample
+        self.head = 0                  # next slot the handler writes (handler only)
+        self.tail = 0                  # next slot to process (consumer only)
+        self.handing = False           # a handover is scheduled
+        self.busy = False              # processing in progress (foreground or scheduled)
+        self._irq = self._sample       # bound methods made once; the handler cannot allocate
+        self._handover = self._process
+        self.last_stamp = None
+        # Per channel sums since the last read()
+        self.sums = [0] * self.channels
+        self.counts = [0] * self.channels
+        self.lows = [65535] * self.channels
+        self.highs = [0] * self.channels
+        # Counters
+        self.samples = 0               # samples processed
+        self.overruns = 0              # samples dropped, ring full
+        self.schedule_fails = 0        # handovers refused (schedule queue full)
+        self.batches = 0
+        self.missed = 0                # intervals longer than LATE_FACTOR periods
+        self.jitter_max_us = 0
+        self.jitter_total_us = 0
+
+    def start(self):
+        self.timer.init(freq=self.rate_hz, mode=self.timer.PERIODIC, callback=self._irq)
+        return self
+
+    def stop(self):
+        self.timer.deinit()
+        self.process()
+
+    # --- interrupt context: no allocation, no locks ---
+    def _sample(self, timer):
+        head = self.head
+        nxt = (head + 1) & self.mask
+        if nxt == self.tail:
+            self.overruns += 1
+            return
+        i = head * self.channels
+        for read in self.reads:
+            self.values[i] = read()
+            i += 1
+        self.stamps[head] = ticks_us()
+        self.head = nxt
+        if not self.handing and ((nxt - self.tail) & self.mask) >= self.batch:
+            self.handing = True
+            try:
+                schedule(self._handover, 0)
+            except RuntimeError:
+                self.schedule_fails += 1
+                self.handing = False
+
+    # --- scheduled / foreground ---
+    def _process(self, _):
+        self.handing = False
+        self.process()
+
+    def process(self):
+        """Take the samples waiting in the ring; returns how many."""
+        if self.busy:
+            return 0
+        self.busy = True
+        first = tail = self.tail
+        head = self.head
+        count = (head - tail) & self.mask
+        values, stamps, channels = self.values, self.stamps, self.channels
+        sums, counts, lows, highs = self.sums, self.counts, self.lows, self.highs
+        period = self.period_us
+        late = int(period * LATE_FACTOR)
+        last = self.last_stamp
+        for _ in range(count):
+            stamp = stamps[tail]
+            if last is not None:
+                interval = ticks_diff(stamp, last)
+                if interval > late:
+                    self.missed += 1
+                else:
+                    jitter = interval - period if interval > period else period - interval
+                    self.jitter_total_us += jitter
+                    if jitter > self.jitter_max_us:
+                        self.jitter_max_us = jitter
+            last = stamp
+            i = tail * channels
+            for c in range(channels):
+                v = values[i + c]
+                sums[c] += v
+                counts[c] += 1
+                if v < lows[c]:
+                    lows[c] = v
+                if v > highs[c]:
+                    highs[c] = v
+            tail = (tail + 1) & self.mask
+        self.last_stamp = last
+        self.samples += count
+        if count:
+            self.batches += 1
+            if self.on_batch:
+                self.on_batch(self, first, count)
+        self.tail = tail               # frees the slots for the handler
+        self.busy = False
+        return count
+
+    def read(self, channel):
+        """(mean raw value, spread, samples) since the last read of `channel`; mean is None without samples."""
+        self.process()
+        n = self.counts[channel]
+        if not n:
+            return None, 0, 0
+        mean = self.sums[channel] // n
+        spread = self.highs[channel] - self.lows[channel]
+        self.sums[channel] = 0
+        self.counts[channel] = 0
+        self.lows[channel] = 65535
+        self.highs[channel] = 0
+        return mean, spread, n
+
+    def stats(self):
+        intervals = self.samples - self.missed - 1
+        return {
+            "rate_hz": self.rate_hz,
+            "samples": self.samples,
+            "batches": self.batches,
+            "overruns": self.overruns,
+            "schedule_fails": self.schedule_fails,
+            "missed": self.missed,
+            "jitter_mean_us": round(self.jitter_total_us / intervals, 1) if intervals > 0 else 0,
+            "jitter_max_us": self.jitter_max_us,
+        }
+
+# ===== DEMO (simulator) =====
+if __name__ == "__main__":
+    import sim
+
+    SECONDS = 120
+    CYCLE_S = 5
+
+    def foreground(world, capture=None, gpio=29):
+        """A monitor-like loop: read, print, blink, send; every 3rd cycle opens a new TLS connection."""
+        from machine import ADC
+        adc = ADC(gpio)
+        stamps = []
+        cycle = 0
+        while world.clock.now < SECONDS:
+            cycle += 1
+            if capture:
+                capture.read(1)
+            else:
+                adc.read_u16()
+            stamps.append(world.clock.now)
+            world.clock.advance(0.02 + world.random.random() * 0.03)   # printing to the console
+            for _ in range(3):
+                world.clock.sleep(0.15)                                # LED blink
+                world.clock.sleep(0.15)
+            world.clock.advance(world.http_latency)                    # notification request
+            if cycle % 3 == 0:
+                world.clock.advance(world.tls_handshake)
+            world.clock.sleep(CYCLE_S)
+        intervals = [b - a for a, b in zip(stamps, stamps[1:])]
+        return max(abs(i - (CYCLE_S + 0.9)) for i in intervals), len(stamps)
+
+    world = sim.install(seed=1)
+    spread, cycles = foreground(world)
+    print("Main loop sampling: {} readings, spacing off by up to {:.0f} ms".format(cycles, spread * 1000))
+    # a 512 slot ring at 1000 Hz for comparison, then the ring sized for each rate
+    for rate, size in ((1000, 512), (1000, None), (200, None), (50, None)):
+        world = sim.install(seed=1)
+        from machine import ADC
+        from buni import capture          # re-imported so ticks_us and schedule are the simulated ones
+        cap = capture.Capture((ADC(27), ADC(29)), rate_hz=rate, size=size).start()
+        foreground(world, cap)
+        cap.stop()
+        stats = cap.stats()
+        print("Timer capture {:>4} Hz, ring {:>4}: {}".format(rate, cap.size, stats))
+    try:
+        capture.Capture((ADC(27), ADC(29)), rate_hz=2000)
+    except ValueError as e:
+        print("Timer capture 2000 Hz:", e)
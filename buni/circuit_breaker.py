@@ -0,0 +1,275 @@
+"""
+    ----------------------------------------------------------------------------
+    CIRCUIT BREAKER
+    > Operation:
+        - One breaker per API host (endpoint), states closed / open /
+          half-open
+        - Closed: requests go through; FAILURE_THRESHOLD failures in a row
+          open the circuit
+        - Open: requests are refused at once (no socket, no timeout) until
+          the backoff has passed; the backoff doubles with every opening
+          (BACKOFF_MIN_MS .. BACKOFF_MAX_MS) with +/- JITTER so many nodes
+          do not retry in step
+        - Half-open: one trial request; success closes the circuit, failure
+          opens it again with a longer backoff
+        - Records per endpoint latency and counts of timeouts, 5xx, other
+          HTTP errors and connection errors
+        - GuardedClient wraps KeepAliveClient (same get / post / body /
+          close); available(host) lets a NotificationQueue or the batch
+          uploader hold their data while the circuit is open instead of
+          burning retries
+        - Run this file on CPython for a demo against a local fake API that
+          injects timeouts and 5xx responses; tests/test_circuit_breaker.py
+          checks the state changes and backoff bounds
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import time
+try:
+    from random import getrandbits
+except ImportError:
+    from urandom import getrandbits
+
+try:
+    from time import ticks_ms, ticks_add, ticks_diff
+except ImportError:
+    # CPython fallback
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_add(t, delta):
+        return t + delta
+
+    def ticks_diff(a, b):
+        return a - b
+
+# ===== CONFIGURATION =====
+FAILURE_THRESHOLD = 3      # failures in a row that open the circuit
+BACKOFF_MIN_MS = 10000     # first open period
+BACKOFF_MAX_MS = 600000    # longest open period (10 min)
+JITTER = 0.25              # +/- share of the backoff chosen at random
+
+# States
+CLOSED = 0
+OPEN = 1
+HALF_OPEN = 2
+STATE_NAMES = ("closed", "open", "half-open")
+
+class CircuitOpen(OSError):
+    """Raised instead of sending while an endpoint's circuit is open."""
+
+def _is_timeout(error):
+    return (error.args and error.args[0] in (110, 116)) or "timed out" in str(error)
+
+class CircuitBreaker:
+    def __init__(self, name, threshold=FAILURE_THRESHOLD, backoff_min_ms=BACKOFF_MIN_MS,
+                 backoff_max_ms=BACKOFF_MAX_MS, jitter=JITTER):
+        self.name = name
+        self.threshold = threshold
+        self.backoff_min_ms = backoff_min_ms
+        self.backoff_max_ms = backoff_max_ms
+        self.jitter = jitter
+        self.state = CLOSED
+        self.streak = 0                # failures in a row
+        self.backoff_ms = backoff_min_ms
+        self.retry_at = 0
+        # Counters
+        self.calls = 0
+        self.ok = 0
+        self.timeouts = 0
+        self.server_errors = 0         # 5xx
+        self.http_errors = 0           # other non-200 (e.g. 401/403 for a wrong key)
+        self.errors = 0                # connection / socket errors
+        self.refused = 0               # calls skipped while open
+        self.opens = 0
+        self.latency_ms_total = 0
+        self.latency_ms_max = 0
+
+    def allow(self):
+        """True when a request may be sent now (moves open -> half-open when due)."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and ticks_diff(ticks_ms(), self.retry_at) >= 0:
+            self.state = HALF_OPEN
+            return True
+        return False
+
+    def available(self):
+        """Like allow() but without changing state; for callers deciding whether to try."""
+        return self.state != OPEN or ticks_diff(ticks_ms(), self.retry_at) >= 0
+
+    def record(self, status, latency_ms, error=None):
+        """Record one request: an HTTP status, or error (an exception) when it raised."""
+        self.calls += 1
+        self.latency_ms_total += latency_ms
+        if latency_ms > self.latency_ms_max:
+            self.latency_ms_max = latency_ms
+        if error is not None:
+            if _is_timeout(error):
+                self.timeouts += 1
+            else:
+                self.errors += 1
+        elif status >= 500:
+            self.server_errors += 1
+        elif status != 200:
+            self.http_errors += 1
+        else:
+            self.ok += 1
+            self.streak = 0
+            self.state = CLOSED
+            self.backoff_ms = self.backoff_min_ms
+            return
+        self.streak += 1
+        if self.state == HALF_OPEN or self.streak >= self.threshold:
+            self._open()
+
+    def _open(self):
+        spread = int(self.backoff_ms * self.jitter)
+        delay = self.backoff_ms - spread + (getrandbits(16) * 2 * spread >> 16)
+        self.retry_at = ticks_add(ticks_ms(), delay)
+        self.state = OPEN
+        self.opens += 1
+        print("Circuit {} open for {} ms after {} failures".format(self.name, delay, self.streak))
+        self.backoff_ms = min(self.backoff_ms * 2, self.backoff_max_ms)
+
+    def stats(self):
+        return {"state": STATE_NAMES[self.state], "calls": self.calls, "ok": self.ok,
+                "timeouts": self.timeouts, "5xx": self.server_errors, "http_errors": self.http_errors,
+                "errors": self.errors, "refused": self.refused, "opens": self.opens,
+                "latency_ms_mean": self.latency_ms_total // self.calls if self.calls else 0,
+                "latency_ms_max": self.latency_ms_max}
+
+class GuardedClient:
+    """KeepAliveClient with a circuit breaker per host."""
+    def __init__(self, client, **breaker_args):
+        self.client = client
+        self.breaker_args = breaker_args
+        self.breakers = {}
+
+    def breaker(self, host):
+        b = self.breakers.get(host)
+        if b is None:
+            b = self.breakers[host] = CircuitBreaker(host, **self.breaker_args)
+        return b
+
+    def available(self, host):
+        return self.breaker(host).available()
+
+    def get(self, host, path):
+        return self._call(host, path, None, None, None)
+
+    def post(self, host, path, data, content_type=b"application/octet-stream", encoding=None):
+        return self._call(host, path, data, content_type, encoding)
+
+    def _call(self, host, path, data, content_type, encoding):
+        breaker = self.breaker(host)
+        if not breaker.allow():
+            breaker.refused += 1
+            raise CircuitOpen("circuit open: " + host)
+        t0 = ticks_ms()
+        try:
+            if data is None:
+                status = self.client.get(host, path)
+            else:
+                status = self.client.post(host, path, data, content_type, encoding)
+        except Exception as e:
+            breaker.record(0, ticks_diff(ticks_ms(), t0), e)
+            raise
+        breaker.record(status, ticks_diff(ticks_ms(), t0))
+        return status
+
+    def body(self):
+        return self.client.body()
+
+    def close(self, host=None):
+        self.client.close(host)
+
+    def stats(self):
+        return {host: b.stats() for host, b in self.breakers.items()}
+
+# ===== DEMO (CPython) =====
+if __name__ == "__main__":
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from buni.http_client import KeepAliveClient
+    from buni.notify_queue import NotificationQueue
+
+    class _FlakyApi(BaseHTTPRequestHandler):
+        """Fake API; the server's `mode` decides: ok, 5xx or timeout."""
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            mode = self.server.mode
+            if mode == "timeout":
+                time.sleep(0.5)            # longer than the client timeout
+                self.close_connection = True
+                return
+            status = 503 if mode == "5xx" else 200
+            body = b'{"ok":true}' if status == 200 else b"Service Unavailable"
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class _Notifier:
+        HOST = "api.telegram.org"
+
+        def __init__(self, http):
+            self.http = http
+
+        def send(self, message):
+            try:
+                path = "/botTOKEN/sendMessage?chat_id=1&text=" + message.replace(" ", "%20")
+                return self.http.get(self.HOST, path) == 200
+            except OSError:
+                return False
+
+        def available(self):
+            return not hasattr(self.http, "available") or self.http.available(self.HOST)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FlakyApi)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    local = {"api.telegram.org": server.server_address}
+    # phases of (mode, ticks); a tick is 50 ms, an alert is queued every 5th tick
+    phases = (("ok", 40), ("5xx", 120), ("timeout", 120), ("ok", 200))
+
+    blocked_s = {}
+    for guarded in (False, True):
+        http = KeepAliveClient(tls=False, timeout=0.2, resolve=local)
+        if guarded:
+            http = GuardedClient(http, backoff_min_ms=500, backoff_max_ms=4000)
+        queue = NotificationQueue(_Notifier(http), size=16)
+        t0 = time.perf_counter()
+        blocked = 0.0
+        tick = 0
+        for mode, ticks in phases:
+            server.mode = mode
+            for _ in range(ticks):
+                tick += 1
+                if tick % 5 == 0:
+                    queue.send("alert {}".format(tick // 5))
+                s0 = time.perf_counter()
+                queue.pump()
+                blocked += time.perf_counter() - s0
+                time.sleep(0.05)
+        print("with circuit breaker:" if guarded else "without circuit breaker:")
+        print("  time blocked in sends {:.2f} s of {:.1f} s, queue {}".format(
+            blocked, time.perf_counter() - t0, queue.stats()))
+        blocked_s[guarded] = blocked
+        assert queue.pending() == 0
+        if guarded:
+            for host, s in http.stats().items():
+                print(" ", host, s)
+                assert s["state"] == "closed" and s["opens"] >= 2
+        http.close()
+    server.shutdown()
+    assert blocked_s[True] * 5 < blocked_s[False], blocked_s
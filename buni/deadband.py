@@ -0,0 +1,294 @@
+"""
+    ----------------------------------------------------------------------------
+    DEADBAND / DELTA ENCODING
+    > Operation:
+        - Decides per cycle which readings are worth sending: each channel
+          is smoothed (EWMA) so sensor noise does not count as change, then
+          sent when it moved by at least its deadband since the value last
+          sent, or when its heartbeat interval has passed
+        - Nothing is sent when no channel qualifies
+        - Sent channels are encoded as zigzag varint deltas from the last
+          sent value (usually 1 byte each), behind a 3 byte header and a
+          varint time delta
+        - A keyframe with absolute values, node id and time goes out first
+          and every KEYFRAME_INTERVAL seconds so a receiver can resync; also
+          when the clock went back (e.g. set by NTP), since a time delta
+          cannot be negative
+        - DeltaDecoder (host / gateway) rebuilds the full readings and
+          skips deltas after a lost frame until the next keyframe
+        - Run on CPython to measure the saving on a recorded flash log or
+          a simulated day:  python -m buni.deadband [log dir]
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import struct
+
+from buni.flash_log import MISSING, SCALES, _to_int
+
+# ===== CONFIGURATION =====
+# Per channel (temp, hum, soil, tds), in the scaled units of flash_log.SCALES
+DEADBANDS = (5, 20, 2, 20)         # 0.5 C, 2.0 %, 2 %, 20 ppm
+HEARTBEATS = (300, 300, 600, 600)  # seconds; send at least this often
+KEYFRAME_INTERVAL = 3600           # seconds between absolute frames
+SMOOTHING = 0.2                    # EWMA weight of a new reading (1.0 = no smoothing)
+
+# ===== FRAME FORMAT =====
+# byte 0: MAGIC, byte 1: flags (FLAG_KEY | channel mask), byte 2: sequence
+# keyframe: node (u32), ts (u32), then every channel as a zigzag varint
+# delta:    varint seconds since the previous frame, then a zigzag varint
+#           delta per channel in the mask
+MAGIC = 0xD5
+FLAG_KEY = 0x80
+CHANNELS = 4
+ALL_CHANNELS = (1 << CHANNELS) - 1
+_KEY_HEADER = "<II"
+_KEY_HEADER_SIZE = struct.calcsize(_KEY_HEADER)
+MAX_FRAME = 3 + _KEY_HEADER_SIZE + CHANNELS * 3
+
+def _put_varint(buf, i, n):
+    while n > 0x7F:
+        buf[i] = (n & 0x7F) | 0x80
+        n >>= 7
+        i += 1
+    buf[i] = n
+    return i + 1
+
+def _get_varint(buf, i):
+    n = shift = 0
+    while True:
+        b = buf[i]
+        i += 1
+        n |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return n, i
+        shift += 7
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 31)
+
+def _unzigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+class DeltaEncoder:
+    def __init__(self, node, deadbands=DEADBANDS, heartbeats=HEARTBEATS, keyframe_interval=KEYFRAME_INTERVAL,
+                 smoothing=SMOOTHING):
+        self.node = node
+        self.deadbands = deadbands
+        self.heartbeats = heartbeats
+        self.keyframe_interval = keyframe_interval
+        self.smoothing = smoothing
+        self.filtered = [None] * CHANNELS  # smoothed readings (None = missing)
+        self.buf = bytearray(MAX_FRAME)
+        self.sent = [0] * CHANNELS         # last sent value per channel (scaled)
+        self.sent_ts = [0] * CHANNELS      # when each channel was last sent
+        self.values = [0] * CHANNELS
+        self.last_ts = None                # time of the previous frame
+        self.key_ts = None
+        self.seq = 0
+        # Counters
+        self.readings = 0
+        self.frames = 0
+        self.keyframes = 0
+        self.bytes = 0
+
+    def force_keyframe(self):
+        """Make the next frame absolute (e.g. after the link was down)."""
+        self.key_ts = None
+
+    def update(self, ts, temp, hum, soil, tds):
+        """
+        Feed one reading. Returns the length of the frame written to
+        self.buf, or 0 when nothing needs to be sent.
+        """
+        self.readings += 1
+        self._filter(0, temp)
+        self._filter(1, hum)
+        self._filter(2, soil)
+        self._filter(3, tds)
+        values = self.values
+        for ch in range(CHANNELS):
+            values[ch] = _to_int(self.filtered[ch], SCALES[ch])
+        ts = int(ts)
+
+        if self.key_ts is None or ts < self.last_ts or ts - self.key_ts >= self.keyframe_interval:
+            return self._keyframe(ts)
+        mask = 0
+        for ch in range(CHANNELS):
+            v = values[ch]
+            last = self.sent[ch]
+            if ts - self.sent_ts[ch] >= self.heartbeats[ch]:
+                mask |= 1 << ch
+            elif v != last and (v == MISSING or last == MISSING or abs(v - last) >= self.deadbands[ch]):
+                mask |= 1 << ch
+        if not mask:
+            return 0
+
+        buf = self.buf
+        self.seq = (self.seq + 1) & 0xFF
+        buf[0] = MAGIC
+        buf[1] = mask
+        buf[2] = self.seq
+        i = _put_varint(buf, 3, ts - self.last_ts)
+        for ch in range(CHANNELS):
+            if mask & (1 << ch):
+                i = _put_varint(buf, i, _zigzag(values[ch] - self.sent[ch]))
+                self.sent[ch] = values[ch]
+                self.sent_ts[ch] = ts
+        return self._sent(ts, i)
+
+    def _filter(self, ch, value):
+        if value is None or value != value:
+            self.filtered[ch] = None
+        elif self.filtered[ch] is None:
+            self.filtered[ch] = value
+        else:
+            self.filtered[ch] += self.smoothing * (value - self.filtered[ch])
+
+    def _keyframe(self, ts):
+        buf = self.buf
+        self.seq = (self.seq + 1) & 0xFF
+        buf[0] = MAGIC
+        buf[1] = FLAG_KEY | ALL_CHANNELS
+        buf[2] = self.seq
+        struct.pack_into(_KEY_HEADER, buf, 3, self.node, ts)
+        i = 3 + _KEY_HEADER_SIZE
+        for ch in range(CHANNELS):
+            i = _put_varint(buf, i, _zigzag(self.values[ch]))
+            self.sent[ch] = self.values[ch]
+            self.sent_ts[ch] = ts
+        self.key_ts = ts
+        self.keyframes += 1
+        return self._sent(ts, i)
+
+    def _sent(self, ts, length):
+        self.last_ts = ts
+        self.frames += 1
+        self.bytes += length
+        return length
+
+    def frame(self, length):
+        return memoryview(self.buf)[:length]
+
+# ===== HOST SIDE =====
+class DeltaDecoder:
+    """Rebuilds readings from one node's frames (keep one decoder per node / sender)."""
+    def __init__(self):
+        self.node = None
+        self.ts = None
+        self.seq = None
+        self.values = [MISSING] * CHANNELS
+        self.synced = False
+        # Counters
+        self.frames = 0
+        self.lost = 0          # frames missing according to the sequence numbers
+        self.skipped = 0       # delta frames dropped while waiting for a keyframe
+
+    def decode(self, buf):
+        """
+        Yield (node, ts, (temp, hum, soil, tds), mask) for every frame in buf;
+        mask tells which channels were actually sent.
+        """
+        i = 0
+        while i + 3 <= len(buf) and buf[i] == MAGIC:
+            flags = buf[i + 1]
+            seq = buf[i + 2]
+            mask = flags & ALL_CHANNELS
+            i += 3
+            if self.seq is not None and seq != (self.seq + 1) & 0xFF:
+                self.lost += (seq - self.seq - 1) & 0xFF
+                self.synced = False
+            self.seq = seq
+            if flags & FLAG_KEY:
+                self.node, self.ts = struct.unpack_from(_KEY_HEADER, buf, i)
+                i += _KEY_HEADER_SIZE
+                for ch in range(CHANNELS):
+                    v, i = _get_varint(buf, i)
+                    self.values[ch] = _unzigzag(v)
+                self.synced = True
+            else:
+                dt, i = _get_varint(buf, i)
+                deltas = []
+                for ch in range(CHANNELS):
+                    if mask & (1 << ch):
+                        v, i = _get_varint(buf, i)
+                        deltas.append((ch, _unzigzag(v)))
+                if not self.synced:
+                    self.skipped += 1
+                    continue
+                self.ts += dt
+                for ch, d in deltas:
+                    self.values[ch] += d
+            self.frames += 1
+            yield self.node, self.ts, self.readings(), mask
+
+    def readings(self):
+        return tuple(None if v == MISSING else v / s for v, s in zip(self.values, SCALES))
+
+# ===== MEASUREMENT (CPython) =====
+def measure(readings, node=1, header_bytes=28):
+    """
+    Encode (ts, temp, hum, soil, tds) readings with and without the
+    deadband stage. header_bytes is the per-packet cost on the wire
+    (28 = IPv4 + UDP). max_error is how far the receiver's value was from
+    the smoothed reading.
+    """
+    from buni.frames import READING_SIZE
+    enc = DeltaEncoder(node)
+    dec = DeltaDecoder()
+    max_err = [0.0] * CHANNELS
+    held = None
+    count = 0
+    for reading in readings:
+        count += 1
+        n = enc.update(*reading)
+        if n:
+            for _, _, held, _ in dec.decode(bytes(enc.frame(n))):
+                pass
+        if held is None:
+            continue
+        for ch in range(CHANNELS):
+            if enc.filtered[ch] is not None and held[ch] is not None:
+                max_err[ch] = max(max_err[ch], abs(enc.filtered[ch] - held[ch]))
+    full_bytes = count * READING_SIZE
+    return {
+        "readings": count,
+        "frames": enc.frames,
+        "keyframes": enc.keyframes,
+        "payload_bytes": enc.bytes,
+        "payload_bytes_full": full_bytes,
+        "wire_bytes": enc.bytes + enc.frames * header_bytes,
+        "wire_bytes_full": full_bytes + count * header_bytes,
+        "max_error": max_err,
+    }
+
+if __name__ == "__main__":
+    import sys
+
+    from buni import flash_log
+    from buni.log_reader import read_log
+
+    if len(sys.argv) > 1:
+        log_dir = sys.argv[1]
+        source = "flash log " + log_dir
+    else:
+        import os
+        import sim
+        flash_log.FULL_SEGMENTS = flash_log.MAX_SEGMENTS = 1000   # keep the whole day uncompacted
+        repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        summary = sim.run_script(os.path.join(repo, "soil-moisture-monitor.py"), 86400, seed=1, quiet=True)
+        log_dir = os.path.join(summary["fs_root"], "log")
+        source = "simulated day (soil-moisture-monitor.py, seed 1)"
+    readings = [r[1:] for r in read_log(log_dir) if not r[0] & flash_log.FLAG_COMPACTED]
+    r = measure(readings)
+    print("Trace:", source)
+    print("Readings: {}  frames sent: {} ({} keyframes)".format(r["readings"], r["frames"], r["keyframes"]))
+    print("Payload bytes: {} -> {}  ({:.1f}x less)".format(
+        r["payload_bytes_full"], r["payload_bytes"], r["payload_bytes_full"] / max(1, r["payload_bytes"])))
+    print("Wire bytes incl. UDP/IPv4: {} -> {}  ({:.1f}x less)".format(
+        r["wire_bytes_full"], r["wire_bytes"], r["wire_bytes_full"] / max(1, r["wire_bytes"])))
+    print("Packets (radio wake-ups): {} -> {}  ({:.1f}x less)".format(
+        r["readings"], r["frames"], r["readings"] / max(1, r["frames"])))
+    print("Max error held at the receiver: temp {:.1f} C, hum {:.1f} %, soil {:.0f} %, tds {:.0f} ppm".format(*r["max_error"]))
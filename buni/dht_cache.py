@@ -0,0 +1,136 @@
+"""
+    ----------------------------------------------------------------------------
+    DHT22 READ CACHE
+    > Operation:
+        - Single access point for a DHT22: at most one bit-banged
+          measurement per MIN_INTERVAL_MS (the sensor needs 2 s between
+          reads, faster reads fail)
+        - Reads in between return the cached (temp, hum) straight away;
+          read_aged() also returns how old the values are
+        - After a failed measurement the last good values are returned
+          while they are younger than MAX_AGE_MS, then (None, None)
+        - Works with dht.DHT22 (measure / temperature / humidity) and
+          PicoDHT22 (read() -> (temp, hum) or (None, None))
+        - Counters for measurements, cache hits, failures and retries
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import time
+
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:
+    # CPython fallback
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+# ===== CONFIGURATION =====
+MIN_INTERVAL_MS = 2000   # DHT22 minimum time between measurements
+MAX_AGE_MS = 15000       # serve cached values this long after the last good read
+
+class DHTCache:
+    def __init__(self, sensor, min_interval_ms=MIN_INTERVAL_MS, max_age_ms=MAX_AGE_MS):
+        self.sensor = sensor
+        self.min_interval_ms = min_interval_ms
+        self.max_age_ms = max_age_ms
+        self._has_measure = hasattr(sensor, "measure")
+        self.temp = None
+        self.hum = None
+        self.good_ms = None            # ticks of the last good measurement
+        self.tried_ms = None           # ticks of the last attempt
+        self.last_error = None
+        # Counters
+        self.measures = 0
+        self.hits = 0
+        self.failures = 0
+        self.retries = 0               # attempts right after a failure
+        self.recovered = 0             # retries that succeeded
+        self.streak = 0                # consecutive failures now
+        self.max_streak = 0
+
+    def read(self):
+        """(temp, hum) from the cache, measuring first when the interval has passed."""
+        now = ticks_ms()
+        if self.tried_ms is None or ticks_diff(now, self.tried_ms) >= self.min_interval_ms:
+            self._measure(now)
+        else:
+            self.hits += 1
+        if self.good_ms is None or ticks_diff(now, self.good_ms) > self.max_age_ms:
+            return None, None
+        return self.temp, self.hum
+
+    def read_aged(self):
+        """(temp, hum, age in ms); age is None when there is no usable value."""
+        temp, hum = self.read()
+        if temp is None:
+            return None, None, None
+        return temp, hum, ticks_diff(ticks_ms(), self.good_ms)
+
+    def _measure(self, now):
+        self.tried_ms = now
+        self.measures += 1
+        retry = self.streak > 0
+        if retry:
+            self.retries += 1
+        try:
+            if self._has_measure:
+                self.sensor.measure()
+                t = self.sensor.temperature()
+                h = self.sensor.humidity()
+            else:
+                t, h = self.sensor.read()
+            if t is None or h is None:
+                raise OSError("no data")
+        except Exception as e:
+            self.failures += 1
+            self.streak += 1
+            if self.streak > self.max_streak:
+                self.max_streak = self.streak
+            self.last_error = e
+            return
+        self.temp = float(t)
+        self.hum = float(h)
+        self.good_ms = now
+        if retry:
+            self.recovered += 1
+        self.streak = 0
+
+    def stats(self):
+        return {"measures": self.measures, "hits": self.hits, "failures": self.failures,
+                "retries": self.retries, "recovered": self.recovered, "max_streak": self.max_streak}
+
+# ===== BENCHMARK (CPython) =====
+if __name__ == "__main__":
+    class _SlowSensor:
+        """Takes about as long as a real bit-banged DHT22 transaction."""
+        def measure(self):
+            time.sleep(0.005)
+
+        def temperature(self):
+            return 24.5
+
+        def humidity(self):
+            return 55.0
+
+    sensor = _SlowSensor()
+    t0 = time.perf_counter()
+    for _ in range(20):
+        sensor.measure()
+        sensor.temperature(), sensor.humidity()
+    direct_us = (time.perf_counter() - t0) / 20 * 1e6
+
+    cache = DHTCache(sensor)
+    cache.read()
+    n = 100000
+    t0 = time.perf_counter()
+    for _ in range(n):
+        cache.read()
+    cached_us = (time.perf_counter() - t0) / n * 1e6
+    print("Direct measurement: {:.0f} us, cached read: {:.2f} us".format(direct_us, cached_us))
+    print(cache.stats())
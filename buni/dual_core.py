@@ -0,0 +1,266 @@
+"""
+    ----------------------------------------------------------------------------
+    DUAL-CORE SPLIT (RP2040)
+    > Operation:
+        - start_sensor_core() runs the sampling loop (sensors, rules, LED,
+          relays) on the second core with _thread; the first core keeps
+          WiFi, HTTP and MQTT, so a TLS handshake or a slow API no longer
+          delays a reading. WiFi stays on core 0 because the Pico W radio
+          driver is serviced there
+        - The cores talk through SlotQueue: a fixed number of fixed-size
+          slots in one preallocated bytearray behind a _thread lock. put()
+          copies a message into the next free slot and get_into() copies
+          it out into the caller's buffer, so a message costs no allocation
+          in the queue and the lock is only held for the copy
+        - A full queue or a message longer than a slot is dropped and
+          counted, never blocks the sensor core
+        - The lock counts how often it was already taken (contention)
+        - On CPython the cores are threads; run this file to benchmark
+          queue throughput and lock contention, and the sampling delay
+          with and without the split:  python -m buni.dual_core
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+from array import array
+
+import _thread
+
+# ===== CONFIGURATION =====
+SLOTS = 8              # messages in flight between the cores
+SLOT_SIZE = 512        # bytes per message (an alert digest fits)
+STACK_SIZE = 8192      # bytes of stack for the sensor core thread
+
+class SlotQueue:
+    def __init__(self, slots=SLOTS, size=SLOT_SIZE):
+        self.slots = slots
+        self.size = size
+        self.buf = bytearray(slots * size)
+        self.mv = memoryview(self.buf)
+        self.lengths = array("H", [0] * slots)
+        self.kinds = bytearray(slots)
+        self.head = 0                  # next slot to fill
+        self.tail = 0                  # next slot to read
+        self.count = 0
+        self.lock = _thread.allocate_lock()
+        self.kind = 0                  # kind of the message returned by the last get_into()
+        # Counters
+        self.puts = 0
+        self.gets = 0
+        self.dropped = 0               # queue full
+        self.too_long = 0
+        self.contended = 0             # lock already held when asked for
+
+    def _acquire(self):
+        if not self.lock.acquire(0):
+            self.contended += 1
+            self.lock.acquire()
+
+    def put(self, kind, data):
+        """Copy a message (bytes-like, at most `size` bytes) into the queue; False if dropped."""
+        n = len(data)
+        if n > self.size:
+            self.too_long += 1
+            return False
+        self._acquire()
+        try:
+            if self.count == self.slots:
+                self.dropped += 1
+                return False
+            slot = self.head
+            start = slot * self.size
+            self.mv[start:start + n] = data
+            self.lengths[slot] = n
+            self.kinds[slot] = kind
+            self.head = (slot + 1) % self.slots
+            self.count += 1
+            self.puts += 1
+            return True
+        finally:
+            self.lock.release()
+
+    def get_into(self, out):
+        """
+        Copy the oldest message into `out` (a bytearray of at least `size`
+        bytes). Returns its length, or -1 when the queue is empty; its kind
+        is left in `kind`.
+        """
+        self._acquire()
+        try:
+            if not self.count:
+                return -1
+            slot = self.tail
+            n = self.lengths[slot]
+            start = slot * self.size
+            out[:n] = self.mv[start:start + n]
+            self.kind = self.kinds[slot]
+            self.tail = (slot + 1) % self.slots
+            self.count -= 1
+            self.gets += 1
+            return n
+        finally:
+            self.lock.release()
+
+    def pending(self):
+        return self.count
+
+    def stats(self):
+        return {
+            "puts": self.puts,
+            "gets": self.gets,
+            "pending": self.count,
+            "dropped": self.dropped,
+            "too_long": self.too_long,
+            "contended": self.contended,
+        }
+
+def start_sensor_core(func, *args):
+    """Run func(*args) on the second core (a thread on CPython)."""
+    try:
+        _thread.stack_size(STACK_SIZE)
+    except (AttributeError, ValueError):
+        pass                           # CPython may refuse a small stack; its default is fine
+    return _thread.start_new_thread(func, args)
+
+# ===== BENCHMARK (CPython threads) =====
+if __name__ == "__main__":
+    import threading
+    import time
+    import tracemalloc
+    from collections import deque
+
+    MESSAGES = 200000
+    PAYLOAD = bytearray(range(200))   # like a MessageBuilder buffer; the deque must copy it
+
+    class ListQueue:
+        """The allocating alternative: a deque of bytes copies behind a lock."""
+        def __init__(self):
+            self.items = deque()
+            self.lock = threading.Lock()
+            self.contended = 0
+
+        def put(self, kind, data):
+            if not self.lock.acquire(False):
+                self.contended += 1
+                self.lock.acquire()
+            try:
+                self.items.append((kind, bytes(data)))
+                return True
+            finally:
+                self.lock.release()
+
+        def get_into(self, out):
+            if not self.lock.acquire(False):
+                self.contended += 1
+                self.lock.acquire()
+            try:
+                if not self.items:
+                    return -1
+                kind, data = self.items.popleft()
+            finally:
+                self.lock.release()
+            out[:len(data)] = data
+            return len(data)
+
+    def throughput(queue):
+        out = bytearray(SLOT_SIZE)
+
+        def producer():
+            sent = 0
+            while sent < MESSAGES:
+                if queue.put(1, PAYLOAD):
+                    sent += 1
+                else:
+                    time.sleep(0)          # full: let the consumer run, then retry
+
+        t0 = time.perf_counter()
+        thread = threading.Thread(target=producer)
+        thread.start()
+        got = 0
+        while got < MESSAGES:
+            if queue.get_into(out) >= 0:
+                got += 1
+            else:
+                time.sleep(0)
+        thread.join()
+        return MESSAGES / (time.perf_counter() - t0), queue.contended
+
+    def heap_per_message(queue, n=64):
+        """Heap held by `n` queued messages (the GC's work on the Pico, shared by both cores)."""
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(n):
+            queue.put(1, PAYLOAD)
+        held = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        return held / n
+
+    print("Queue: {} messages of {} B between two threads".format(MESSAGES, len(PAYLOAD)))
+    for name, make in (("SlotQueue", lambda: SlotQueue(64)), ("deque + lock", ListQueue)):
+        heap = heap_per_message(make())
+        rate, contended = throughput(make())
+        print("  {:<12} {:>9.0f} msg/s  heap {:>4.0f} B/message  lock contended {:>4} times ({:.1%})".format(
+            name, rate, heap, contended, contended / (2 * MESSAGES)))
+
+    # Sampling every 50 ms; every 10th cycle the network side blocks for 300 ms (a TLS handshake)
+    PERIOD = 0.05
+    CYCLES = 60
+    NETWORK_BLOCK = 0.3
+
+    def sample():
+        time.sleep(0.002)              # sensor reads and rules
+
+    def network_work(cycle):
+        if cycle % 10 == 9:
+            time.sleep(NETWORK_BLOCK)
+        else:
+            time.sleep(0.001)
+
+    def single():
+        late = []
+        deadline = time.perf_counter()
+        for cycle in range(CYCLES):
+            late.append(max(0.0, time.perf_counter() - deadline))
+            sample()
+            network_work(cycle)
+            deadline += PERIOD
+            time.sleep(max(0.0, deadline - time.perf_counter()))
+        return late
+
+    def dual():
+        queue = SlotQueue()
+        late = []
+        message = bytearray(64)
+
+        def sensor_core():
+            deadline = time.perf_counter()
+            for cycle in range(CYCLES):
+                late.append(max(0.0, time.perf_counter() - deadline))
+                sample()
+                queue.put(1, message)
+                deadline += PERIOD
+                time.sleep(max(0.0, deadline - time.perf_counter()))
+
+        start_sensor_core(sensor_core)
+        out = bytearray(SLOT_SIZE)
+        cycle = 0
+        while cycle < CYCLES:
+            if queue.get_into(out) >= 0:
+                network_work(cycle)
+                cycle += 1
+            else:
+                time.sleep(0.001)
+        while len(late) < CYCLES:
+            time.sleep(0.01)
+        return late, queue
+
+    print("Sampling every {:.0f} ms, network blocks {:.0f} ms every 10th cycle:".format(PERIOD * 1000,
+                                                                                         NETWORK_BLOCK * 1000))
+    late = single()
+    print("  one core   sample late: mean {:5.1f} ms, max {:5.1f} ms".format(
+        sum(late) / len(late) * 1000, max(late) * 1000))
+    late, queue = dual()
+    print("  two cores  sample late: mean {:5.1f} ms, max {:5.1f} ms  queue {}".format(
+        sum(late) / len(late) * 1000, max(late) * 1000, queue.stats()))
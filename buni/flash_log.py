@@ -0,0 +1,222 @@
+"""
+    ----------------------------------------------------------------------------
+    FLASH READING LOG
+    > Operation:
+        - Append-only binary log of readings on the Pico filesystem, so data
+          survives reboots and WiFi outages
+        - Fixed-width 16 byte records (see RECORD_FMT below) in segment files
+          LOG_DIR/segNNNNN.bin; a new segment starts every SEGMENT_SIZE bytes
+        - Records are batched in RAM and written BATCH_RECORDS at a time to
+          limit flash wear / write amplification
+        - Old segments are compacted (averaged down by COMPACT_FACTOR) and
+          the oldest are deleted once MAX_SEGMENTS is reached
+        - Power loss mid-write: a torn record fails its CRC and is skipped by
+          readers; the writer starts a fresh segment after a partial one
+        - Host side reader: log_reader.py
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import os
+import struct
+try:
+    from binascii import crc32
+except ImportError:
+    from zlib import crc32
+
+# ===== CONFIGURATION =====
+LOG_DIR = "log"        # relative to the filesystem root on the Pico
+SEGMENT_SIZE = 16384   # bytes per segment (1024 records)
+BATCH_RECORDS = 16     # records buffered before one flash write
+FULL_SEGMENTS = 4      # newest segments kept at full resolution
+MAX_SEGMENTS = 16      # total segments kept (oldest deleted)
+COMPACT_FACTOR = 12    # records averaged into one when compacting
+
+# ===== RECORD FORMAT =====
+# magic, flags, unix time, temp (0.1 C), humidity (0.1 %), soil (%), tds (ppm), crc16
+RECORD_FMT = "<BBIhhhhH"
+RECORD_SIZE = struct.calcsize(RECORD_FMT)  # 16 bytes
+MAGIC = 0xA5
+FLAG_COMPACTED = 0x01
+MISSING = -32768                   # channel value not available
+SCALES = (10, 10, 1, 1)            # temp, hum, soil, tds stored as value * scale
+
+def _crc(buf, start):
+    return crc32(memoryview(buf)[start:start + RECORD_SIZE - 2]) & 0xFFFF
+
+def _to_int(value, scale):
+    if value is None or value != value:   # None or NaN
+        return MISSING
+    v = int(round(value * scale))
+    return max(-32767, min(32767, v))
+
+def segment_name(number):
+    return "seg{:05d}.bin".format(number)
+
+def list_segments(path=LOG_DIR):
+    """Segment numbers in `path`, oldest first."""
+    numbers = []
+    for name in os.listdir(path):
+        if name.startswith("seg") and name.endswith(".bin"):
+            numbers.append(int(name[3:-4]))
+    numbers.sort()
+    return numbers
+
+def decode(buf, offset=0):
+    """Decode one record: (flags, ts, temp, hum, soil, tds) or None if torn/corrupt."""
+    magic, flags, ts, t, h, s, d, crc = struct.unpack_from(RECORD_FMT, buf, offset)
+    if magic != MAGIC or crc != _crc(buf, offset):
+        return None
+    values = [flags, ts]
+    for raw, scale in zip((t, h, s, d), SCALES):
+        values.append(None if raw == MISSING else raw / scale)
+    return tuple(values)
+
+def _exists(path):
+    try:
+        os.stat(path)
+        return True
+    except OSError:
+        return False
+
+class FlashLog:
+    def __init__(self, path=LOG_DIR, batch=BATCH_RECORDS, segment_size=SEGMENT_SIZE):
+        self.path = path
+        self.batch = batch
+        self.segment_size = segment_size - segment_size % RECORD_SIZE
+        self.buf = bytearray(batch * RECORD_SIZE)
+        self.pending = 0
+        # Counters
+        self.records = 0
+        self.writes = 0
+        self.compactions = 0
+        if not _exists(path):
+            os.mkdir(path)
+        self._recover()
+
+    # --- startup ---
+    def _recover(self):
+        """Finish or undo an interrupted compaction and pick the segment to append to."""
+        for name in os.listdir(self.path):
+            if name.endswith(".tmp"):
+                final = self.path + "/" + name[:-4]
+                tmp = self.path + "/" + name
+                if _exists(final):
+                    os.remove(tmp)            # compaction never finished; redo later
+                else:
+                    os.rename(tmp, final)     # old segment already removed; keep result
+        segments = list_segments(self.path)
+        self.segment = segments[-1] if segments else 1
+        size = self._size(self.segment)
+        if size % RECORD_SIZE or size >= self.segment_size:
+            # torn tail from a power cut (or full): never append after it
+            self.segment += 1
+        self.size = self._size(self.segment)
+
+    def _file(self, number):
+        return self.path + "/" + segment_name(number)
+
+    def _size(self, number):
+        try:
+            return os.stat(self._file(number))[6]
+        except OSError:
+            return 0
+
+    # --- writing ---
+    def append(self, ts, temp, hum, soil, tds, flags=0):
+        """Buffer one reading; written to flash once BATCH_RECORDS are collected."""
+        off = self.pending * RECORD_SIZE
+        struct.pack_into(RECORD_FMT, self.buf, off, MAGIC, flags, int(ts),
+                         _to_int(temp, SCALES[0]), _to_int(hum, SCALES[1]),
+                         _to_int(soil, SCALES[2]), _to_int(tds, SCALES[3]), 0)
+        struct.pack_into("<H", self.buf, off + RECORD_SIZE - 2, _crc(self.buf, off))
+        self.pending += 1
+        self.records += 1
+        if self.pending == self.batch:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered records (a batch never spans two segments)."""
+        if not self.pending:
+            return
+        n = self.pending * RECORD_SIZE
+        if self.size + n > self.segment_size:
+            self._rotate()
+        with open(self._file(self.segment), "ab") as f:
+            f.write(memoryview(self.buf)[:n])
+        self.size += n
+        self.pending = 0
+        self.writes += 1
+
+    def _rotate(self):
+        self.segment += 1
+        self.size = 0
+        segments = list_segments(self.path)
+        full = [n for n in segments if not self._is_compacted(n)]
+        # compact the oldest full-resolution segments beyond FULL_SEGMENTS
+        for number in full[:max(0, len(full) - FULL_SEGMENTS + 1)]:
+            self.compact(number)
+        # drop the oldest segments beyond MAX_SEGMENTS
+        for number in segments[:max(0, len(segments) - MAX_SEGMENTS + 1)]:
+            os.remove(self._file(number))
+
+    # --- compaction ---
+    def _is_compacted(self, number):
+        with open(self._file(number), "rb") as f:
+            head = f.read(RECORD_SIZE)
+        return len(head) == RECORD_SIZE and head[1] & FLAG_COMPACTED
+
+    def compact(self, number, factor=COMPACT_FACTOR):
+        """Average every `factor` records of a segment into one (written via .tmp + rename)."""
+        src = self._file(number)
+        tmp = src + ".tmp"
+        rec = bytearray(RECORD_SIZE)
+        sums = [0.0, 0.0, 0.0, 0.0]
+        counts = [0, 0, 0, 0]
+        group = 0
+        first_ts = 0
+        out = bytearray(RECORD_SIZE)
+        with open(src, "rb") as fin, open(tmp, "wb") as fout:
+            while fin.readinto(rec) == RECORD_SIZE:
+                r = decode(rec)
+                if r is None:
+                    continue
+                if group == 0:
+                    first_ts = r[1]
+                for c in range(4):
+                    if r[2 + c] is not None:
+                        sums[c] += r[2 + c]
+                        counts[c] += 1
+                group += 1
+                if group == factor:
+                    self._write_average(fout, out, first_ts, sums, counts)
+                    group = 0
+            if group:
+                self._write_average(fout, out, first_ts, sums, counts)
+        os.remove(src)
+        os.rename(tmp, src)
+        self.compactions += 1
+
+    def _write_average(self, f, buf, ts, sums, counts):
+        values = []
+        for c in range(4):
+            values.append(_to_int(sums[c] / counts[c], SCALES[c]) if counts[c] else MISSING)
+            sums[c] = 0.0
+            counts[c] = 0
+        struct.pack_into(RECORD_FMT, buf, 0, MAGIC, FLAG_COMPACTED, ts, values[0], values[1], values[2], values[3], 0)
+        struct.pack_into("<H", buf, RECORD_SIZE - 2, _crc(buf, 0))
+        f.write(buf)
+
+    # --- reading (on device) ---
+    def read(self):
+        """Yield every valid record (flags, ts, temp, hum, soil, tds), oldest first."""
+        self.flush()
+        rec = bytearray(RECORD_SIZE)
+        for number in list_segments(self.path):
+            with open(self._file(number), "rb") as f:
+                while f.readinto(rec) == RECORD_SIZE:
+                    r = decode(rec)
+                    if r is not None:
+                        yield r
@@ -0,0 +1,116 @@
+"""
+    ----------------------------------------------------------------------------
+    GATEWAY FRAMES
+    > Operation:
+        - Compact binary frames sent from the Pico nodes to the fleet gateway
+          (gateway/), shared by the device and the gateway
+        - Reading frame (20 bytes): header + temp, humidity, soil, TDS scaled
+          like the flash log records
+        - Several frames can be packed into one UDP datagram / TCP write
+        - Nodes send readings only: the gateway applies the alert rules to
+          every reading itself (gateway/rules.py)
+        - GatewayUplink: device side UDP sender with a preallocated buffer;
+          with a DeltaEncoder (deadband.py) it sends only changed readings
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import struct
+
+from buni.flash_log import MISSING, SCALES, _to_int
+from buni.node import node_id
+
+# ===== FRAME FORMAT =====
+MAGIC = 0xB7
+KIND_READING = 1
+
+HEADER_FMT = "<BBHII"                 # magic, kind, sequence, node id, unix time
+READING_FMT = "<hhhh"                 # temp (0.1 C), hum (0.1 %), soil (%), tds (ppm)
+HEADER_SIZE = struct.calcsize(HEADER_FMT)
+READING_SIZE = HEADER_SIZE + struct.calcsize(READING_FMT)
+FRAME_SIZES = {KIND_READING: READING_SIZE}
+
+def encode_reading(buf, offset, node, seq, ts, temp, hum, soil, tds):
+    """Pack a reading frame into buf at offset; returns the offset after it."""
+    struct.pack_into(HEADER_FMT, buf, offset, MAGIC, KIND_READING, seq & 0xFFFF, node, int(ts))
+    struct.pack_into(READING_FMT, buf, offset + HEADER_SIZE, _to_int(temp, SCALES[0]), _to_int(hum, SCALES[1]),
+                     _to_int(soil, SCALES[2]), _to_int(tds, SCALES[3]))
+    return offset + READING_SIZE
+
+def decode(buf, offset=0):
+    """
+    Decode one frame at offset. Returns (frame, next_offset) where frame is
+    (kind, node, seq, ts, payload); payload is (temp, hum, soil, tds).
+    Returns (None, len(buf)) on garbage.
+    """
+    if len(buf) - offset < HEADER_SIZE:
+        return None, len(buf)
+    magic, kind, seq, node, ts = struct.unpack_from(HEADER_FMT, buf, offset)
+    size = FRAME_SIZES.get(kind)
+    if magic != MAGIC or size is None or len(buf) - offset < size:
+        return None, len(buf)
+    raw = struct.unpack_from(READING_FMT, buf, offset + HEADER_SIZE)
+    payload = tuple(None if r == MISSING else r / s for r, s in zip(raw, SCALES))
+    return (kind, node, seq, ts, payload), offset + size
+
+def decode_all(buf):
+    """Yield every frame in a datagram / stream chunk."""
+    offset = 0
+    while offset < len(buf):
+        frame, offset = decode(buf, offset)
+        if frame is None:
+            return
+        yield frame
+
+# ===== DEVICE SIDE =====
+class GatewayUplink:
+    """Sends reading frames to the gateway over UDP (fire and forget)."""
+    def __init__(self, host, port, node=None, max_frames=8, delta=False):
+        try:
+            import usocket as socket
+        except ImportError:
+            import socket
+        self.node = node_id() if node is None else node
+        self.delta = None
+        if delta:
+            from buni.deadband import DeltaEncoder
+            self.delta = DeltaEncoder(self.node)
+        self.addr = socket.getaddrinfo(host, port)[0][-1]
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.buf = bytearray(max_frames * READING_SIZE)
+        self.used = 0
+        self.seq = 0
+        self.sent = 0
+        self.errors = 0
+
+    def _room(self, size):
+        if self.used + size > len(self.buf):
+            self.flush()
+
+    def reading(self, ts, temp, hum, soil, tds):
+        if self.delta is not None:
+            n = self.delta.update(ts, temp, hum, soil, tds)
+            if n:
+                self._room(n)
+                self.buf[self.used:self.used + n] = self.delta.frame(n)
+                self.used += n
+            return
+        self._room(READING_SIZE)
+        self.seq += 1
+        self.used = encode_reading(self.buf, self.used, self.node, self.seq, ts, temp, hum, soil, tds)
+
+    def flush(self):
+        """Send all queued frames in one datagram."""
+        if not self.used:
+            return
+        try:
+            self.sock.sendto(memoryview(self.buf)[:self.used], self.addr)
+            self.sent += 1
+        except OSError as e:
+            self.errors += 1
+            print("Gateway send error:", e)
+            if self.delta is not None:
+                self.delta.force_keyframe()    # the gateway missed a delta
+        self.used = 0
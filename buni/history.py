@@ -0,0 +1,86 @@
+"""
+    ----------------------------------------------------------------------------
+    READING HISTORY
+    > Operation:
+        - Keeps the last N readings of every sensor channel in RAM
+        - Columnar ring buffer: one array per channel plus one for timestamps,
+          so memory use is fixed: capacity * (4 + 4 * channels) bytes
+        - append() is O(1); window() / values() iterate over the last n
+          readings without copying
+        - Missing readings (None) are stored as NaN
+        - Shared by main.py, soil-moisture-monitor.py and temperature_control.py
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+from array import array
+
+# ===== CONFIGURATION =====
+HISTORY_SIZE = 360     # readings kept (30 min at a 5 s sample interval)
+NAN = float("nan")
+
+class History:
+    __slots__ = ("capacity", "names", "ts", "columns", "_next", "_count")
+
+    def __init__(self, names, capacity=HISTORY_SIZE):
+        self.capacity = capacity
+        self.names = tuple(names)
+        self.ts = array("I", [0] * capacity)      # unix seconds
+        self.columns = [array("f", [NAN] * capacity) for _ in self.names]
+        self._next = 0     # slot the next reading goes into
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, ts, *values):
+        """Add one reading: a timestamp and one value per channel, in `names` order."""
+        i = self._next
+        self.ts[i] = int(ts)
+        columns = self.columns
+        for c in range(len(columns)):
+            v = values[c]
+            columns[c][i] = NAN if v is None else v
+        self._next = (i + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def column(self, name):
+        return self.columns[self.names.index(name)]
+
+    def window(self, n=None):
+        """Yield buffer indexes of the last n readings, oldest first."""
+        count = self._count
+        if n is None or n > count:
+            n = count
+        cap = self.capacity
+        i = (self._next - n) % cap
+        for _ in range(n):
+            yield i
+            i += 1
+            if i == cap:
+                i = 0
+
+    def values(self, name, n=None):
+        """Yield (timestamp, value) for the last n readings of one channel, oldest first."""
+        col = self.column(name)
+        ts = self.ts
+        for i in self.window(n):
+            yield ts[i], col[i]
+
+    def latest(self, name):
+        """Most recent value of a channel, or None if there is none yet."""
+        if not self._count:
+            return None
+        return self.column(name)[(self._next - 1) % self.capacity]
+
+# ===== DEMO =====
+if __name__ == "__main__":
+    h = History(("temp", "hum"), capacity=5)
+    for t in range(8):
+        h.append(1000 + 5 * t, 20.0 + t, None if t == 3 else 50.0 - t)
+    print("len:", len(h), "latest temp:", h.latest("temp"))
+    for ts, hum in h.values("hum", 3):
+        print(ts, hum)
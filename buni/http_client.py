@@ -0,0 +1,275 @@
+"""
+    ----------------------------------------------------------------------------
+    KEEP-ALIVE HTTP CLIENT
+    > Operation:
+        - Minimal HTTP/1.1 GET client shared by the Telegram and CallMeBot
+          notifiers; post() sends a body (the batch uploader, upload.py)
+        - Keeps one open (TLS) socket per host and reuses it between alerts,
+          so the handshake is paid once instead of on every message
+        - Reconnects once automatically if a reused socket turns out dead
+        - Reads responses into one preallocated buffer (body is truncated to
+          the buffer size; the rest is read and discarded)
+        - The path may be a str, bytes or a memoryview (e.g. a
+          MessageBuilder view); the request is written into a reused buffer
+          and sent with one write, without building strings
+        - Run this file on CPython for a local keep-alive vs new-connection
+          benchmark
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+try:
+    import usocket as socket
+except ImportError:
+    import socket
+try:
+    import ussl as ssl
+except ImportError:
+    import ssl
+
+from buni.msgbuild import MessageBuilder, URL_SIZE
+
+# ===== CONFIGURATION =====
+BUFFER_SIZE = 1024     # bytes kept from each response (headers + body)
+REQUEST_SIZE = URL_SIZE + 256  # request line and headers: a notification path and room for the headers
+TIMEOUT = 10           # socket timeout in seconds
+
+def _wrap_tls(sock, host):
+    if hasattr(ssl, "create_default_context"):
+        # CPython
+        return ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+    return ssl.wrap_socket(sock, server_hostname=host)
+
+def _recv_into(sock, mv):
+    if hasattr(sock, "recv_into"):
+        return sock.recv_into(mv)
+    return sock.readinto(mv)
+
+def _send_all(sock, data):
+    if hasattr(sock, "sendall"):
+        sock.sendall(data)
+    else:
+        sock.write(data)
+
+class KeepAliveClient:
+    """
+    One persistent connection per host.
+    `resolve` maps a host name to an (ip, port) to connect to instead, while
+    still sending the real Host header (used to point the notifiers at a
+    local stand-in server).
+    """
+    def __init__(self, tls=True, port=443, keep_alive=True, buf_size=BUFFER_SIZE,
+                 timeout=TIMEOUT, resolve=None):
+        self.tls = tls
+        self.port = port
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.resolve = resolve or {}
+        self.buf = bytearray(buf_size)
+        self.mv = memoryview(self.buf)
+        self.body_len = 0
+        self.req = MessageBuilder(REQUEST_SIZE)
+        self._hosts = {}               # host -> encoded name, made once per host
+        self._conns = {}
+        # Counters
+        self.requests = 0
+        self.connects = 0
+        self.reconnects = 0
+
+    # --- connection pool ---
+    def _connect(self, host):
+        addr_host, addr_port = self.resolve.get(host, (host, self.port))
+        addr = socket.getaddrinfo(addr_host, addr_port, 0, socket.SOCK_STREAM)[0][-1]
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(addr)
+            if self.tls:
+                sock = _wrap_tls(sock, host)
+        except Exception:
+            sock.close()
+            raise
+        self.connects += 1
+        self._conns[host] = sock
+        return sock
+
+    def close(self, host=None):
+        """Close the connection to one host, or all of them."""
+        hosts = [host] if host is not None else list(self._conns)
+        for h in hosts:
+            sock = self._conns.pop(h, None)
+            if sock is not None:
+                try:
+                    sock.close()
+                except Exception:
+                    pass
+
+    # --- requests ---
+    def get(self, host, path):
+        """
+        GET `path` (str, bytes or memoryview, already URL encoded) from
+        `host`. Returns the status code; the body is in body() until the
+        next request.
+        """
+        return self._send(host, path, None, None, None)
+
+    def post(self, host, path, data, content_type=b"application/octet-stream", encoding=None):
+        """
+        POST `data` (bytes-like) to `path` on `host`, with a Content-Encoding
+        header when `encoding` is given. Returns the status code like get().
+        """
+        return self._send(host, path, data, content_type, encoding)
+
+    def _send(self, host, path, data, content_type, encoding):
+        self.requests += 1
+        sock = self._conns.get(host)
+        if sock is not None:
+            try:
+                return self._request(sock, host, path, data, content_type, encoding)
+            except OSError:
+                # server dropped the idle connection; try once more on a fresh one
+                self.close(host)
+                self.reconnects += 1
+        sock = self._connect(host)
+        try:
+            return self._request(sock, host, path, data, content_type, encoding)
+        except Exception:
+            self.close(host)
+            raise
+
+    def body(self):
+        """Memoryview of the last response body (truncated to the buffer size)."""
+        return self.mv[:self.body_len]
+
+    def _request(self, sock, host, path, data=None, content_type=None, encoding=None):
+        name = self._hosts.get(host)
+        if name is None:
+            name = self._hosts[host] = host.encode()
+        req = self.req.reset()
+        req.write(b"GET " if data is None else b"POST ").write(path).write(b" HTTP/1.1\r\nHost: ").write(name)
+        if data is not None:
+            req.write(b"\r\nContent-Type: ").write(content_type)
+            req.write(b"\r\nContent-Length: ").write_int(len(data))
+            if encoding:
+                req.write(b"\r\nContent-Encoding: ").write(encoding)
+        req.write(b"\r\nConnection: keep-alive\r\n\r\n" if self.keep_alive else b"\r\nConnection: close\r\n\r\n")
+        if req.truncated:
+            req.truncated = 0
+            raise ValueError("request longer than REQUEST_SIZE")
+        _send_all(sock, req.view())
+        if data is not None:
+            _send_all(sock, data)
+
+        # Read until the end of the headers
+        buf, mv = self.buf, self.mv
+        n = 0
+        while True:
+            end = buf.find(b"\r\n\r\n", 0, n)
+            if end >= 0:
+                break
+            if n == len(buf):
+                raise OSError("HTTP headers larger than buffer")
+            got = _recv_into(sock, mv[n:])
+            if not got:
+                raise OSError("connection closed")
+            n += got
+
+        lines = bytes(mv[:end]).decode().split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        length = -1
+        reusable = self.keep_alive
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            name = name.strip().lower()
+            value = value.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection" and value == "close":
+                reusable = False
+            elif name == "transfer-encoding" and value == "chunked":
+                # not parsed; read to EOF and drop the connection
+                reusable = False
+
+        # Move the body bytes already received to the front of the buffer
+        start = end + 4
+        have = n - start
+        mv[:have] = mv[start:n]
+        if length < 0:
+            reusable = False
+        else:
+            have = min(have, length)
+        self.body_len = self._read_body(sock, have, length)
+
+        if not reusable:
+            self.close(host)
+        return status
+
+    def _read_body(self, sock, have, length):
+        """Read the rest of the body; bytes past the buffer end are discarded."""
+        mv = self.mv
+        size = len(mv)
+        total = have
+        kept = have
+        while length < 0 or total < length:
+            if kept < size:
+                want = size - kept if length < 0 else min(size - kept, length - total)
+                got = _recv_into(sock, mv[kept:kept + want])
+                kept += got
+            else:
+                # buffer full: reuse its last part as scratch space
+                want = 256 if length < 0 else min(256, length - total)
+                got = _recv_into(sock, mv[size - want:])
+            if not got:
+                if length < 0:
+                    break
+                raise OSError("connection closed mid-body")
+            total += got
+        return min(kept, size)
+
+# ===== BENCHMARK (CPython) =====
+if __name__ == "__main__":
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _FakeApi(BaseHTTPRequestHandler):
+        """Stands in for api.telegram.org and api.callmebot.com."""
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            if self.path.startswith("/whatsapp.php"):
+                body = b"Message queued. You will receive it in a few seconds."
+            else:
+                body = b'{"ok":true,"result":{"message_id":1}}'
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeApi)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    local = {"api.telegram.org": ("127.0.0.1", port),
+             "api.callmebot.com": ("127.0.0.1", port)}
+
+    sends = 500
+    for keep_alive in (False, True):
+        client = KeepAliveClient(tls=False, keep_alive=keep_alive, resolve=local)
+        t0 = time.perf_counter()
+        for i in range(sends):
+            if i % 2:
+                client.get("api.telegram.org", "/botTOKEN/sendMessage?chat_id=1&text=hi")
+            else:
+                client.get("api.callmebot.com", "/whatsapp.php?phone=1&text=hi&apikey=k")
+        elapsed = time.perf_counter() - t0
+        client.close()
+        print("keep-alive" if keep_alive else "new connection",
+              "-> {:.0f} sends/s, {} connects for {} sends".format(
+                  sends / elapsed, client.connects, sends))
+    server.shutdown()
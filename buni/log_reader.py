@@ -0,0 +1,77 @@
+"""
+    ----------------------------------------------------------------------------
+    FLASH LOG READER (host side, CPython)
+    > Operation:
+        - Reads the segment files written by flash_log.py after copying the
+          log folder off the Pico (e.g. `mpremote cp -r :/log .`)
+        - Memory-maps each segment and decodes records straight from the map
+        - Skips torn / corrupt records (bad magic or CRC)
+        - Usage: python -m buni.log_reader <log dir> [--csv out.csv]
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import mmap
+import os
+import struct
+import sys
+from zlib import crc32
+
+from buni.flash_log import RECORD_FMT, RECORD_SIZE, MAGIC, MISSING, SCALES, FLAG_COMPACTED, list_segments, segment_name
+
+def read_segment(path):
+    """Yield (flags, ts, temp, hum, soil, tds) for every valid record of one segment file."""
+    size = os.path.getsize(path)
+    usable = size - size % RECORD_SIZE
+    if not usable:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            for offset in range(0, usable, RECORD_SIZE):
+                magic, flags, ts, t, h, s, d, crc = struct.unpack_from(RECORD_FMT, view, offset)
+                if magic != MAGIC or crc != crc32(view[offset:offset + RECORD_SIZE - 2]) & 0xFFFF:
+                    continue
+                yield (flags, ts,
+                       None if t == MISSING else t / SCALES[0],
+                       None if h == MISSING else h / SCALES[1],
+                       None if s == MISSING else s / SCALES[2],
+                       None if d == MISSING else d / SCALES[3])
+        finally:
+            view.release()
+
+def read_log(log_dir):
+    """Yield every valid record in the log folder, oldest segment first."""
+    for number in list_segments(log_dir):
+        yield from read_segment(os.path.join(log_dir, segment_name(number)))
+
+def main(argv):
+    if not argv:
+        print("Usage: python -m buni.log_reader <log dir> [--csv out.csv]")
+        return
+    log_dir = argv[0]
+    out = None
+    if len(argv) > 2 and argv[1] == "--csv":
+        out = open(argv[2], "w")
+        out.write("ts,compacted,temp_c,hum_pct,soil_pct,tds_ppm\n")
+    count = compacted = 0
+    first = last = None
+    for flags, ts, temp, hum, soil, tds in read_log(log_dir):
+        count += 1
+        compacted += bool(flags & FLAG_COMPACTED)
+        if first is None:
+            first = ts
+        last = ts
+        if out:
+            out.write("{},{},{},{},{},{}\n".format(
+                ts, int(bool(flags & FLAG_COMPACTED)),
+                "" if temp is None else temp, "" if hum is None else hum,
+                "" if soil is None else soil, "" if tds is None else tds))
+    if out:
+        out.close()
+    print("Records: {} ({} compacted), time span: {} -> {}".format(count, compacted, first, last))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
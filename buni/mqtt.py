@@ -0,0 +1,502 @@
+"""
+    ----------------------------------------------------------------------------
+    MQTT PUBLISHER
+    > Operation:
+        - Minimal MQTT 3.1.1 client for telemetry and alerts: CONNECT,
+          PUBLISH (QoS 0 and 1), PUBACK, PINGREQ, DISCONNECT
+        - One persistent connection; the socket is non-blocking and poll()
+          does all network work (connect, send, acks, pings, reconnects),
+          so it never holds up the sampling loop
+        - QoS 1 messages wait in a small in-flight window until the broker
+          acknowledges them and are resent (DUP) after a timeout or a
+          reconnect; publish() refuses new ones while the window is full
+        - Keep-alive: PINGREQ when idle; a missing PINGRESP drops the
+          connection and reconnects with exponential backoff
+        - ReadingBatch packs several readings (frames.py format) into one
+          PUBLISH payload
+        - TelemetryPublisher sends batched readings, statistics summaries
+          (stats.py frames) and alerts under one topic prefix
+        - MQTTChannel gives a topic the send(message) -> bool interface of
+          the notifiers, so it can sit behind a NotificationQueue
+        - Run this file on CPython for a local MQTT vs HTTP benchmark
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import time
+try:
+    import usocket as socket
+except ImportError:
+    import socket
+try:
+    import uselect as select
+except ImportError:
+    import select
+
+from buni import frames
+
+try:
+    from time import ticks_ms, ticks_add, ticks_diff
+except ImportError:
+    # CPython fallback
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_add(t, delta):
+        return t + delta
+
+    def ticks_diff(a, b):
+        return a - b
+
+# ===== CONFIGURATION =====
+KEEPALIVE = 60           # seconds; a PINGREQ is sent after KEEPALIVE / 2 idle
+INFLIGHT = 4             # unacknowledged QoS 1 messages allowed
+RETRY_MS = 5000          # resend an unacknowledged QoS 1 message after this
+CONNECT_TIMEOUT_MS = 5000
+BACKOFF_MIN_MS = 1000    # reconnect delay, doubled after every failure
+BACKOFF_MAX_MS = 60000
+TX_LIMIT = 2048          # bytes waiting to be written; QoS 0 beyond this is dropped
+BATCH_READINGS = 12      # readings per telemetry PUBLISH (1 min at 5 s)
+
+# Connection states
+DISCONNECTED = 0
+CONNECTING = 1           # TCP connect in progress
+WAIT_CONNACK = 2
+CONNECTED = 3
+
+# Packet types (upper nibble of the fixed header)
+_CONNECT = 0x10
+_CONNACK = 0x20
+_PUBLISH = 0x30
+_PUBACK = 0x40
+_PINGREQ = 0xC0
+_PINGRESP = 0xD0
+_DISCONNECT = 0xE0
+_DUP = 0x08
+
+def _remaining_length(n):
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        out.append(byte | 0x80 if n else byte)
+        if not n:
+            return out
+
+def _string(s):
+    if isinstance(s, str):
+        s = s.encode()
+    return bytes((len(s) >> 8, len(s) & 0xFF)) + s
+
+class MQTTClient:
+    def __init__(self, client_id, host, port=1883, keepalive=KEEPALIVE, inflight=INFLIGHT,
+                 clean_session=False):
+        self.client_id = client_id
+        self.host = host
+        self.port = port
+        self.keepalive = keepalive
+        self.window = inflight
+        self.clean_session = clean_session
+        self.state = DISCONNECTED
+        self.sock = None
+        self.poller = None
+        self.addr = None
+        self.tx = bytearray()
+        self.rx = bytearray()
+        self.inflight = {}             # packet id -> [packet, sent ms (None: not yet), queued ms]
+        self.next_pid = 1
+        self.backoff_ms = BACKOFF_MIN_MS
+        self.retry_at = ticks_ms()
+        self.state_since = ticks_ms()
+        self.last_tx = ticks_ms()
+        self.ping_sent = None
+        # Counters
+        self.published = 0
+        self.acked = 0
+        self.dropped = 0               # QoS 0 publishes refused (not connected / buffer full)
+        self.resent = 0
+        self.connects = 0
+        self.failures = 0
+        self.pings = 0
+        self.ack_ms_total = 0
+        self.ack_ms_max = 0
+
+    def connected(self):
+        return self.state == CONNECTED
+
+    # --- publishing ---
+    def publish(self, topic, payload, qos=0, retain=False):
+        """
+        Queue one PUBLISH. Returns False when it cannot be taken now (QoS 1
+        window full, or not connected / send buffer full for QoS 0).
+        """
+        if isinstance(payload, str):
+            payload = payload.encode()
+        topic = _string(topic)
+        if qos:
+            if len(self.inflight) >= self.window:
+                return False
+            pid = self.next_pid
+            self.next_pid = pid % 0xFFFF + 1
+            body = len(topic) + 2 + len(payload)
+            packet = bytearray((_PUBLISH | 0x02 | retain,))
+            packet += _remaining_length(body)
+            packet += topic
+            packet += bytes((pid >> 8, pid & 0xFF))
+            packet += payload
+            now = ticks_ms()
+            self.inflight[pid] = [packet, now if self.state == CONNECTED else None, now]
+            self._write(packet)
+            self.published += 1
+            return True
+        if self.state != CONNECTED or len(self.tx) + len(topic) + len(payload) + 5 > TX_LIMIT:
+            self.dropped += 1
+            return False
+        self.tx.append(_PUBLISH | retain)
+        self.tx += _remaining_length(len(topic) + len(payload))
+        self.tx += topic
+        self.tx += payload
+        self.published += 1
+        self._flush()
+        return True
+
+    def pending(self):
+        """QoS 1 messages not acknowledged yet."""
+        return len(self.inflight)
+
+    def idle(self):
+        """True when nothing is waiting to be written or acknowledged."""
+        return not self.tx and not self.inflight
+
+    # --- connection upkeep ---
+    def poll(self):
+        """Do whatever network work is due; never blocks. Call often (e.g. every 100 ms)."""
+        now = ticks_ms()
+        try:
+            if self.state == DISCONNECTED:
+                if ticks_diff(now, self.retry_at) >= 0:
+                    self._start_connect()
+                return
+            if self.state != CONNECTED and ticks_diff(now, self.state_since) > CONNECT_TIMEOUT_MS:
+                raise OSError("connect timeout")
+            if self.state == CONNECTING:
+                if self.poller.poll(0):
+                    self._send_connect()
+                return
+            self._read()
+            if self.state == CONNECTED:
+                self._upkeep(now)
+            self._flush()
+        except OSError as e:
+            self._lost(e)
+
+    def _start_connect(self):
+        if self.addr is None:
+            self.addr = socket.getaddrinfo(self.host, self.port, 0, socket.SOCK_STREAM)[0][-1]
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setblocking(False)
+        try:
+            self.sock.connect(self.addr)
+        except OSError as e:
+            if e.args[0] not in (115, 119):    # EINPROGRESS (Linux, lwIP)
+                raise
+        self.poller = select.poll()
+        self.poller.register(self.sock, select.POLLOUT)
+        self._set_state(CONNECTING)
+
+    def _send_connect(self):
+        flags = 0x02 if self.clean_session else 0x00
+        body = bytearray(b"\x00\x04MQTT\x04")
+        body.append(flags)
+        body += bytes((self.keepalive >> 8, self.keepalive & 0xFF))
+        body += _string(self.client_id)
+        self.tx = bytearray((_CONNECT,)) + _remaining_length(len(body)) + body
+        self.rx = bytearray()
+        self.poller.modify(self.sock, select.POLLIN)
+        self._set_state(WAIT_CONNACK)
+        self._flush()
+
+    def _upkeep(self, now):
+        if self.ping_sent is not None:
+            if ticks_diff(now, self.ping_sent) > self.keepalive * 500:
+                raise OSError("no PINGRESP")
+        elif ticks_diff(now, self.last_tx) > self.keepalive * 500:
+            self.tx += bytes((_PINGREQ, 0))
+            self.ping_sent = now
+            self.pings += 1
+        for entry in self.inflight.values():
+            if entry[1] is not None and ticks_diff(now, entry[1]) > RETRY_MS:
+                self._resend(entry, now)
+
+    def _resend(self, entry, now):
+        entry[0][0] |= _DUP
+        entry[1] = now
+        self.resent += 1
+        self._write(entry[0])
+
+    def _set_state(self, state):
+        self.state = state
+        self.state_since = ticks_ms()
+
+    def _lost(self, error):
+        print("MQTT connection lost:", error)
+        self.close()
+        self.failures += 1
+        self.retry_at = ticks_add(ticks_ms(), self.backoff_ms)
+        self.backoff_ms = min(self.backoff_ms * 2, BACKOFF_MAX_MS)
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+        self.tx = bytearray()
+        self.ping_sent = None
+        self._set_state(DISCONNECTED)
+
+    def disconnect(self):
+        """Write out what is queued plus a DISCONNECT (blocking, best effort) and close."""
+        if self.state == CONNECTED:
+            self.tx += bytes((_DISCONNECT, 0))
+            try:
+                self.sock.setblocking(True)
+                self._flush()
+            except OSError:
+                pass
+        self.close()
+
+    # --- socket I/O ---
+    def _write(self, data):
+        if self.state == CONNECTED:
+            self.tx += data
+
+    def _flush(self):
+        while self.tx:
+            try:
+                n = self.sock.send(self.tx)
+            except OSError as e:
+                if e.args[0] == 11:            # EAGAIN: socket buffer full, try next poll
+                    return
+                raise
+            if not n:
+                return
+            del self.tx[:n]
+            self.last_tx = ticks_ms()
+
+    def _read(self):
+        while True:
+            try:
+                chunk = self.sock.recv(256)
+            except OSError as e:
+                if e.args[0] == 11:
+                    break
+                raise
+            if chunk is None:
+                break
+            if not chunk:
+                raise OSError("closed by broker")
+            self.rx += chunk
+            if len(chunk) < 256:
+                break
+        while self._packet():
+            pass
+
+    def _packet(self):
+        """Handle one complete packet from rx; False when none is complete."""
+        rx = self.rx
+        if len(rx) < 2:
+            return False
+        length = 0
+        shift = 0
+        i = 1
+        while True:
+            if i >= len(rx):
+                return False
+            length |= (rx[i] & 0x7F) << shift
+            shift += 7
+            i += 1
+            if not rx[i - 1] & 0x80:
+                break
+        if len(rx) < i + length:
+            return False
+        kind = rx[0] & 0xF0
+        body = rx[i:i + length]
+        del rx[:i + length]
+        if kind == _CONNACK:
+            if body[1] != 0:
+                raise OSError("CONNACK refused: {}".format(body[1]))
+            self._connected(session=body[0] & 1)
+        elif kind == _PUBACK:
+            pid = (body[0] << 8) | body[1]
+            entry = self.inflight.pop(pid, None)
+            if entry is not None:
+                took = ticks_diff(ticks_ms(), entry[2])
+                self.acked += 1
+                self.ack_ms_total += took
+                if took > self.ack_ms_max:
+                    self.ack_ms_max = took
+        elif kind == _PINGRESP:
+            self.ping_sent = None
+        return True
+
+    def _connected(self, session):
+        self._set_state(CONNECTED)
+        self.connects += 1
+        self.backoff_ms = BACKOFF_MIN_MS
+        now = ticks_ms()
+        # anything not acknowledged before the drop goes (again), in order
+        for pid in sorted(self.inflight):
+            entry = self.inflight[pid]
+            if entry[1] is None:
+                entry[1] = now
+                self._write(entry[0])
+            else:
+                self._resend(entry, now)
+
+    def stats(self):
+        return {"state": self.state, "published": self.published, "acked": self.acked,
+                "inflight": len(self.inflight), "dropped": self.dropped, "resent": self.resent,
+                "connects": self.connects, "failures": self.failures, "pings": self.pings,
+                "ack_ms_mean": self.ack_ms_total / self.acked if self.acked else 0,
+                "ack_ms_max": self.ack_ms_max}
+
+class ReadingBatch:
+    """Packs up to `size` readings as frames.py reading frames into one payload."""
+    def __init__(self, node, size=BATCH_READINGS):
+        self.node = node
+        self.buf = bytearray(size * frames.READING_SIZE)
+        self.used = 0
+        self.seq = 0
+
+    def add(self, ts, temp, hum, soil, tds):
+        """Append one reading; True when the batch is full."""
+        self.seq += 1
+        self.used = frames.encode_reading(self.buf, self.used, self.node, self.seq, ts, temp, hum, soil, tds)
+        return self.used + frames.READING_SIZE > len(self.buf)
+
+    def __len__(self):
+        return self.used // frames.READING_SIZE
+
+    def payload(self):
+        return memoryview(self.buf)[:self.used]
+
+    def clear(self):
+        self.used = 0
+
+class TelemetryPublisher:
+    """
+    Readings go out in batches on <prefix>/readings (QoS 0), statistics
+    summaries on <prefix>/stats (QoS 0); `alerts` is an MQTTChannel for
+    <prefix>/alerts (QoS 1).
+    """
+    def __init__(self, client, prefix, node, batch=BATCH_READINGS):
+        self.client = client
+        self.topic = prefix + "/readings"
+        self.batch = ReadingBatch(node, batch)
+        self.stats_topic = prefix + "/stats"
+        self.alerts = MQTTChannel(client, prefix + "/alerts")
+        self.lost = 0                  # readings in batches that could not be sent
+        self.lost_summaries = 0
+
+    def reading(self, ts, temp, hum, soil, tds):
+        if self.batch.add(ts, temp, hum, soil, tds):
+            if not self.client.publish(self.topic, self.batch.payload()):
+                self.lost += len(self.batch)
+            self.batch.clear()
+
+    def summary(self, frame):
+        """Publish a StreamStats.pack() frame (time + every derived value)."""
+        if not self.client.publish(self.stats_topic, frame):
+            self.lost_summaries += 1
+
+class MQTTChannel:
+    """A topic with the notifier interface: send(message) -> bool."""
+    def __init__(self, client, topic, qos=1):
+        self.client = client
+        self.topic = topic
+        self.qos = qos
+
+    def send(self, message):
+        if not self.client.connected():
+            return False
+        return self.client.publish(self.topic, message, self.qos)
+
+# ===== BENCHMARK (CPython) =====
+if __name__ == "__main__":
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from buni.http_client import KeepAliveClient
+    from sim.broker import Broker
+
+    class _FakeApi(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            body = b'{"ok":true,"result":{"message_id":1}}'
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    api = ThreadingHTTPServer(("127.0.0.1", 0), _FakeApi)
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+    broker = Broker()
+    sends = 2000
+    text = "Greenhouse 1: Temp 31.2C Hum 38.5% Soil 42% TDS 640ppm"
+
+    # HTTP path: one GET per message with the text in the query string
+    http = KeepAliveClient(tls=False, resolve={"api.telegram.org": api.server_address})
+    path = "/botTOKEN/sendMessage?chat_id=64854828&text=" + text.replace(" ", "%20")
+    request_bytes = len("GET {} HTTP/1.1\r\nHost: api.telegram.org\r\nConnection: keep-alive\r\n\r\n".format(path))
+    t0 = time.perf_counter()
+    for _ in range(sends):
+        http.get("api.telegram.org", path)
+    elapsed = time.perf_counter() - t0
+    http.close()
+    print("HTTP GET (keep-alive)  {:>8.0f} msg/s  {:>6.2f} ms/msg  {:>4} B/msg sent".format(
+        sends / elapsed, elapsed * 1000 / sends, request_bytes))
+
+    def run_mqtt(label, publish, count, per_msg_bytes, unit="msg"):
+        client = MQTTClient("bench", "127.0.0.1", broker.port)
+        while not client.connected():
+            client.poll()
+        expected = broker.received + count
+        t0 = time.perf_counter()
+        done = 0
+        while done < count or not client.idle():
+            while done < count and publish(client, done):
+                done += 1
+            client.poll()
+        while broker.received < expected:     # QoS 0: until the broker has them all
+            time.sleep(0.0005)
+        elapsed = time.perf_counter() - t0
+        client.disconnect()
+        print("{:<22} {:>8.0f} {}/s  {:>6.3f} ms/{}  {:>4} B/{} sent  ack mean {:.2f} ms".format(
+            label, count / elapsed, unit, elapsed * 1000 / count, unit, per_msg_bytes, unit,
+            client.stats()["ack_ms_mean"]))
+
+    topic = "buni/0000abcd/alerts"
+    publish_bytes = 2 + 2 + len(topic) + 2 + len(text)
+    run_mqtt("MQTT QoS1 (window 4)", lambda c, i: c.publish(topic, text, 1), sends, publish_bytes)
+
+    batch = ReadingBatch(0xABCD)
+    while len(batch) < BATCH_READINGS:
+        batch.add(1748736000 + len(batch) * 5, 24.5, 55.0, 40, 620)
+    payload = bytes(batch.payload())
+    batch_topic = "buni/0000abcd/readings"
+    publish_bytes = 2 + 2 + len(batch_topic) + len(payload)
+    run_mqtt("MQTT QoS0 batch of {}".format(BATCH_READINGS),
+             lambda c, i: c.publish(batch_topic, payload, 0), sends, publish_bytes, "batch")
+    print("  = {} B per reading".format(publish_bytes // BATCH_READINGS))
+    print("Broker received", broker.received, "publishes")
+    broker.close()
+    api.shutdown()
@@ -0,0 +1,66 @@
+"""
+    ----------------------------------------------------------------------------
+    LAZY NETWORK STACK
+    > Operation:
+        - One place the device scripts get their network objects from; the
+          modules behind them (wifi_manager, http_client, circuit_breaker,
+          frames, deadband, mqtt, upload and `network` itself) are imported on the
+          first call instead of at boot
+        - After a reset the first reading therefore only waits for the
+          sensor modules; the network stack loads on the first WiFi tick
+          or the first message sent
+        - wifi(): the shared WiFiManager; http(): the shared keep-alive
+          client with a circuit breaker per API host
+        - uplink() / mqtt() / uploader() build the gateway, MQTT and batch
+          upload senders when configured
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+_wifi = None
+_http = None
+
+def wifi(ssid, password):
+    """The WiFiManager for the station interface (created, not connected, on the first call)."""
+    global _wifi
+    if _wifi is None:
+        from buni.wifi_manager import WiFiManager
+        _wifi = WiFiManager(ssid, password)
+    return _wifi
+
+def http():
+    """KeepAliveClient shared by all notifiers, behind a circuit breaker per host."""
+    global _http
+    if _http is None:
+        from buni.http_client import KeepAliveClient
+        from buni.circuit_breaker import GuardedClient
+        _http = GuardedClient(KeepAliveClient())
+    return _http
+
+def uplink(host, port, delta=False):
+    """GatewayUplink to a fleet gateway."""
+    from buni.frames import GatewayUplink
+    return GatewayUplink(host, port, delta=delta)
+
+def mqtt(host, port, topic):
+    """TelemetryPublisher for an MQTT broker; topic is formatted with the node id."""
+    from buni.node import node_id
+    from buni.mqtt import MQTTClient, TelemetryPublisher
+    node = node_id()
+    client = MQTTClient("buni-{:08x}".format(node), host, port)
+    return TelemetryPublisher(client, topic.format(node), node)
+
+def uploader(history, host, port, interval_s):
+    """BatchUploader posting the readings of `history` to an upload endpoint."""
+    from buni.node import node_id
+    from buni.upload import BatchUploader
+    return BatchUploader(history, host, port, node=node_id(), interval_s=interval_s)
+
+def reset():
+    """Forget the shared objects, as after a reboot (the simulator calls this between runs)."""
+    global _wifi, _http
+    if _http is not None:
+        _http.close()
+    _wifi = _http = None
@@ -0,0 +1,23 @@
+"""
+    ----------------------------------------------------------------------------
+    NODE ID
+    > Operation:
+        - 32-bit id of this board, the crc32 of machine.unique_id(), used as
+          the node id in gateway frames, outbox batches, uploads and MQTT
+          topics
+        - Kept on its own so the outbox can ask for it at setup without
+          loading the gateway frame code (frames.py)
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+def node_id():
+    """32-bit node id from the board's unique id."""
+    from machine import unique_id
+    try:
+        from binascii import crc32
+    except ImportError:
+        from zlib import crc32
+    return crc32(unique_id()) & 0xFFFFFFFF
@@ -0,0 +1,163 @@
+"""
+    ----------------------------------------------------------------------------
+    NOTIFICATION QUEUE
+    > Operation:
+        - Sits between the control loop and a notifier (WhatsApp / Telegram)
+        - send() only stores the message in a fixed-size ring buffer and
+          returns right away
+        - pump() sends queued messages; call it from a background task or
+          once per cycle
+        - When the buffer is full the two oldest messages are merged (or the
+          oldest is dropped), so memory use never grows
+        - Messages are kept as given: str, or bytes (e.g. a digest rendered
+          with msgbuild.py), so nothing is converted on the way
+        - Counters for queued / sent / dropped / retried / merged messages
+        - send(message, tag) keeps a number with the message (e.g. its outbox
+          sequence); done_tag is the highest tag that has left through
+          pump(), sent or given up on, so the caller knows what is delivered
+        - A notifier with an available() method (e.g. behind a circuit
+          breaker) can ask pump() to hold messages without using retries
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+# ===== CONFIGURATION =====
+DROP_OLDEST = 0        # full buffer: throw the oldest message away
+MERGE_OLDEST = 1       # full buffer: join the two oldest messages into one
+MERGE_SEPARATOR = " | "
+MAX_MESSAGE_LEN = 480  # merged messages longer than this are dropped instead (msgbuild.URL_SIZE fits it)
+
+def _join(first, second):
+    if isinstance(first, str) and isinstance(second, str):
+        return first + MERGE_SEPARATOR + second
+    if isinstance(first, str):
+        first = first.encode()
+    if isinstance(second, str):
+        second = second.encode()
+    return first + MERGE_SEPARATOR.encode() + second
+
+class NotificationQueue:
+    """
+    Wraps any object with a send(message) -> bool method and gives it the same
+    send() interface, backed by a ring buffer of `size` pending messages.
+    """
+    def __init__(self, notifier, size=8, policy=MERGE_OLDEST, max_retries=3, name=None):
+        self.notifier = notifier
+        self.name = name or type(notifier).__name__
+        self.size = size
+        self.policy = policy
+        self.max_retries = max_retries
+        # Ring buffer: fixed list of message slots + attempt counters
+        self._slots = [None] * size
+        self._attempts = bytearray(size)
+        self._tags = [0] * size
+        self._head = 0     # index of the oldest message
+        self._count = 0
+        # Counters
+        self.queued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.retried = 0
+        self.merged = 0
+        self.done_tag = 0  # highest tag of the messages that have left through pump()
+
+    def __len__(self):
+        return self._count
+
+    def pending(self):
+        return self._count
+
+    def send(self, message, tag=0):
+        """Queue a message; never blocks on the network. Always returns True."""
+        if self._count == self.size:
+            self._make_room()
+        tail = (self._head + self._count) % self.size
+        self._slots[tail] = message if isinstance(message, bytes) else str(message)
+        self._attempts[tail] = 0
+        self._tags[tail] = tag
+        self._count += 1
+        self.queued += 1
+        return True
+
+    def _make_room(self):
+        oldest = self._head
+        second = (self._head + 1) % self.size
+        if self.policy == MERGE_OLDEST and self.size > 1:
+            merged = _join(self._slots[oldest], self._slots[second])
+            if len(merged) <= MAX_MESSAGE_LEN:
+                self._slots[second] = merged
+                self._attempts[second] = 0
+                self._tags[second] = max(self._tags[oldest], self._tags[second])
+                self.merged += 1
+                self._pop()
+                return
+        self.dropped += 1
+        self._pop()
+
+    def _pop(self):
+        self._slots[self._head] = None
+        self._head = (self._head + 1) % self.size
+        self._count -= 1
+
+    def pump(self, limit=1):
+        """
+        Try to send up to `limit` queued messages, oldest first.
+        A failed message stays at the head and is retried on the next call,
+        until it has failed max_retries times. Returns the number sent.
+        """
+        done = 0
+        available = getattr(self.notifier, "available", None)
+        while self._count and done < limit:
+            if available is not None and not available():
+                break
+            head = self._head
+            try:
+                ok = self.notifier.send(self._slots[head])
+            except Exception as e:
+                print(self.name, "send exception:", e)
+                ok = False
+            if ok is False:
+                self._attempts[head] += 1
+                if self._attempts[head] > self.max_retries:
+                    print(self.name, "giving up on message after", self.max_retries, "retries")
+                    self.dropped += 1
+                    self.done_tag = max(self.done_tag, self._tags[head])
+                    self._pop()
+                else:
+                    self.retried += 1
+                # stop here; the link is probably down
+                break
+            self.sent += 1
+            done += 1
+            self.done_tag = max(self.done_tag, self._tags[head])
+            self._pop()
+        return done
+
+    def stats(self):
+        return {
+            "pending": self._count,
+            "queued": self.queued,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "retried": self.retried,
+            "merged": self.merged,
+        }
+
+# ===== DEMO =====
+if __name__ == "__main__":
+    class _FlakyNotifier:
+        def __init__(self):
+            self.calls = 0
+
+        def send(self, message):
+            self.calls += 1
+            return self.calls % 3 != 0   # every third send fails
+
+    q = NotificationQueue(_FlakyNotifier(), size=4)
+    for i in range(10):
+        q.send(f"alert {i}")
+    while q.pending():
+        q.pump(limit=2)
+    print(q.stats())
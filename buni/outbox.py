@@ -0,0 +1,792 @@
+"""
+    ----------------------------------------------------------------------------
+    STORE-AND-FORWARD OUTBOX
+    > Operation:
+        - Persistent outbound queue on flash for alerts and telemetry, so
+          nothing is lost to a WiFi outage or a reboot
+        - Two priority lanes (HIGH for alerts, LOW for readings), each an
+          append-only set of segment files OUTBOX_DIR/pN/segNNNNN.bin and a
+          cursor file holding the position up to which the receiver has
+          acknowledged
+        - Every record carries a sequence number that is never reused by
+          the node: (node id, sequence) is its idempotency key, so a
+          receiver can drop a record it already has when an acknowledgement
+          was lost and the batch is sent again
+        - put() buffers LOW records in RAM and writes them BUFFER_SIZE bytes
+          at a time (flash wear); HIGH records are written at once
+        - drain(send) reads records straight from flash into one
+          preallocated batch buffer and hands it to `send`, which returns
+          how many records from the front the receiver took. Only those
+          are acknowledged; the rest are sent again later
+        - drain(send, ack=False) for a receiver that only queues the records
+          (the notifiers): taken records are handed out but stay on flash
+          until confirm(seq) reports them delivered, so a reboot before then
+          sends them again. Up to IN_FLIGHT records wait for a confirm
+        - Backpressure: a batch not taken in full (or a send error) stops
+          the drain and holds the outbox back for BACKOFF_MS, doubling up
+          to MAX_BACKOFF_MS while the receiver keeps refusing
+        - ORDER: PRIORITY_FIRST sends all alerts before any reading,
+          OLDEST_FIRST sends both lanes merged by sequence number
+        - When a lane reaches MAX_SEGMENTS its oldest segment is dropped
+          (counted); torn records from a power cut fail their CRC and the
+          rest of that segment is skipped
+        - GatewaySender sends batches to the fleet gateway over TCP and
+          reads back the count taken; decode_batch() and SeenKeys are the
+          receiver side (gateway/server.py)
+        - Run on the simulator for a 24 h backlog drained to the gateway:
+              python -m buni.outbox
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import os
+import struct
+import time
+from array import array
+try:
+    from binascii import crc32
+except ImportError:
+    from zlib import crc32
+
+from buni.flash_log import SCALES, MISSING, _to_int, _exists, list_segments, segment_name
+
+try:
+    from time import ticks_ms, ticks_add, ticks_diff
+except ImportError:
+    # CPython fallback
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_add(t, delta):
+        return t + delta
+
+    def ticks_diff(a, b):
+        return a - b
+
+# ===== CONFIGURATION =====
+OUTBOX_DIR = "outbox"
+SEGMENT_SIZE = 16384   # bytes per segment file
+MAX_SEGMENTS = 24      # per lane; 24 h of readings at 5 s fit in the LOW lane
+BUFFER_SIZE = 512      # LOW records buffered in RAM before one flash write
+BATCH_SIZE = 1460      # bytes per batch sent (one TCP segment)
+MAX_PAYLOAD = 512      # longest record payload (a full msgbuild.py digest fits)
+BACKOFF_MS = 2000      # hold-off after a refused batch, doubled up to MAX_BACKOFF_MS
+MAX_BACKOFF_MS = 60000
+TIMEOUT = 10           # GatewaySender socket timeout in seconds
+IN_FLIGHT = 16         # records handed out by drain(ack=False) and not confirmed yet
+
+HIGH = 0               # lanes / priorities
+LOW = 1
+LANES = 2
+PRIORITY_FIRST = 0
+OLDEST_FIRST = 1
+
+READING = 1            # record kinds
+MESSAGE = 2
+
+# ===== FORMATS =====
+MAGIC = 0xB9           # batch
+RECORD_MAGIC = 0xC3
+VERSION = 1
+# magic, version, records, node id, bytes after this header
+BATCH_HEAD_FMT = "<BBHII"
+# magic, lane << 4 | kind, payload length, sequence, unix time, crc16
+RECORD_HEAD_FMT = "<BBHIIH"
+READING_BODY_FMT = "<hhhh"  # temp (0.1 C), hum (0.1 %), soil (%), tds (ppm) as in frames.py
+CURSOR_FMT = "<IIIH"        # segment, offset, last sequence acknowledged, crc16
+ACK_FMT = "<H"              # records taken, the receiver's reply to a batch
+BATCH_HEAD_SIZE = struct.calcsize(BATCH_HEAD_FMT)
+RECORD_HEAD_SIZE = struct.calcsize(RECORD_HEAD_FMT)
+READING_BODY_SIZE = struct.calcsize(READING_BODY_FMT)
+CURSOR_SIZE = struct.calcsize(CURSOR_FMT)
+ACK_SIZE = struct.calcsize(ACK_FMT)
+
+def _crc(buf, start, length):
+    """crc16 of one record: its header up to the crc field, then its payload."""
+    mv = memoryview(buf)
+    head = start + RECORD_HEAD_SIZE
+    c = crc32(mv[start:head - 2])
+    return crc32(mv[head:head + length], c) & 0xFFFF
+
+def unpack_reading(payload):
+    """(temp, hum, soil, tds) of a READING record, None for missing values."""
+    return tuple(None if r == MISSING else r / s for r, s in zip(struct.unpack(READING_BODY_FMT, payload), SCALES))
+
+class Outbox:
+    def __init__(self, path=OUTBOX_DIR, node=0, order=PRIORITY_FIRST, segment_size=SEGMENT_SIZE,
+                 max_segments=MAX_SEGMENTS, buffer_size=BUFFER_SIZE, batch_size=BATCH_SIZE):
+        self.path = path
+        self.node = node
+        self.order = order
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        self.batch = bytearray(batch_size)
+        self.mv = memoryview(self.batch)
+        n = batch_size // RECORD_HEAD_SIZE
+        # Per record of the batch being sent: lane, where it ends, its sequence
+        self.rec_lane = bytearray(n)
+        self.rec_seg = array("L", [0] * n)
+        self.rec_end = array("L", [0] * n)
+        self.rec_seq = array("L", [0] * n)
+        # Per lane
+        self.buffers = [bytearray(RECORD_HEAD_SIZE + MAX_PAYLOAD), bytearray(buffer_size)]  # HIGH, LOW
+        self.used = [0] * LANES            # bytes buffered in RAM
+        self.write_seg = [1] * LANES       # segment being appended to
+        self.write_size = [0] * LANES
+        self.ack_seg = [1] * LANES         # acknowledged up to here
+        self.ack_off = [0] * LANES
+        self.acked_seq = [0] * LANES
+        self.read_seg = [1] * LANES        # next record to put in a batch
+        self.read_off = [0] * LANES
+        self.read_seq = [0] * LANES        # sequence of the last record put in a batch
+        self.hand_seg = [1] * LANES        # taken up to here, acknowledged once confirmed
+        self.hand_off = [0] * LANES
+        self.hand_seq = [0] * LANES
+        self.peeked = bytearray(LANES)     # heads[lane] holds the next record's header
+        self.stored = [0] * LANES          # bytes on flash not acknowledged yet
+        self.files = [None] * LANES        # (segment, open file) while draining
+        self.heads = [bytearray(RECORD_HEAD_SIZE) for _ in range(LANES)]
+        # Ring of records handed out and not confirmed yet: lane, where it ends, its sequence
+        self.fl_lane = bytearray(IN_FLIGHT)
+        self.fl_seg = array("L", [0] * IN_FLIGHT)
+        self.fl_end = array("L", [0] * IN_FLIGHT)
+        self.fl_seq = array("L", [0] * IN_FLIGHT)
+        self.fl_head = 0
+        self.fl_count = 0
+        self.reading = bytearray(READING_BODY_SIZE)
+        self.cursor = bytearray(CURSOR_SIZE)
+        self.seq = 0                       # last sequence number given out
+        self.backoff_ms = 0
+        self.hold_until = ticks_ms()
+        # Counters
+        self.queued = 0
+        self.delivered = 0
+        self.batches = 0
+        self.refused = 0                   # batches not taken in full (backpressure)
+        self.errors = 0                    # send errors
+        self.dropped = 0                   # segments dropped, lane full
+        self.corrupt = 0                   # torn / corrupt records skipped
+        self.too_long = 0
+        self.flash_writes = 0
+        if not _exists(path):
+            os.mkdir(path)
+        for lane in range(LANES):
+            self._recover(lane)
+
+    # --- startup ---
+    def _dir(self, lane):
+        return "{}/p{}".format(self.path, lane)
+
+    def _file(self, lane, number):
+        return self._dir(lane) + "/" + segment_name(number)
+
+    def _size(self, lane, number):
+        try:
+            return os.stat(self._file(lane, number))[6]
+        except OSError:
+            return 0
+
+    def _recover(self, lane):
+        """Read the cursor, drop acknowledged segments, find the last sequence and where to append."""
+        d = self._dir(lane)
+        if not _exists(d):
+            os.mkdir(d)
+        segments = list_segments(d)
+        seg, off, seq = (segments[0] if segments else 1), 0, 0
+        try:
+            with open(d + "/cursor", "rb") as f:
+                if f.readinto(self.cursor) == CURSOR_SIZE:
+                    c_seg, c_off, c_seq, crc = struct.unpack(CURSOR_FMT, self.cursor)
+                    if crc == crc32(memoryview(self.cursor)[:CURSOR_SIZE - 2]) & 0xFFFF:
+                        seg, off, seq = c_seg, c_off, c_seq
+        except OSError:
+            pass
+        for number in segments:
+            if number < seg:
+                os.remove(self._file(lane, number))
+        segments = [n for n in segments if n >= seg]
+        if segments and segments[0] > seg:
+            seg, off = segments[0], 0      # cursor segment dropped: start at the oldest left
+        self.ack_seg[lane] = self.read_seg[lane] = self.hand_seg[lane] = seg
+        self.ack_off[lane] = self.read_off[lane] = self.hand_off[lane] = off
+        self.acked_seq[lane] = self.read_seq[lane] = self.hand_seq[lane] = seq
+        last = segments[-1] if segments else seg
+        end, last_seq = self._scan(lane, last)
+        self.seq = max(self.seq, seq, last_seq)
+        self.write_seg[lane] = last
+        self.write_size[lane] = self._size(lane, last)
+        if end != self.write_size[lane]:
+            # torn tail from a power cut: never append after it
+            self.write_seg[lane] = last + 1
+            self.write_size[lane] = 0
+        self._recount(lane)
+
+    def _recount(self, lane):
+        """Remove the segments before the cursor and count the bytes after it."""
+        stored = -self.ack_off[lane]
+        for number in list_segments(self._dir(lane)):
+            if number < self.ack_seg[lane]:
+                if self.files[lane] is not None and self.files[lane][0] == number:
+                    self._close(lane)
+                os.remove(self._file(lane, number))
+            else:
+                stored += self._size(lane, number)
+        self.stored[lane] = max(0, stored)
+
+    def _scan(self, lane, number):
+        """(end of the valid records, their last sequence) in one segment."""
+        end = 0
+        last = 0
+        scratch = bytearray(RECORD_HEAD_SIZE + MAX_PAYLOAD)
+        try:
+            with open(self._file(lane, number), "rb") as f:
+                while True:
+                    head = memoryview(scratch)[:RECORD_HEAD_SIZE]
+                    if f.readinto(head) != RECORD_HEAD_SIZE:
+                        break
+                    magic, _, length, seq, _, crc = struct.unpack_from(RECORD_HEAD_FMT, scratch)
+                    if magic != RECORD_MAGIC or length > MAX_PAYLOAD:
+                        break
+                    if f.readinto(memoryview(scratch)[RECORD_HEAD_SIZE:RECORD_HEAD_SIZE + length]) != length:
+                        break
+                    if crc != _crc(scratch, 0, length):
+                        break
+                    end += RECORD_HEAD_SIZE + length
+                    last = seq
+        except OSError:
+            pass
+        return end, last
+
+    # --- writing ---
+    def put(self, kind, payload, priority=LOW, ts=None):
+        """Queue one record (bytes-like, at most MAX_PAYLOAD); returns its sequence number, 0 if refused."""
+        n = len(payload)
+        if n > MAX_PAYLOAD or BATCH_HEAD_SIZE + RECORD_HEAD_SIZE + n > len(self.batch):
+            self.too_long += 1
+            return 0
+        lane = priority
+        size = RECORD_HEAD_SIZE + n
+        buf = self.buffers[lane]
+        if self.used[lane] + size > len(buf):
+            self._write(lane)
+        if size > len(buf):
+            self._append(lane, self._record(bytearray(size), 0, lane, kind, payload, ts))
+        else:
+            self.used[lane] = self._record(buf, self.used[lane], lane, kind, payload, ts)
+            if lane == HIGH:
+                self._write(lane)          # alerts go to flash at once
+        self.queued += 1
+        return self.seq
+
+    def put_reading(self, ts, temp, hum, soil, tds):
+        """Queue one reading (LOW) in the frames.py scaling."""
+        struct.pack_into(READING_BODY_FMT, self.reading, 0, _to_int(temp, SCALES[0]), _to_int(hum, SCALES[1]),
+                         _to_int(soil, SCALES[2]), _to_int(tds, SCALES[3]))
+        return self.put(READING, self.reading, LOW, ts)
+
+    def _record(self, buf, offset, lane, kind, payload, ts):
+        self.seq += 1
+        n = len(payload)
+        struct.pack_into(RECORD_HEAD_FMT, buf, offset, RECORD_MAGIC, lane << 4 | kind, n, self.seq,
+                              int(time.time() if ts is None else ts), 0)
+        body = offset + RECORD_HEAD_SIZE
+        buf[body:body + n] = payload
+        struct.pack_into("<H", buf, body - 2, _crc(buf, offset, n))
+        return body + n
+
+    def flush(self):
+        """Write the records buffered in RAM to flash."""
+        for lane in range(LANES):
+            self._write(lane)
+
+    def _write(self, lane):
+        n = self.used[lane]
+        if n:
+            self._append(lane, memoryview(self.buffers[lane])[:n])
+            self.used[lane] = 0
+
+    def _append(self, lane, data):
+        n = len(data)
+        if self.write_size[lane] and self.write_size[lane] + n > self.segment_size:
+            self._rotate(lane)
+        with open(self._file(lane, self.write_seg[lane]), "ab") as f:
+            f.write(data)
+        self.write_size[lane] += n
+        self.stored[lane] += n
+        self.flash_writes += 1
+
+    def _rotate(self, lane):
+        self.write_seg[lane] += 1
+        self.write_size[lane] = 0
+        segments = list_segments(self._dir(lane))
+        drop = segments[:max(0, len(segments) - self.max_segments + 1)]
+        if not drop:
+            return
+        self.dropped += len(drop)
+        if drop[-1] >= self.ack_seg[lane]:
+            self.ack_seg[lane] = drop[-1] + 1
+            self.ack_off[lane] = 0
+        if self.hand_seg[lane] < self.ack_seg[lane]:
+            self.hand_seg[lane] = self.ack_seg[lane]
+            self.hand_off[lane] = 0
+        if self.read_seg[lane] < self.ack_seg[lane]:
+            self._close(lane)
+            self.read_seg[lane] = self.ack_seg[lane]
+            self.read_off[lane] = 0
+        self._recount(lane)
+
+    # --- draining ---
+    def backlog(self):
+        """Bytes waiting to be delivered (flash and RAM)."""
+        return sum(self.stored) + sum(self.used)
+
+    def holding(self):
+        """True while backing off after a refused batch."""
+        return self.backoff_ms and ticks_diff(self.hold_until, ticks_ms()) > 0
+
+    def drain(self, send, max_batches=1, ack=True):
+        """
+        Send up to `max_batches` batches through send(batch, count) -> records
+        taken. Returns the number of records delivered. With ack=False the
+        records taken are only handed out: they are acknowledged by confirm().
+        """
+        if self.holding():
+            return 0
+        self.flush()
+        delivered = 0
+        try:
+            for _ in range(max_batches):
+                count, used = self._fill(len(self.rec_lane) if ack else IN_FLIGHT - self.fl_count)
+                if not count:
+                    self._sync()               # only skipped records were left (or no room in flight)
+                    break
+                struct.pack_into(BATCH_HEAD_FMT, self.batch, 0, MAGIC, VERSION, count, self.node,
+                                 used - BATCH_HEAD_SIZE)
+                self.batches += 1
+                try:
+                    taken = send(self.mv[:used], count)
+                except OSError as e:
+                    print("Outbox send error:", e)
+                    self.errors += 1
+                    taken = 0
+                taken = min(taken, count)
+                delivered += taken
+                if not ack:
+                    self._hand(taken)
+                if taken == count:
+                    self._sync()
+                elif taken and ack:
+                    self._ack(taken)
+                if taken < count:
+                    self.refused += 1
+                    self.backoff_ms = min(MAX_BACKOFF_MS, self.backoff_ms * 2 or BACKOFF_MS)
+                    self.hold_until = ticks_add(ticks_ms(), self.backoff_ms)
+                    for lane in range(LANES):  # the rest is read again next time
+                        self._close(lane)
+                        self.read_seg[lane] = self.hand_seg[lane]
+                        self.read_off[lane] = self.hand_off[lane]
+                        self.read_seq[lane] = self.hand_seq[lane]
+                    break
+                self.backoff_ms = 0
+        finally:
+            for lane in range(LANES):
+                self._close(lane)
+        self.delivered += delivered
+        return delivered
+
+    def _fill(self, limit):
+        """Copy up to `limit` records from flash into the batch; returns (records, bytes used)."""
+        used = BATCH_HEAD_SIZE
+        count = 0
+        while count < min(limit, len(self.rec_lane)):
+            lane = -1
+            for candidate in range(LANES):
+                if self._peek(candidate):
+                    if lane < 0:
+                        lane = candidate
+                        if self.order == PRIORITY_FIRST:
+                            break
+                    elif struct.unpack_from(RECORD_HEAD_FMT, self.heads[candidate])[3] \
+                            < struct.unpack_from(RECORD_HEAD_FMT, self.heads[lane])[3]:
+                        lane = candidate
+            if lane < 0:
+                break
+            length = struct.unpack_from(RECORD_HEAD_FMT, self.heads[lane])[2]
+            size = RECORD_HEAD_SIZE + length
+            if used + size > len(self.batch):
+                break
+            self.mv[used:used + RECORD_HEAD_SIZE] = self.heads[lane]
+            f = self.files[lane][1]
+            if f.readinto(self.mv[used + RECORD_HEAD_SIZE:used + size]) != length \
+                    or struct.unpack_from(RECORD_HEAD_FMT, self.batch, used)[5] != _crc(self.batch, used, length):
+                self._skip_segment(lane)
+                continue
+            self.peeked[lane] = 0
+            self.read_off[lane] += size
+            self.read_seq[lane] = struct.unpack_from(RECORD_HEAD_FMT, self.batch, used)[3]
+            self.rec_lane[count] = lane
+            self.rec_seg[count] = self.read_seg[lane]
+            self.rec_end[count] = self.read_off[lane]
+            self.rec_seq[count] = self.read_seq[lane]
+            used += size
+            count += 1
+        return count, used
+
+    def _peek(self, lane):
+        """Read the header of the lane's next record into heads[lane]; False when the lane is empty."""
+        if self.peeked[lane]:
+            return True
+        while True:
+            seg = self.read_seg[lane]
+            if seg > self.write_seg[lane]:
+                return False
+            size = self.write_size[lane] if seg == self.write_seg[lane] else self._size(lane, seg)
+            if self.read_off[lane] < size:
+                f = self._open(lane)
+                if f is not None:
+                    if f.readinto(self.heads[lane]) == RECORD_HEAD_SIZE:
+                        magic, _, length, _, _, _ = struct.unpack_from(RECORD_HEAD_FMT, self.heads[lane])
+                        if magic == RECORD_MAGIC and length <= MAX_PAYLOAD:
+                            self.peeked[lane] = 1
+                            return True
+                    self._skip_segment(lane)
+                    continue
+            if seg == self.write_seg[lane]:
+                return False
+            self._close(lane)
+            self.read_seg[lane] = seg + 1
+            self.read_off[lane] = 0
+
+    def _open(self, lane):
+        """The read segment of a lane, positioned at the read offset (None if it is gone)."""
+        entry = self.files[lane]
+        if entry is None or entry[0] != self.read_seg[lane]:
+            self._close(lane)
+            try:
+                entry = self.files[lane] = (self.read_seg[lane], open(self._file(lane, self.read_seg[lane]), "rb"))
+            except OSError:
+                return None
+        entry[1].seek(self.read_off[lane])
+        return entry[1]
+
+    def _close(self, lane):
+        self.peeked[lane] = 0
+        if self.files[lane] is not None:
+            self.files[lane][1].close()
+            self.files[lane] = None
+
+    def _skip_segment(self, lane):
+        """A torn or corrupt record: nothing after it in this segment can be trusted."""
+        self.corrupt += 1
+        self._close(lane)
+        seg = self.read_seg[lane]
+        if seg == self.write_seg[lane]:
+            self.write_seg[lane] += 1      # append after it no more
+            self.write_size[lane] = 0
+        self.read_seg[lane] = seg + 1
+        self.read_off[lane] = 0
+
+    def _ack(self, taken):
+        """The receiver has the first `taken` records of the batch: move the cursors past them."""
+        touched = 0
+        for i in range(taken):
+            lane = self.rec_lane[i]
+            self.ack_seg[lane] = self.hand_seg[lane] = self.rec_seg[i]
+            self.ack_off[lane] = self.hand_off[lane] = self.rec_end[i]
+            self.acked_seq[lane] = self.hand_seq[lane] = self.rec_seq[i]
+            touched |= 1 << lane
+        for lane in range(LANES):
+            if touched & (1 << lane):
+                self._save_cursor(lane)
+
+    def _hand(self, taken):
+        """The first `taken` records of the batch are queued by the receiver: in flight until confirmed."""
+        for i in range(taken):
+            lane = self.rec_lane[i]
+            j = (self.fl_head + self.fl_count) % IN_FLIGHT
+            self.fl_lane[j] = lane
+            self.fl_seg[j] = self.hand_seg[lane] = self.rec_seg[i]
+            self.fl_end[j] = self.hand_off[lane] = self.rec_end[i]
+            self.fl_seq[j] = self.hand_seq[lane] = self.rec_seq[i]
+            self.fl_count += 1
+
+    def _sync(self):
+        """
+        Everything read so far is taken (or skipped): move the hand-out positions
+        up to the read positions, and the cursors too unless records are in flight.
+        """
+        for lane in range(LANES):
+            self.hand_seg[lane] = self.read_seg[lane]
+            self.hand_off[lane] = self.read_off[lane]
+            self.hand_seq[lane] = self.read_seq[lane]
+        if self.fl_count:
+            return
+        for lane in range(LANES):
+            if self.hand_seg[lane] != self.ack_seg[lane] or self.hand_off[lane] != self.ack_off[lane]:
+                self.ack_seg[lane] = self.hand_seg[lane]
+                self.ack_off[lane] = self.hand_off[lane]
+                self.acked_seq[lane] = self.hand_seq[lane]
+                self._save_cursor(lane)
+
+    def confirm(self, seq):
+        """
+        The records handed out by drain(ack=False) up to sequence `seq` are
+        delivered: move the cursors past them. Records are handed out in
+        sequence order within a lane. Returns the number confirmed.
+        """
+        done = 0
+        touched = 0
+        while self.fl_count and self.fl_seq[self.fl_head] <= seq:
+            i = self.fl_head
+            lane = self.fl_lane[i]
+            seg = self.fl_seg[i]
+            if seg > self.ack_seg[lane] or (seg == self.ack_seg[lane] and self.fl_end[i] > self.ack_off[lane]):
+                self.ack_seg[lane] = seg       # not passed already by a dropped segment
+                self.ack_off[lane] = self.fl_end[i]
+                self.acked_seq[lane] = self.fl_seq[i]
+                touched |= 1 << lane
+            self.fl_head = (i + 1) % IN_FLIGHT
+            self.fl_count -= 1
+            done += 1
+        if done and not self.fl_count:
+            for lane in range(LANES):      # records skipped after the last one go too
+                if self.hand_seg[lane] == self.ack_seg[lane] and self.hand_off[lane] == self.ack_off[lane]:
+                    continue
+                self.ack_seg[lane] = self.hand_seg[lane]
+                self.ack_off[lane] = self.hand_off[lane]
+                self.acked_seq[lane] = self.hand_seq[lane]
+                touched |= 1 << lane
+        for lane in range(LANES):
+            if touched & (1 << lane):
+                self._save_cursor(lane)
+        return done
+
+    def _save_cursor(self, lane):
+        """Write the lane's cursor (.tmp + rename) and remove the segments it has passed."""
+        struct.pack_into(CURSOR_FMT, self.cursor, 0, self.ack_seg[lane], self.ack_off[lane], self.acked_seq[lane], 0)
+        struct.pack_into("<H", self.cursor, CURSOR_SIZE - 2,
+                         crc32(memoryview(self.cursor)[:CURSOR_SIZE - 2]) & 0xFFFF)
+        name = self._dir(lane) + "/cursor"
+        with open(name + ".tmp", "wb") as f:
+            f.write(self.cursor)
+        os.rename(name + ".tmp", name)
+        self.flash_writes += 1
+        self._recount(lane)
+
+    def stats(self):
+        return {
+            "queued": self.queued,
+            "delivered": self.delivered,
+            "backlog_bytes": self.backlog(),
+            "in_flight": self.fl_count,
+            "batches": self.batches,
+            "refused": self.refused,
+            "errors": self.errors,
+            "dropped_segments": self.dropped,
+            "corrupt": self.corrupt,
+            "flash_writes": self.flash_writes,
+        }
+
+# ===== DEVICE SIDE SENDER =====
+class GatewaySender:
+    """
+    send(batch, count) for Outbox.drain(): one TCP connection to the fleet
+    gateway, kept open; each batch is answered with the number of records
+    the gateway took.
+    """
+    def __init__(self, host, port, timeout=TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock = None
+        self.reply = bytearray(ACK_SIZE)
+
+    def _connect(self):
+        try:
+            import usocket as socket
+        except ImportError:
+            import socket
+        addr = socket.getaddrinfo(self.host, self.port, 0, socket.SOCK_STREAM)[0][-1]
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(addr)
+        except Exception:
+            sock.close()
+            raise
+        self.sock = sock
+
+    def __call__(self, batch, count):
+        if self.sock is None:
+            self._connect()
+        try:
+            if hasattr(self.sock, "sendall"):
+                self.sock.sendall(batch)
+            else:
+                self.sock.write(batch)
+            got = 0
+            mv = memoryview(self.reply)
+            while got < ACK_SIZE:
+                n = self.sock.recv_into(mv[got:]) if hasattr(self.sock, "recv_into") else self.sock.readinto(mv[got:])
+                if not n:
+                    raise OSError(104, "ECONNRESET")
+                got += n
+        except OSError:
+            self.close()
+            raise
+        return struct.unpack(ACK_FMT, self.reply)[0]
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+# ===== RECEIVER SIDE (CPython) =====
+def decode_batch(data):
+    """
+    (node, [(lane, kind, seq, ts, payload), ...]) of one batch; raises
+    ValueError on a bad header or a record that fails its CRC.
+    """
+    if len(data) < BATCH_HEAD_SIZE:
+        raise ValueError("short batch")
+    magic, version, count, node, length = struct.unpack_from(BATCH_HEAD_FMT, data)
+    if magic != MAGIC or version != VERSION or BATCH_HEAD_SIZE + length != len(data):
+        raise ValueError("bad batch header")
+    records = []
+    offset = BATCH_HEAD_SIZE
+    for _ in range(count):
+        if len(data) - offset < RECORD_HEAD_SIZE:
+            raise ValueError("short record")
+        magic, lane_kind, n, seq, ts, crc = struct.unpack_from(RECORD_HEAD_FMT, data, offset)
+        body = offset + RECORD_HEAD_SIZE
+        if magic != RECORD_MAGIC or body + n > len(data) or crc != _crc(data, offset, n):
+            raise ValueError("bad record")
+        records.append((lane_kind >> 4, lane_kind & 0x0F, seq, ts, bytes(data[body:body + n])))
+        offset = body + n
+    return node, records
+
+class SeenKeys:
+    """
+    Drops records already received. A lane is sent in order, so the highest
+    sequence seen per (node, lane) is enough to recognise a resent record.
+    """
+    def __init__(self):
+        self.last = {}
+        self.duplicates = 0
+
+    def fresh(self, node, lane, seq):
+        key = (node, lane)
+        if seq <= self.last.get(key, 0):
+            self.duplicates += 1
+            return False
+        self.last[key] = seq
+        return True
+
+# ===== BENCHMARK (simulator) =====
+if __name__ == "__main__":
+    import io
+    import shutil
+    import tempfile
+    import tracemalloc
+    from contextlib import redirect_stdout
+
+    import sim
+
+    HOURS = 24
+    PERIOD = 5                         # seconds between readings
+    ALERT_EVERY = 1800                 # an alert digest every 30 min of the outage
+    ACK_LOSS = 0.01                    # replies lost after the gateway took the batch
+    GATEWAY = ("192.168.1.10", 9750)
+    DRAIN_BATCHES = 8                  # batches per 5 s cycle
+
+    def run(name, order, batch_size, batch_rows):
+        world = sim.install(seed=1)
+        from buni import outbox          # re-imported so ticks_ms is the simulated one
+        from gateway.server import Gateway
+        from gateway.store import Store
+
+        gateway = Gateway(Store(), batch_rows=batch_rows)
+        state = {"next_flush": 0.0, "alerts": 0, "last_alert_at": None}
+
+        def service(rx):
+            """The gateway's TCP outbox handler on the simulated network; stores once per second."""
+            if world.clock.now >= state["next_flush"]:
+                gateway.flush()
+                state["next_flush"] = world.clock.now + 1.0
+            if len(rx) < BATCH_HEAD_SIZE:
+                return b""
+            size = BATCH_HEAD_SIZE + struct.unpack_from(BATCH_HEAD_FMT, rx)[4]
+            if len(rx) < size:
+                return b""
+            data = bytes(rx[:size])
+            del rx[:size]
+            before = gateway.messages
+            taken = gateway.outbox_batch(data)
+            if gateway.messages > before:
+                state["last_alert_at"] = world.clock.now
+            if world.random.random() < ACK_LOSS:
+                raise OSError(104, "ECONNRESET")
+            return struct.pack(ACK_FMT, taken)
+
+        world.services[GATEWAY] = service
+        root = tempfile.mkdtemp()
+        box = outbox.Outbox(root + "/outbox", node=0x1234, order=order, batch_size=batch_size)
+        digest = b"Node alert digest: High temperature x3 (max 31.2 C) | Soil dry x12 (min 27 %)"
+        seconds = HOURS * 3600
+        for t in range(0, seconds, PERIOD):
+            box.put_reading(t, 25 + (t % 600) / 100, 55.0, 40, 600)
+            if t % ALERT_EVERY == 0:
+                box.put(outbox.MESSAGE, digest, outbox.HIGH, t)
+                state["alerts"] += 1
+        box.flush()
+        backlog = box.backlog()
+        queued = box.queued
+
+        # link comes back: connect, then drain a few batches per 5 s cycle
+        from network import WLAN
+        wlan = WLAN(0)
+        wlan.active(True)
+        wlan.connect("sim", "sim")
+        world.clock.advance(world.wifi_connect_time)
+        sender = outbox.GatewaySender(*GATEWAY)
+        start = world.clock.now
+        busy = 0.0
+        held = 0
+        # the outbox's own heap: not what the gateway or the simulated network hold
+        mine = [tracemalloc.Filter(True, outbox.__file__),
+                tracemalloc.Filter(False, "*/sim/*", all_frames=True),
+                tracemalloc.Filter(False, "*/gateway/*", all_frames=True)]
+        tracemalloc.start(16)
+        cycles = 0
+        while box.backlog() and cycles < 100000:
+            cycle_start = world.clock.now
+            with redirect_stdout(io.StringIO()):
+                box.drain(sender, max_batches=DRAIN_BATCHES)
+            busy += world.clock.now - cycle_start
+            if cycles % 20 == 0:
+                stats = tracemalloc.take_snapshot().filter_traces(mine).statistics("filename")
+                held = max(held, sum(stat.size for stat in stats))
+            cycles += 1
+            world.clock.advance(max(0, cycle_start + PERIOD - world.clock.now))
+        tracemalloc.stop()
+        gateway.flush()
+        took = world.clock.now - start
+        shutil.rmtree(root)
+        buffers = len(box.batch) + sum(len(b) for b in box.buffers)
+        print("  {:<24} {:>6.0f} s {:>6.0f} rec/s {:>5.0%} {:>8.0f} s {:>7} {:>7} {:>7} {:>8} {:>6} B {:>6} B".format(
+            name, took, queued / took, busy / took, state["last_alert_at"] - start, box.batches,
+            box.refused, box.errors, gateway.keys.duplicates, buffers, held))
+        assert gateway.store.rows == queued - state["alerts"]
+
+    print("{} h outage, a reading every {} s and an alert every {} min; {:.0%} of acks lost".format(
+        HOURS, PERIOD, ALERT_EVERY // 60, ACK_LOSS))
+    print("Backlog: {} readings and {} alerts".format(HOURS * 3600 // PERIOD, HOURS * 3600 // ALERT_EVERY))
+    print("  {:<24} {:>8} {:>10} {:>6} {:>10} {:>7} {:>7} {:>7} {:>8} {:>8} {:>8}".format(
+        "", "drain", "", "link", "alerts", "batches", "refused", "errors", "replayed", "buffers", "heap held"))
+    for name, order, batch_size, rows in (("small batches (128 B)", PRIORITY_FIRST, 128, 5000),
+                                          ("batched, priority first", PRIORITY_FIRST, BATCH_SIZE, 5000),
+                                          ("batched, oldest first", OLDEST_FIRST, BATCH_SIZE, 5000),
+                                          ("batched, busy gateway", PRIORITY_FIRST, BATCH_SIZE, 200)):
+        run(name, order, batch_size, rows)
@@ -0,0 +1,190 @@
+"""
+    ----------------------------------------------------------------------------
+    PCF8574 RELAY EXPANDER (shadow register)
+    > Operation:
+        - Keeps a shadow copy of the 8 output pins; set() / clear() /
+          value() / write() only change the shadow, flush() sends it
+        - flush() is one I2C transaction at most: the whole port byte in a
+          single write, so any number of relays switch together, and no
+          write at all when nothing changed
+        - Every RESYNC_MS the expander is read back instead (when there is
+          nothing to write); if a write was lost or the chip was reset the
+          shadow is written again on the next flush()
+        - A failed transaction (no acknowledge) is counted and retried on
+          the next flush(); the shadow stays the state the program wants
+        - active_low for relay boards that switch on a low pin; pins listed
+          in `inputs` are kept high so they can be read
+        - Run on the simulator to compare with toggling relays one by one
+          and trusting a remembered state, from the simulated bus
+          counters:  python -m buni.pcf8574 (tests/test_pcf8574.py checks
+          one I2C transaction per cycle at most and the resync after each
+          lost write)
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import time
+
+try:
+    from time import ticks_ms, ticks_add, ticks_diff
+except ImportError:
+    # CPython fallback
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_add(t, delta):
+        return t + delta
+
+    def ticks_diff(a, b):
+        return a - b
+
+# ===== CONFIGURATION =====
+ADDRESS = 0x20         # A0..A2 tied low
+RESYNC_MS = 60000      # read back at least this often when nothing is written
+
+class PCF8574:
+    def __init__(self, i2c, address=ADDRESS, active_low=False, inputs=0, resync_ms=RESYNC_MS):
+        self.i2c = i2c
+        self.address = address
+        self.invert = 0xFF if active_low else 0
+        self.inputs = inputs           # mask of pins used as inputs (held high)
+        self.resync_ms = resync_ms
+        self.shadow = 0                # wanted outputs, 1 = on
+        self.written = None            # port byte the chip should hold; None = unknown
+        self.buf = bytearray(1)
+        self.resync_at = ticks_ms()
+        # Counters
+        self.writes = 0
+        self.skipped = 0               # flushes with nothing to send
+        self.reads = 0
+        self.mismatches = 0            # readbacks that differed from what was written
+        self.errors = 0
+
+    # --- shadow register ---
+    def set(self, pin):
+        self.shadow |= 1 << pin
+        return self
+
+    def clear(self, pin):
+        self.shadow &= ~(1 << pin) & 0xFF
+        return self
+
+    def value(self, pin, v=None):
+        """Wanted state of one pin, or set it (applied on the next flush())."""
+        if v is None:
+            return (self.shadow >> pin) & 1
+        return self.set(pin) if v else self.clear(pin)
+
+    def write(self, mask, values):
+        """Set the pins in `mask` to the matching bits of `values` in one go."""
+        self.shadow = (self.shadow & ~mask & 0xFF) | (values & mask)
+        return self
+
+    def _port(self):
+        """Port byte for the shadow: polarity applied, input pins high."""
+        return ((self.shadow ^ self.invert) | self.inputs) & 0xFF
+
+    # --- I2C ---
+    def flush(self):
+        """
+        Bring the chip in line with the shadow using at most one I2C
+        transaction. Returns False if the transaction failed.
+        """
+        port = self._port()
+        try:
+            if port != self.written:
+                self.buf[0] = port
+                self.i2c.writeto(self.address, self.buf)
+                self.writes += 1
+                self.written = port
+                self.resync_at = ticks_add(ticks_ms(), self.resync_ms)
+            elif ticks_diff(ticks_ms(), self.resync_at) >= 0:
+                self.i2c.readfrom_into(self.address, self.buf)
+                self.reads += 1
+                self.resync_at = ticks_add(ticks_ms(), self.resync_ms)
+                if self.buf[0] | self.inputs != port:
+                    self.mismatches += 1
+                    self.written = None   # write it again on the next flush
+            else:
+                self.skipped += 1
+        except OSError:
+            self.errors += 1
+            self.written = None
+            return False
+        return True
+
+    def read(self):
+        """Port byte as the chip reports it (one I2C transaction), polarity applied."""
+        self.i2c.readfrom_into(self.address, self.buf)
+        self.reads += 1
+        return (self.buf[0] ^ self.invert) & 0xFF
+
+    def stats(self):
+        return {
+            "shadow": self.shadow,
+            "writes": self.writes,
+            "skipped": self.skipped,
+            "reads": self.reads,
+            "mismatches": self.mismatches,
+            "errors": self.errors,
+        }
+
+# ===== DEMO (simulator) =====
+if __name__ == "__main__":
+    import random
+
+    import sim
+
+    RELAYS = 8
+    CYCLES = 8640                      # a day of 10 s control cycles
+    MISS_RATE = 0.01                   # share of I2C writes that do not switch the relays
+
+    def run(driver):
+        world = sim.install(seed=1)
+        world.relay_miss_rate = MISS_RATE
+        plan = random.Random(2)        # same control decisions for both runs
+        want = [0] * RELAYS
+        if driver:
+            from machine import I2C
+            from buni import pcf8574   # re-imported so ticks_ms is the simulated one
+            expander = pcf8574.PCF8574(I2C(0))
+        else:
+            from pcf8574 import PCF8574_PIN
+            pins = [PCF8574_PIN(r, PCF8574_PIN.OUT) for r in range(RELAYS)]
+            state = [0] * RELAYS       # what the script believes the relays are
+        worst = 0
+        wrong = 0
+        streak = longest = 0           # cycles in a row with a relay in the wrong state
+        for _ in range(CYCLES):
+            for r in range(RELAYS):
+                if plan.random() < 0.05:
+                    want[r] ^= 1
+            before = world.counters.get("i2c_writes", 0) + world.counters.get("i2c_reads", 0)
+            if driver:
+                for r in range(RELAYS):
+                    expander.value(r, want[r])
+                expander.flush()
+            else:
+                for r in range(RELAYS):
+                    if want[r] != state[r]:
+                        pins[r].toggle()
+                        state[r] = want[r]
+            used = world.counters.get("i2c_writes", 0) + world.counters.get("i2c_reads", 0) - before
+            worst = max(worst, used)
+            off = sum(1 for r in range(RELAYS) if world.relays[r] != want[r])
+            wrong += off
+            streak = streak + 1 if off else 0
+            longest = max(longest, streak)
+            world.clock.sleep(10)
+        c = world.counters
+        return c.get("i2c_writes", 0) + c.get("i2c_reads", 0), worst, c.get("relay_missed_writes", 0), wrong, longest
+
+    print("{} relays, {} cycles of 10 s, {:.0%} of writes lost".format(RELAYS, CYCLES, MISS_RATE))
+    print("{:<18} {:>10} {:>10} {:>8} {:>14} {:>10}".format("", "I2C total", "max/cycle", "lost", "relay-cycles",
+                                                            "longest"))
+    print("{:<18} {:>10} {:>10} {:>8} {:>14} {:>10}".format("", "", "", "writes", "wrong", "wrong run"))
+    for name, driver in (("toggle per relay", False), ("shadow register", True)):
+        total, worst, lost, wrong, longest = run(driver)
+        print("{:<18} {:>10} {:>10} {:>8} {:>14} {:>10}".format(name, total, worst, lost, wrong, longest))
@@ -0,0 +1,528 @@
+"""
+    ----------------------------------------------------------------------------
+    COMPRESSED BATCH UPLOAD
+    > Operation:
+        - Sends the readings of the RAM history (history.py) that were not
+          uploaded yet in one HTTP POST every `interval_s`, instead of a
+          request per reading: the radio is up once per batch and pays
+          the request headers, the round trip and any connect once
+        - The batch is columnar: a header with the node id, the first
+          timestamp and each channel's name and scale, then the time
+          steps as uint16 seconds and, per channel, the changes of the
+          scaled value as int16 (temp and hum in 0.1, soil and tds in 1, as
+          in the flash log). Slow sensors give long runs of small repeated
+          numbers, which deflate shrinks far better than rows of readings
+        - The batch is compressed with the MicroPython `deflate` module
+          (zlib format, a 2^WBITS byte window) and sent with
+          "Content-Encoding: deflate"; without compression support, or
+          when it does not help, it is sent as it is
+        - Batch and compressed output are written into two buffers sized
+          for a full history when the uploader is made
+        - Only a 2xx reply moves the upload mark; a failed batch is sent
+          again (with the readings added since) after RETRY_MS, as long as
+          the history still holds it
+        - The client has a circuit breaker (circuit_breaker.py): after
+          FAILURE_THRESHOLD failed batches in a row, uploads are held
+          without touching the socket until the backoff has passed, so an
+          unreachable endpoint does not stall the sampling loop for a
+          socket timeout on every retry
+        - decode_batch() is the receiving side (CPython, the gateway's
+          --http port); the gateway ignores readings it already has
+        - Run on CPython for batch sizes, compression ratio, bytes per
+          reading and link time on a simulated day of greenhouse readings,
+          and the receiver's decode rate:  python -m buni.upload
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import struct
+import time
+
+try:
+    import deflate                 # MicroPython 1.21+; compressing needs a port built with it
+except ImportError:
+    deflate = None
+    try:
+        import zlib                # CPython (MicroPython's zlib only decompresses)
+    except ImportError:
+        zlib = None
+
+try:
+    from time import ticks_ms, ticks_add, ticks_diff
+except ImportError:
+    # CPython fallback
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_add(t, delta):
+        return t + delta
+
+    def ticks_diff(a, b):
+        return a - b
+
+# ===== BATCH FORMAT =====
+MAGIC = 0xBA
+VERSION = 1
+# magic, version, channels, readings, node id, unix time of the first reading
+HEAD_FMT = "<BBBHII"
+CHANNEL_FMT = "<HB"                # scale, name length; the name follows
+HEAD_SIZE = struct.calcsize(HEAD_FMT)
+CHANNEL_SIZE = struct.calcsize(CHANNEL_FMT)
+MISSING = -32768                   # in a channel column: no reading, the value carries on
+LIMIT = 16383                      # scaled values are clamped to +-LIMIT so every change fits an int16
+SCALES = {"temp": 10, "hum": 10, "soil": 1, "tds": 1}
+DEFAULT_SCALE = 10
+PATH = b"/upload"
+CONTENT_TYPE = b"application/x-buni-batch"
+
+# ===== CONFIGURATION =====
+PORT = 9080
+INTERVAL_S = 1500      # seconds between batches (25 min: inside a 30 min history)
+RETRY_MS = 60000       # wait after a failed batch
+WBITS = 9              # deflate window of 512 B (the compressor's RAM; 9-15): a larger one gains nothing here
+LEVEL = 9              # CPython zlib level (MicroPython has one)
+
+class _Sink:
+    """Stream that writes into a preallocated buffer (the deflate output)."""
+    def __init__(self, buf):
+        self.buf = buf
+        self.n = 0
+
+    def write(self, data):
+        end = self.n + len(data)
+        if end > len(self.buf):
+            raise ValueError("compressed batch larger than the buffer")
+        self.buf[self.n:end] = data
+        self.n = end
+        return len(data)
+
+class BatchUploader:
+    def __init__(self, history, host, port=PORT, path=PATH, node=0, interval_s=INTERVAL_S,
+                 wbits=WBITS, client=None):
+        self.history = history
+        self.host = host
+        self.path = path
+        self.node = node
+        self.interval_ms = interval_s * 1000
+        self.wbits = wbits
+        if client is None:
+            from buni.circuit_breaker import GuardedClient   # not loaded by the receiving side
+            from buni.http_client import KeepAliveClient
+            client = GuardedClient(KeepAliveClient(tls=False, port=port))
+        self.client = client
+        self.scales = tuple(SCALES.get(name, DEFAULT_SCALE) for name in history.names)
+        names = [name.encode() for name in history.names]
+        self.head_size = HEAD_SIZE + sum(CHANNEL_SIZE + len(name) for name in names)
+        size = self.head_size + 2 * history.capacity * (1 + len(names))
+        self.raw = bytearray(size)
+        self.out = bytearray(size + 64)  # stored deflate blocks add a few bytes when nothing compresses
+        self.sink = _Sink(self.out)
+        offset = HEAD_SIZE
+        for name, scale in zip(names, self.scales):
+            struct.pack_into(CHANNEL_FMT, self.raw, offset, scale, len(name))
+            offset += CHANNEL_SIZE
+            self.raw[offset:offset + len(name)] = name
+            offset += len(name)
+        self.sent_ts = 0               # time of the newest reading uploaded
+        self.sent_same = 0             # readings uploaded with that time
+        self.same = 0                  # readings at the end of the last encoded batch with its time
+        self.next_at = ticks_add(ticks_ms(), self.interval_ms)
+        # Counters
+        self.batches = 0
+        self.readings = 0
+        self.raw_bytes = 0             # batch bytes before compression
+        self.sent_bytes = 0            # body bytes sent
+        self.failures = 0
+        self.held = 0                  # uploads skipped while the endpoint's circuit was open
+        self.uncompressed = 0          # batches sent as they are
+        self.last_status = None
+
+    def due(self):
+        return ticks_diff(ticks_ms(), self.next_at) >= 0
+
+    def encode(self):
+        """
+        Pack the readings from the time of the last upload on into `raw`:
+        a reading in the same second as the last one uploaded goes too (the
+        gateway keeps one row per node and time, so one sent twice is
+        ignored). Returns (length, readings, time of the last one); a gap of
+        more than 18 h between readings, or the clock going back, ends the
+        batch there.
+        """
+        h = self.history
+        ts = h.ts
+        cap = h.capacity
+        count = 0
+        start = None
+        last = prev = 0
+        skip = self.sent_same          # readings at sent_ts that went in the last batch
+        same = 0
+        for i in h.window():
+            t = ts[i]
+            if start is None:
+                if t < self.sent_ts:
+                    continue
+                if t == self.sent_ts and skip:
+                    skip -= 1
+                    continue
+                start = i
+                prev = t
+            elif t < prev or t - prev > 0xFFFF:
+                break                  # clock set back or a long gap: the rest goes in the next batch
+            count += 1
+            same = same + 1 if t == last else 1
+            last = prev = t
+        if not count:
+            return 0, 0, 0
+        self.same = same + self.sent_same if last == self.sent_ts else same
+        buf = self.raw
+        first = ts[start]
+        struct.pack_into(HEAD_FMT, buf, 0, MAGIC, VERSION, len(h.names), count, self.node, first)
+        # time steps
+        o = self.head_size
+        prev = first
+        i = start
+        for _ in range(count):
+            d = ts[i] - prev
+            prev = ts[i]
+            buf[o] = d & 0xFF
+            buf[o + 1] = d >> 8
+            o += 2
+            i += 1
+            if i == cap:
+                i = 0
+        # one column of changes per channel
+        for c in range(len(h.names)):
+            col = h.columns[c]
+            scale = self.scales[c]
+            prev = 0
+            i = start
+            for _ in range(count):
+                v = col[i]
+                if v != v:             # NaN: missing
+                    d = MISSING
+                else:
+                    q = int(round(v * scale))
+                    if q > LIMIT:
+                        q = LIMIT
+                    elif q < -LIMIT:
+                        q = -LIMIT
+                    d = q - prev
+                    prev = q
+                buf[o] = d & 0xFF
+                buf[o + 1] = (d >> 8) & 0xFF
+                o += 2
+                i += 1
+                if i == cap:
+                    i = 0
+        return o, count, last
+
+    def compress(self, n):
+        """(body, Content-Encoding or None) for the first n bytes of `raw`."""
+        src = memoryview(self.raw)[:n]
+        try:
+            if deflate is not None:
+                self.sink.n = 0
+                with deflate.DeflateIO(self.sink, deflate.ZLIB, self.wbits) as stream:
+                    stream.write(src)
+                size = self.sink.n
+            elif zlib is not None and hasattr(zlib, "compressobj"):
+                z = zlib.compressobj(LEVEL, zlib.DEFLATED, self.wbits)
+                data = z.compress(src) + z.flush()
+                size = len(data)
+                if size > len(self.out):
+                    raise ValueError("compressed batch larger than the buffer")
+                self.out[:size] = data
+            else:
+                size = n
+        except (OSError, ValueError):
+            size = n                   # no compressor on this port, or nothing to gain
+        if size >= n:
+            self.uncompressed += 1
+            return src, None
+        return memoryview(self.out)[:size], b"deflate"
+
+    def upload(self):
+        """
+        Send the readings not uploaded yet in one POST. Returns True when
+        they were taken (or there was nothing to send).
+        """
+        self.next_at = ticks_add(ticks_ms(), self.interval_ms)
+        if hasattr(self.client, "available") and not self.client.available(self.host):
+            self.held += 1
+            self.next_at = ticks_add(ticks_ms(), RETRY_MS)
+            return False
+        n, count, last = self.encode()
+        if not count:
+            return True
+        body, encoding = self.compress(n)
+        try:
+            status = self.client.post(self.host, self.path, body, CONTENT_TYPE, encoding)
+        except (OSError, ValueError) as e:
+            print("Upload error:", e)
+            status = 0
+        self.last_status = status
+        if 200 <= status < 300:
+            self.sent_ts = last
+            self.sent_same = self.same
+            self.batches += 1
+            self.readings += count
+            self.raw_bytes += n
+            self.sent_bytes += len(body)
+            return True
+        if status:
+            print("Upload refused:", status)
+        self.failures += 1
+        self.next_at = ticks_add(ticks_ms(), RETRY_MS)
+        return False
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "readings": self.readings,
+            "raw_bytes": self.raw_bytes,
+            "sent_bytes": self.sent_bytes,
+            "ratio": round(self.raw_bytes / self.sent_bytes, 2) if self.sent_bytes else 0,
+            "bytes_per_reading": round(self.sent_bytes / self.readings, 2) if self.readings else 0,
+            "failures": self.failures,
+            "held": self.held,
+            "uncompressed": self.uncompressed,
+            "last_status": self.last_status,
+        }
+
+# ===== RECEIVING SIDE (CPython) =====
+def decode_batch(data):
+    """
+    (node, channel names, rows) of an uncompressed batch; a row is
+    (ts, value, ...) in channel order with None for a missing value.
+    Raises ValueError on anything that is not a whole batch.
+    """
+    import sys
+    from array import array
+    from itertools import accumulate
+
+    if len(data) < HEAD_SIZE:
+        raise ValueError("short upload batch")
+    magic, version, channels, count, node, first = struct.unpack_from(HEAD_FMT, data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not an upload batch")
+    offset = HEAD_SIZE
+    names = []
+    scales = []
+    for _ in range(channels):
+        if offset + CHANNEL_SIZE > len(data):
+            raise ValueError("short upload batch")
+        scale, n = struct.unpack_from(CHANNEL_FMT, data, offset)
+        offset += CHANNEL_SIZE
+        names.append(bytes(data[offset:offset + n]).decode())
+        scales.append(scale or 1)
+        offset += n
+    if len(data) != offset + 2 * count * (1 + channels):
+        raise ValueError("upload batch length does not match its header")
+    swap = sys.byteorder != "little"
+    steps = array("H")
+    steps.frombytes(data[offset:offset + 2 * count])
+    if swap:
+        steps.byteswap()
+    offset += 2 * count
+    columns = [[first + t for t in accumulate(steps)]]
+    for scale in scales:
+        changes = array("h")
+        changes.frombytes(data[offset:offset + 2 * count])
+        if swap:
+            changes.byteswap()
+        offset += 2 * count
+        if MISSING in changes:
+            column = []
+            q = 0
+            for d in changes:
+                if d == MISSING:
+                    column.append(None)
+                else:
+                    q += d
+                    column.append(q / scale)
+        else:
+            column = [q / scale for q in accumulate(changes)]
+        columns.append(column)
+    return node, names, list(zip(*columns))
+
+# ===== BENCHMARK (simulator) =====
+if __name__ == "__main__":
+    import importlib.util
+    import io
+    import os
+    import sys
+    import zlib as czlib
+    from contextlib import redirect_stdout
+
+    import sim
+
+    HOURS = 24
+    PERIOD = 5                         # seconds between readings
+    GATEWAY = ("192.168.1.10", PORT)
+    NODE = 0x1234
+    REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # one reading per GET, the way the notifiers talk to their APIs
+    GET = ("GET /reading?node=4660&ts={}&temp={}&hum={}&soil={}&tds={} HTTP/1.1\r\n"
+           "Host: 192.168.1.10\r\nConnection: keep-alive\r\n\r\n")
+    REPLY = b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok"
+
+    def monitor():
+        """The soil monitor script as a module (its sensor classes and calibration)."""
+        if REPO not in sys.path:
+            sys.path.insert(1, REPO)
+        spec = importlib.util.spec_from_file_location("monitor", os.path.join(REPO, "soil-moisture-monitor.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    def http_service(world, gateway, bodies):
+        """The gateway's --http endpoint on the simulated network."""
+        def service(rx):
+            end = rx.find(b"\r\n\r\n")
+            if end < 0:
+                return b""
+            lines = bytes(rx[:end]).decode().split("\r\n")
+            method, path, _ = lines[0].split(" ", 2)
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            size = end + 4 + int(headers.get("content-length", 0))
+            if len(rx) < size:
+                return b""
+            body = bytes(rx[end + 4:size])
+            del rx[:size]
+            bodies.append((body, headers.get("content-encoding")))
+            status, reply = gateway.http_request(method, path, headers, body)
+            return b"HTTP/1.1 %d OK\r\nContent-Length: %d\r\n\r\n" % (status, len(reply)) + reply
+        return service
+
+    world = sim.install(seed=1)
+    from buni import upload            # re-imported so ticks_ms and the socket are the simulated ones
+    from buni.history import History
+    from gateway.server import Gateway
+    from gateway.store import Store
+
+    m = monitor()
+    dht_sensor = m.DHT22Sensor(m.DHT_PIN)
+    soil = m.SoilMoisture(m.SOIL_ADC_PIN)
+    tds = m.TDSSensor(m.TDS_ADC_PIN)
+    history = History(m.HISTORY_CHANNELS, m.HISTORY_SIZE)
+    gateway = Gateway(Store())
+    bodies = []
+    world.services[GATEWAY] = http_service(world, gateway, bodies)
+    from network import WLAN
+    wlan = WLAN(0)
+    wlan.active(True)
+    wlan.connect("sim", "sim")
+    world.clock.advance(world.wifi_connect_time)
+
+    uploader = upload.BatchUploader(history, GATEWAY[0], node=NODE, interval_s=m.UPLOAD_INTERVAL)
+    readings = []
+    link = 0.0
+    encode_s = 0.0
+    for t in range(0, HOURS * 3600, PERIOD):
+        cycle_start = world.clock.now
+        with redirect_stdout(io.StringIO()):
+            temp, hum = dht_sensor.read()
+            soil_pct, _ = soil.read_percent()
+            tds_ppm = tds.read_tds(temperature_c=(temp if temp is not None else 25.0))["tds"]
+        now = int(world.clock.time())
+        history.append(now, temp, hum, soil_pct, tds_ppm)
+        readings.append((now, temp, hum, soil_pct, tds_ppm))
+        if uploader.due():
+            started = world.clock.now
+            t0 = time.perf_counter()
+            uploader.encode()
+            encode_s += time.perf_counter() - t0
+            uploader.upload()
+            link += world.clock.now - started
+        world.clock.advance(max(0, cycle_start + PERIOD - world.clock.now))
+    uploader.upload()
+    gateway.flush()
+    n = len(readings)
+    assert gateway.store.rows == n, (gateway.store.rows, n)
+    stored = gateway.store.readings(NODE)
+    worst = max(abs(a - b) for r, s in zip(readings, stored) for a, b in zip(r[1:], s[1:])
+                if a is not None and b is not None)
+
+    # the same readings in other shapes, batch by batch
+    raws = []
+    for body, encoding in bodies:
+        raws.append(czlib.decompress(body) if encoding == "deflate" else body)
+    sizes = {}
+    start = 0
+    for raw in raws:
+        count = struct.unpack_from(HEAD_FMT, raw)[3]
+        rows = readings[start:start + count]
+        start += count
+        csv = "".join("{},{},{},{},{}\n".format(*r) for r in rows).encode()
+        binary = b"".join(struct.pack("<Ihhhh", r[0], *(MISSING if v is None else int(round(v * s)) for v, s in
+                                                       zip(r[1:], (10, 10, 1, 1)))) for r in rows)
+        for name, data in (("CSV", csv), ("CSV + deflate", czlib.compress(csv, LEVEL)),
+                           ("rows, 12 B each", binary), ("rows + deflate", czlib.compress(binary, LEVEL)),
+                           ("columnar", raw)):
+            sizes[name] = sizes.get(name, 0) + len(data)
+    sizes["columnar + deflate"] = sum(len(body) for body, _ in bodies)
+    gets = sum(len(GET.format(*r)) + len(REPLY) for r in readings)
+
+    print("{} h of greenhouse readings every {} s: {} readings in {} batches of up to {}".format(
+        HOURS, PERIOD, n, len(bodies), m.HISTORY_SIZE))
+    print("  {:<22} {:>9} {:>10} {:>8}".format("batch body", "bytes", "B/reading", "vs CSV"))
+    for name, size in sizes.items():
+        print("  {:<22} {:>9} {:>10.2f} {:>7.1f}x".format(name, size, size / n, sizes["CSV"] / size))
+    windows = []
+    for wbits in (9, 10, 12, 15):
+        size = 0
+        for raw in raws:
+            z = czlib.compressobj(LEVEL, czlib.DEFLATED, wbits)
+            size += len(z.compress(raw) + z.flush())
+        windows.append("2^{} B {:.2f}".format(wbits, size / n))
+    print("  columnar + deflate by window (B/reading): " + ", ".join(windows))
+    print("Link time per day (simulated {:.0f} kB/s, {:.0f} ms round trip):".format(
+        world.tcp_rate / 1000, world.tcp_rtt * 1000))
+    print("  a GET per reading      {:>7.1f} s  ({} B)".format(gets / world.tcp_rate + n * world.tcp_rtt, gets))
+    print("  batched, compressed    {:>7.1f} s  ({} B with headers, {} connects)".format(
+        link, world.counters.get("tcp_bytes", 0), uploader.client.client.connects))
+    print("Device encode: {:.1f} ms per batch on CPython; buffers {} B".format(
+        encode_s / len(bodies) * 1000, len(uploader.raw) + len(uploader.out)))
+    print("Gateway: {} readings stored, worst difference {:.2f} (scaling)".format(gateway.store.rows, worst))
+
+    # receiver decode rate
+    t0 = time.perf_counter()
+    rounds = 20
+    for _ in range(rounds):
+        for body, encoding in bodies:
+            decode_batch(czlib.decompress(body) if encoding == "deflate" else body)
+    took = time.perf_counter() - t0
+    print("Receiver: inflate + decode {:.0f} readings/s ({:.2f} ms per {}-reading batch)".format(
+        rounds * n / took, took / rounds / len(bodies) * 1000, m.HISTORY_SIZE))
+
+    # an endpoint that stopped answering: each try blocks the loop for a socket timeout
+    from buni.http_client import KeepAliveClient, TIMEOUT
+
+    def dead_service(rx):
+        world.clock.advance(TIMEOUT)
+        raise OSError(110, "ETIMEDOUT")
+
+    DEAD = ("192.168.1.11", PORT)
+    world.services[DEAD] = dead_service
+    blocked = {}
+    for guarded in (False, True):
+        client = None if guarded else KeepAliveClient(tls=False, port=PORT)
+        dead = upload.BatchUploader(history, DEAD[0], node=NODE, interval_s=60, client=client)
+        stalled = 0.0
+        with redirect_stdout(io.StringIO()):
+            for t in range(0, 6 * 3600, PERIOD):
+                cycle_start = world.clock.now
+                if dead.due():
+                    dead.upload()
+                stalled += world.clock.now - cycle_start
+                world.clock.advance(max(0, cycle_start + PERIOD - world.clock.now))
+        blocked[guarded] = stalled
+        print("Unreachable endpoint for 6 h, {}: {} tries timed out, {} held, loop blocked {:.0f} s".format(
+            "circuit breaker" if guarded else "plain client", dead.failures, dead.held, stalled))
+    assert blocked[True] * 5 < blocked[False], blocked
@@ -0,0 +1,236 @@
+"""
+    ----------------------------------------------------------------------------
+    WIFI CONNECTION MANAGER
+    > Operation:
+        - Non-blocking state machine for the station interface, states
+          idle / connecting / up / backoff
+        - tick() looks at the radio once and moves to the next state; it
+          never sleeps or polls in a loop, so the sampling loop calls it
+          once per cycle (or run() does it as an async task)
+        - Connecting: waits for an IP without blocking; a failed status or
+          CONNECT_TIMEOUT_MS without an IP goes to backoff
+        - Backoff: retries after BACKOFF_MIN_MS, doubling per failed attempt
+          up to BACKOFF_MAX_MS (+/- JITTER so many nodes do not retry in
+          step); a successful connect resets it
+        - Up: a lost link is noticed on the next tick and reconnected at
+          once, for as long as the program runs
+        - Records how long connects take and how long each outage lasted
+        - Run this file on CPython for a demo on the simulated network.WLAN
+          (sim/) with connect failures and outages; tests/test_wifi_manager.py
+          checks a reconnect after each outage, every backoff within its
+          bounds and the recorded outage time against the injected one
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import time
+try:
+    import network
+except ImportError:
+    network = None
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+try:
+    from random import getrandbits
+except ImportError:
+    from urandom import getrandbits
+
+try:
+    from time import ticks_ms, ticks_add, ticks_diff
+except ImportError:
+    # CPython fallback
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_add(t, delta):
+        return t + delta
+
+    def ticks_diff(a, b):
+        return a - b
+
+# ===== CONFIGURATION =====
+CONNECT_TIMEOUT_MS = 15000   # give up on a connect attempt after this long
+BACKOFF_MIN_MS = 2000        # wait after the first failed attempt
+BACKOFF_MAX_MS = 60000       # longest wait between attempts (1 min)
+JITTER = 0.25                # +/- share of the backoff chosen at random
+POLL_MS = 500                # run(): time between ticks
+
+# States
+IDLE = 0
+CONNECTING = 1
+UP = 2
+BACKOFF = 3
+STATE_NAMES = ("idle", "connecting", "up", "backoff")
+
+class WiFiManager:
+    def __init__(self, ssid, password, wlan=None, connect_timeout_ms=CONNECT_TIMEOUT_MS,
+                 backoff_min_ms=BACKOFF_MIN_MS, backoff_max_ms=BACKOFF_MAX_MS, jitter=JITTER):
+        self.ssid = ssid
+        self.password = password
+        if wlan is None and network is not None:
+            wlan = network.WLAN(network.STA_IF)
+        self.wlan = wlan
+        self.connect_timeout_ms = connect_timeout_ms
+        self.backoff_min_ms = backoff_min_ms
+        self.backoff_max_ms = backoff_max_ms
+        self.jitter = jitter
+        self.state = IDLE
+        self.backoff_ms = backoff_min_ms
+        self.attempt_ms = 0            # ticks when the current attempt started
+        self.retry_at = 0
+        self.down_ms = None            # ticks when the link was lost (None = no outage)
+        # Counters
+        self.attempts = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.drops = 0
+        self.connect_ms_total = 0
+        self.connect_ms_max = 0
+        self.outage_ms_total = 0
+        self.outage_ms_max = 0
+        self.outage_ms_last = 0
+        if wlan is None:
+            print("Network module not available on this build.")
+
+    def up(self):
+        """True while the link has an IP (as of the last tick)."""
+        return self.state == UP
+
+    def tick(self):
+        """Advance the state machine by one step; returns up()."""
+        wlan = self.wlan
+        if wlan is None:
+            return False
+        now = ticks_ms()
+        if self.state == IDLE:
+            wlan.active(True)
+            self._connect(now)
+        elif self.state == CONNECTING:
+            if wlan.isconnected():
+                self._connected(now)
+            elif wlan.status() < 0:
+                self._failed(now, "failed (status {})".format(wlan.status()))
+            elif ticks_diff(now, self.attempt_ms) >= self.connect_timeout_ms:
+                self.timeouts += 1
+                self._failed(now, "timed out")
+        elif self.state == UP:
+            if not wlan.isconnected():
+                self.drops += 1
+                self.down_ms = now
+                print("WiFi link lost, reconnecting...")
+                self._connect(now)
+        elif ticks_diff(now, self.retry_at) >= 0:
+            self._connect(now)
+        return self.state == UP
+
+    async def run(self, poll_ms=POLL_MS, on_change=None):
+        """Tick forever as a task; on_change(up) is called whenever up() flips."""
+        was_up = False
+        while True:
+            is_up = self.tick()
+            if is_up != was_up and on_change is not None:
+                on_change(is_up)
+            was_up = is_up
+            if hasattr(asyncio, "sleep_ms"):
+                await asyncio.sleep_ms(poll_ms)
+            else:
+                await asyncio.sleep(poll_ms / 1000)
+
+    def _connect(self, now):
+        self.state = CONNECTING
+        self.attempt_ms = now
+        self.attempts += 1
+        try:
+            self.wlan.connect(self.ssid, self.password)
+        except Exception as e:
+            self._failed(now, "exception: {}".format(e))
+
+    def _connected(self, now):
+        took = ticks_diff(now, self.attempt_ms)
+        self.state = UP
+        self.connects += 1
+        self.connect_ms_total += took
+        if took > self.connect_ms_max:
+            self.connect_ms_max = took
+        self.backoff_ms = self.backoff_min_ms
+        if self.down_ms is not None:
+            outage = ticks_diff(now, self.down_ms)
+            self.outage_ms_last = outage
+            self.outage_ms_total += outage
+            if outage > self.outage_ms_max:
+                self.outage_ms_max = outage
+            print("WiFi back after {} s:".format(outage // 1000), self.wlan.ifconfig()[0])
+        else:
+            print("WiFi connected in {} ms:".format(took), self.wlan.ifconfig()[0])
+        self.down_ms = None
+
+    def _failed(self, now, reason):
+        self.failures += 1
+        try:
+            self.wlan.disconnect()
+        except Exception:
+            pass
+        if self.down_ms is None and self.connects:
+            self.down_ms = now
+        spread = int(self.backoff_ms * self.jitter)
+        delay = self.backoff_ms - spread + (getrandbits(16) * 2 * spread >> 16)
+        self.retry_at = ticks_add(now, delay)
+        self.state = BACKOFF
+        print("WiFi connect {}, retry in {} ms".format(reason, delay))
+        self.backoff_ms = min(self.backoff_ms * 2, self.backoff_max_ms)
+
+    def stats(self):
+        return {"state": STATE_NAMES[self.state], "attempts": self.attempts, "connects": self.connects,
+                "failures": self.failures, "timeouts": self.timeouts, "drops": self.drops,
+                "connect_ms_mean": self.connect_ms_total // self.connects if self.connects else 0,
+                "connect_ms_max": self.connect_ms_max,
+                "outage_s_total": self.outage_ms_total // 1000, "outage_s_max": self.outage_ms_max // 1000}
+
+# ===== DEMO (CPython, simulated radio) =====
+if __name__ == "__main__":
+    import sim
+
+    # 6 h with failing connect attempts and three access point outages
+    world = sim.install(seed=1)
+    world.wifi_fail_rate = 0.3
+    world.wifi_outages = [(1800, 1920), (7200, 9000), (14400, 14405)]
+    from buni import wifi_manager       # re-imported so ticks_ms and network are the simulated ones
+
+    wifi = wifi_manager.WiFiManager("ssid", "password")
+    step_s = 0.5              # tick period, as in run()
+    sample_s = 5
+    late = 0                  # samples that had to wait for the radio
+    samples = 0
+    up_samples = 0
+    steps = 0
+    backoffs = 0
+    reconnected = []          # time the link was back after each outage
+    while world.clock.now < 6 * 3600:
+        t0 = world.clock.now
+        was_up = wifi.up()
+        state = wifi.state
+        up = wifi.tick()
+        if world.clock.now != t0:
+            late += 1
+        if wifi.state == BACKOFF and state != BACKOFF:
+            backoffs += 1
+        if up and not was_up and wifi.connects > 1:
+            reconnected.append(world.clock.now)
+        steps += 1
+        if steps % int(sample_s / step_s) == 0:
+            samples += 1
+            up_samples += up
+        world.clock.sleep(step_s)
+    injected = sum(e - s for s, e in world.wifi_outages)
+    print()
+    print("Samples: {}, with link up: {}; ticks that took simulated time: {}".format(samples, up_samples, late))
+    print("Outages injected: {} s, recorded: {} s; back after {} s; {} backoffs".format(
+        injected, wifi.outage_ms_total // 1000,
+        ", ".join("{:.0f}".format(t - e) for t, (s, e) in zip(reconnected, world.wifi_outages)), backoffs))
+    print(wifi.stats())
+    print("Radio:", {k: v for k, v in world.counters.items() if k.startswith("wifi")})
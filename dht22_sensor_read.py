@@ -18,6 +18,7 @@ import machine
 from time import sleep
 from machine import Pin
 from PicoDHT22 import PicoDHT22
+from buni.dht_cache import DHTCache
 
 # ===== CONFIGURATION =====
 DHT_PIN = 10                    # GPIO pin connected to DHT22 data pin
@@ -28,6 +29,8 @@ DECIMAL_PLACES = 2              # Number of decimal places for rounding
 # Initialize DHT22 sensor on specified pin
 # Pin.PULL_UP enables internal pull-up resistor for stable readings
 dht_sensor = PicoDHT22(Pin(DHT_PIN, Pin.IN, Pin.PULL_UP))
+# All reads go through the cache: at most one measurement every 2 seconds
+dht_cache = DHTCache(dht_sensor)
 
 # ===== FUNCTION DEFINITIONS =====
 def read_sensor_data():
@@ -37,7 +40,7 @@ def read_sensor_data():
     """
     try:
         # Read raw temperature and humidity values from sensor
-        temperature, humidity = dht_sensor.read()
+        temperature, humidity = dht_cache.read()
 
         # Check for valid readings (DHT22 returns None on failure)
         if temperature is None or humidity is None:
@@ -0,0 +1,23 @@
+"""
+    ----------------------------------------------------------------------------
+    FLEET GATEWAY (CPython, Linux)
+    > Operation:
+        - Collects readings and alerts from many Pico nodes (frames.py),
+          stores them in SQLite and sends the alerts to Telegram / WhatsApp
+          so the nodes no longer need their own API keys
+        - server.py  : UDP/TCP/HTTP listeners, batching, central alert digests
+        - store.py   : indexed time-series store
+        - rules.py   : alert limits
+        - fanout.py  : messaging API senders
+        - stub.py    : local stand-in for the messaging APIs
+    > Usage:
+        python -m gateway --stub              (from the repository folder)
+        python -m gateway.bench --nodes 5000  (load test)
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+from gateway.server import Gateway
+from gateway.store import Store
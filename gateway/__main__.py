@@ -0,0 +1,81 @@
+"""
+    Run the fleet gateway:
+        python -m gateway [--db fleet.db] [--port 9750] [--http 9080]
+                          [--telegram TOKEN CHAT_ID] [--whatsapp PHONE APIKEY]
+                          [--stub]
+    --stub sends alerts to a local messaging stub instead of the real APIs.
+    --http also takes compressed batch uploads (buni/upload.py) on that port.
+"""
+
+import asyncio
+import sys
+
+from gateway.fanout import Fanout, Telegram, WhatsApp
+from gateway.server import Gateway, UDP_PORT
+from gateway.store import Store
+from gateway.stub import MessagingStub
+
+async def serve(gateway, port, http_port=None):
+    await gateway.serve(udp_port=port, tcp_port=port, http_port=http_port)
+    print("Gateway listening on UDP/TCP port", port)
+    if http_port is not None:
+        print("Batch uploads on HTTP port", http_port)
+    while True:
+        await asyncio.sleep(60)
+        print("Gateway:", gateway.stats())
+
+def main(argv):
+    db = "fleet.db"
+    port = UDP_PORT
+    http_port = None
+    channels = []
+    stub = None
+    i = 0
+    while i < len(argv):
+        if argv[i] == "--db":
+            db = argv[i + 1]
+            i += 1
+        elif argv[i] == "--port":
+            port = int(argv[i + 1])
+            i += 1
+        elif argv[i] == "--http":
+            http_port = int(argv[i + 1])
+            i += 1
+        elif argv[i] == "--telegram":
+            channels.append(Telegram(argv[i + 1], argv[i + 2]))
+            i += 2
+        elif argv[i] == "--whatsapp":
+            channels.append(WhatsApp(argv[i + 1], argv[i + 2]))
+            i += 2
+        elif argv[i] == "--stub":
+            stub = MessagingStub()
+        else:
+            print(__doc__)
+            return 1
+        i += 1
+
+    fanout = None
+    if stub is not None:
+        channels = channels or [Telegram("TOKEN", "1")]
+        fanout = Fanout(channels, tls=False, resolve=stub.resolve())
+    elif channels:
+        fanout = Fanout(channels)
+    else:
+        print("No messaging channels configured: alerts are stored only.")
+    gateway = Gateway(Store(db), fanout)
+    try:
+        asyncio.run(serve(gateway, port, http_port))
+    except KeyboardInterrupt:
+        print("Stopping gateway.")
+    finally:
+        gateway.close()
+        if fanout is not None:
+            fanout.close()
+        if stub is not None:
+            print("Stub received {} messages".format(len(stub.messages)))
+            stub.close()
+        gateway.store.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,111 @@
+"""
+    Gateway load test: many simulated nodes send one reading frame each per
+    period over UDP to a gateway on localhost, with the messaging stub
+    standing in for Telegram / CallMeBot.
+        python -m gateway.bench [--nodes N] [--seconds S] [--period P] [--db file]
+    A small share of the nodes reads hot, so alerts and fan-out run too.
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+from buni import frames
+from gateway.fanout import Fanout, Telegram, WhatsApp
+from gateway.server import Gateway
+from gateway.store import Store
+from gateway.stub import MessagingStub
+
+# ===== CONFIGURATION =====
+NODES = 5000
+SECONDS = 20
+PERIOD = 5.0            # seconds between readings of one node
+HOT_EVERY = 50          # every Nth node reports a high temperature
+ALERT_WINDOW = 5        # short digest window so fan-out is exercised
+
+def load(addr, nodes, seconds, period, result):
+    """Send readings from `nodes` nodes, spread evenly over each period."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    buf = bytearray(frames.READING_SIZE)
+    ts0 = int(time.time())
+    interval = period / nodes
+    start = time.perf_counter()
+    sent = 0
+    total = int(seconds / period) * nodes
+    while sent < total:
+        cycle, node = divmod(sent, nodes)
+        temp = 36.0 if node % HOT_EVERY == 0 else 24.0 + (node % 7) * 0.5
+        frames.encode_reading(buf, 0, node + 1, cycle + 1, ts0 + int(cycle * PERIOD),
+                              temp, 55.0, 45, 600)
+        sock.sendto(buf, addr)
+        sent += 1
+        # pace against the schedule, not per frame
+        ahead = start + sent * interval - time.perf_counter()
+        if ahead > 0.002:
+            time.sleep(ahead)
+    result["sent"] = sent
+    result["send_s"] = time.perf_counter() - start
+    sock.close()
+
+async def run(nodes, seconds, period, db):
+    stub = MessagingStub()
+    fanout = Fanout((Telegram("TOKEN", "1"), WhatsApp("+254700000000", "KEY")),
+                    tls=False, resolve=stub.resolve())
+    store = Store(db)
+    gateway = Gateway(store, fanout, alert_window=ALERT_WINDOW)
+    await gateway.serve("127.0.0.1", udp_port=0, tcp_port=None)
+
+    result = {}
+    cpu0 = time.process_time()
+    sender = threading.Thread(target=load, args=(gateway.addresses["udp"], nodes, seconds, period, result))
+    sender.start()
+    while sender.is_alive():
+        await asyncio.sleep(0.1)
+    await asyncio.sleep(gateway.flush_interval + 0.5)
+    gateway.send_digests(time.time() + ALERT_WINDOW)
+    gateway.close()
+    cpu = time.process_time() - cpu0
+    fanout.drain(10)
+    fanout.close()
+
+    t0 = time.perf_counter()
+    rows = store.readings(1)
+    query_ms = (time.perf_counter() - t0) * 1000
+    stats = gateway.stats()
+    print("Nodes: {}  period: {} s  offered: {:.0f} frames/s".format(nodes, period, nodes / period))
+    print("Sent {} frames in {:.1f} s, gateway got {} ({} lost), stored {} rows".format(
+        result["sent"], result["send_s"], stats["frames"], result["sent"] - stats["frames"], store.count()))
+    print("Store: {} batches, {:.3f} s writing ({:.1f} us/row)".format(
+        stats["batches"], stats["flush_s"], stats["flush_s"] * 1e6 / max(1, stats["rows"])))
+    print("CPU: {:.2f} s for the whole process ({:.0f}% of one core)".format(cpu, 100 * cpu / result["send_s"]))
+    print("Query one node ({} rows): {:.2f} ms".format(len(rows), query_ms))
+    print("Alerts: {} digests -> fan-out {} -> stub received {} messages".format(
+        stats["messages"], fanout.stats(), len(stub.messages)))
+    if stub.messages:
+        print("  e.g.", stub.messages[0][1])
+    store.close()
+    stub.close()
+
+def main(argv):
+    nodes, seconds, period, db = NODES, SECONDS, PERIOD, ":memory:"
+    i = 0
+    while i < len(argv):
+        if argv[i] == "--nodes":
+            nodes = int(argv[i + 1])
+        elif argv[i] == "--seconds":
+            seconds = float(argv[i + 1])
+        elif argv[i] == "--period":
+            period = float(argv[i + 1])
+        elif argv[i] == "--db":
+            db = argv[i + 1]
+        i += 2
+    if db != ":memory:" and os.path.exists(db):
+        os.remove(db)
+    asyncio.run(run(nodes, seconds, period, db))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
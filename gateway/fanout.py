@@ -0,0 +1,117 @@
+"""
+    ----------------------------------------------------------------------------
+    GATEWAY ALERT FAN-OUT
+    > Operation:
+        - Sends alert messages to Telegram and CallMeBot (WhatsApp) from a
+          few worker threads, so slow APIs never stall ingestion
+        - Each worker keeps its own keep-alive connections (http_client.py)
+        - Bounded queue: when the APIs cannot keep up the oldest message is
+          dropped and counted
+        - The API keys live on the gateway only, not on every node
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import collections
+import threading
+from urllib.parse import quote
+
+from buni.http_client import KeepAliveClient
+
+# ===== CONFIGURATION =====
+WORKERS = 4            # concurrent senders
+QUEUE_SIZE = 1000      # messages waiting before the oldest is dropped
+
+class Telegram:
+    HOST = "api.telegram.org"
+
+    def __init__(self, token, chat_id):
+        self.token = token
+        self.chat_id = chat_id
+
+    def path(self, message):
+        return "/bot{}/sendMessage?chat_id={}&text={}".format(self.token, self.chat_id, quote(message))
+
+class WhatsApp:
+    HOST = "api.callmebot.com"
+
+    def __init__(self, phone, apikey):
+        self.phone = phone
+        self.apikey = apikey
+
+    def path(self, message):
+        return "/whatsapp.php?phone={}&text={}&apikey={}".format(quote(self.phone), quote(message), self.apikey)
+
+class Fanout:
+    """
+    send(message) queues one message for every channel. `resolve`, `tls`
+    and `port` are passed to the HTTP clients (used to point them at the
+    local stub in tests).
+    """
+    def __init__(self, channels, workers=WORKERS, queue_size=QUEUE_SIZE, tls=True, port=443, resolve=None):
+        self.channels = channels
+        self.queue = collections.deque(maxlen=queue_size)
+        self.cond = threading.Condition()
+        self.running = True
+        self.busy = 0
+        # Counters
+        self.queued = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.threads = []
+        for i in range(workers):
+            http = KeepAliveClient(tls=tls, port=port, resolve=resolve)
+            t = threading.Thread(target=self._worker, args=(http,), name="fanout-{}".format(i), daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def send(self, message):
+        with self.cond:
+            for channel in self.channels:
+                if len(self.queue) == self.queue.maxlen:
+                    self.dropped += 1
+                self.queue.append((channel, message))
+                self.queued += 1
+            self.cond.notify(len(self.channels))
+
+    def _worker(self, http):
+        while True:
+            with self.cond:
+                while self.running and not self.queue:
+                    self.cond.wait()
+                if not self.queue:
+                    break
+                channel, message = self.queue.popleft()
+                self.busy += 1
+            try:
+                ok = http.get(channel.HOST, channel.path(message)) == 200
+            except Exception as e:
+                print("Fan-out error ({}): {}".format(channel.HOST, e))
+                ok = False
+            with self.cond:
+                self.busy -= 1
+                if ok:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+                self.cond.notify_all()
+        http.close()
+
+    def drain(self, timeout=None):
+        """Wait until every queued message has been attempted."""
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.queue and not self.busy, timeout)
+
+    def close(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        for t in self.threads:
+            t.join()
+
+    def stats(self):
+        return {"queued": self.queued, "sent": self.sent, "failed": self.failed,
+                "dropped": self.dropped, "pending": len(self.queue)}
@@ -0,0 +1,42 @@
+"""
+    ----------------------------------------------------------------------------
+    GATEWAY ALERT RULES
+    > Operation:
+        - The limits the node scripts check locally, applied centrally to
+          every reading the gateway receives
+        - A rule is (alert name, channel, comparison, limit, unit); names
+          match the node scripts' rules, and nodes send no alert frames of
+          their own
+        - A missing temperature/humidity means the node's DHT22 read failed
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+# Channels in a reading frame
+TEMP, HUM, SOIL, TDS = range(4)
+ABOVE = ">"
+BELOW = "<"
+
+# Same limits as soil-moisture-monitor.py
+RULES = (
+    ("High temperature", TEMP, ABOVE, 30, "C"),
+    ("Low humidity", HUM, BELOW, 40, "%"),
+    ("Soil dry", SOIL, BELOW, 30, "%"),
+    ("Soil wet", SOIL, ABOVE, 70, "%"),
+    ("High TDS", TDS, ABOVE, 800, "ppm"),
+)
+
+def evaluate(values, rules=RULES):
+    """Alerts raised by one reading: [(name, value, unit), ...]."""
+    if values[TEMP] is None and values[HUM] is None:
+        return [("DHT22 read failed", None, "")]
+    fired = []
+    for name, channel, op, limit, unit in rules:
+        value = values[channel]
+        if value is None:
+            continue
+        if (value > limit) if op == ABOVE else (value < limit):
+            fired.append((name, value, unit))
+    return fired
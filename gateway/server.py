@@ -0,0 +1,323 @@
+"""
+    ----------------------------------------------------------------------------
+    FLEET GATEWAY
+    > Operation:
+        - Receives reading frames (frames.py) from the nodes over
+          UDP (one datagram may hold several frames) and TCP (a stream of
+          frames)
+        - Buffers rows and writes them to the store in batches, every
+          FLUSH_INTERVAL seconds or once BATCH_ROWS are waiting
+        - Applies the alert rules (rules.py) to every reading and collects
+          alerts per node in an AlertDigest, so a long incident costs one
+          message per node per ALERT_WINDOW
+        - Hands due digests to the fan-out (fanout.py)
+        - Tracks lost frames per node from the frame sequence numbers
+        - Also accepts deadband / delta frames (deadband.py) over UDP, with
+          one decoder per sender address
+        - Over TCP also takes store-and-forward batches (buni/outbox.py):
+          records already received (same node, lane and sequence) are
+          dropped, and each batch is answered with the number of records
+          taken. While more than BATCH_ROWS readings wait for the store the
+          rest of a batch is refused, so nodes draining a backlog slow down
+          instead of filling the gateway's memory
+        - Over HTTP (http_port) takes compressed batch uploads
+          (buni/upload.py): POST /upload, inflated up to MAX_UPLOAD bytes,
+          written to the store at once; readings it already has (same node
+          and time) are ignored, so a node may send a reading again
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import asyncio
+import socket
+import struct
+import time
+import zlib
+
+from buni import frames, outbox, upload
+from buni.alert_digest import AlertDigest
+from buni.deadband import MAGIC as DELTA_MAGIC, DeltaDecoder
+from gateway.rules import RULES, evaluate
+
+# ===== CONFIGURATION =====
+UDP_PORT = 9750
+TCP_PORT = 9750
+HTTP_PORT = 9080
+MAX_UPLOAD = 65536       # bytes of an upload batch, before and after inflating
+FLUSH_INTERVAL = 1.0     # seconds between store writes
+BATCH_ROWS = 5000        # write early when this many rows are waiting
+ALERT_WINDOW = 300       # seconds per alert digest and node
+DIGEST_CHECK = 1.0       # seconds between checks for due digests
+UDP_RCVBUF = 4 << 20     # socket receive buffer; absorbs bursts while the store writes
+
+# Channels of a stored reading, matched by name to the channels of an upload batch
+CHANNELS = ("temp", "hum", "soil", "tds")
+
+class Gateway:
+    def __init__(self, store, fanout=None, rules=RULES, alert_window=ALERT_WINDOW,
+                 batch_rows=BATCH_ROWS, flush_interval=FLUSH_INTERVAL):
+        self.store = store
+        self.fanout = fanout
+        self.rules = rules
+        self.alert_window = alert_window
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self.pending = []              # reading rows waiting for the store
+        self.pending_alerts = []       # alert rows waiting for the store
+        self.digests = {}              # node -> AlertDigest
+        self.alerting = set()          # nodes with something in their digest
+        self.last_seq = {}             # node -> last frame sequence number
+        self.decoders = {}             # sender address -> DeltaDecoder
+        self.keys = outbox.SeenKeys()  # outbox records already received
+        self.servers = []
+        self.addresses = {}            # "udp" / "tcp" -> (host, port) bound (useful with port 0)
+        # Counters
+        self.packets = 0
+        self.frames = 0
+        self.bad = 0
+        self.lost = 0
+        self.messages = 0
+        self.upload_replayed = 0       # uploaded readings the gateway already had
+        self.flush_time = 0.0
+
+    # --- ingestion ---
+    def ingest(self, data, addr=None):
+        """Parse one datagram / stream chunk holding whole frames."""
+        self.packets += 1
+        if data and data[0] == DELTA_MAGIC:
+            self._ingest_delta(data, addr)
+            return
+        offset = 0
+        while offset < len(data):
+            frame, offset = frames.decode(data, offset)
+            if frame is None:
+                self.bad += 1
+                break
+            self.handle(frame)
+        if len(self.pending) >= self.batch_rows:
+            self.flush()
+
+    def handle(self, frame):
+        kind, node, seq, ts, payload = frame
+        self.frames += 1
+        last = self.last_seq.get(node)
+        if last is not None:
+            gap = (seq - last - 1) & 0xFFFF
+            if gap < 0x8000:           # ignore reordered / repeated frames
+                self.lost += gap
+        self.last_seq[node] = seq
+        self._reading(node, ts, payload)
+
+    def _ingest_delta(self, data, addr):
+        decoder = self.decoders.get(addr)
+        if decoder is None:
+            decoder = self.decoders[addr] = DeltaDecoder()
+        lost = decoder.lost
+        for node, ts, values, mask in decoder.decode(data):
+            self.frames += 1
+            self.last_seq[node] = decoder.seq
+            self._reading(node, ts, values)
+        self.lost += decoder.lost - lost
+        if len(self.pending) >= self.batch_rows:
+            self.flush()
+
+    def outbox_batch(self, data):
+        """Take one outbox batch; returns how many of its records were taken."""
+        self.packets += 1
+        try:
+            node, records = outbox.decode_batch(data)
+        except ValueError:
+            self.bad += 1
+            return 0
+        taken = 0
+        for lane, kind, seq, ts, payload in records:
+            if len(self.pending) >= self.batch_rows:
+                break                  # the store is behind: the node sends the rest later
+            taken += 1
+            if not self.keys.fresh(node, lane, seq):
+                continue
+            self.frames += 1
+            if kind == outbox.READING:
+                self._reading(node, ts, outbox.unpack_reading(payload))
+            elif kind == outbox.MESSAGE:
+                self.messages += 1
+                if self.fanout is not None:
+                    self.fanout.send("Node {:08x}: {}".format(node, payload.decode()))
+        return taken
+
+    def upload_batch(self, body, encoding=None):
+        """Take one HTTP upload batch; returns how many readings were new, None if it is bad."""
+        self.packets += 1
+        try:
+            if encoding == "deflate":
+                z = zlib.decompressobj()
+                body = z.decompress(body, MAX_UPLOAD)
+                if z.unconsumed_tail:
+                    raise ValueError("upload batch larger than MAX_UPLOAD")
+            node, names, rows = upload.decode_batch(body)
+        except (ValueError, zlib.error):
+            self.bad += 1
+            return None
+        columns = [names.index(c) + 1 if c in names else None for c in CHANNELS]
+        rows = [(node, row[0]) + tuple(None if c is None else row[c] for c in columns) for row in rows]
+        new = self.store.insert_new_readings(rows)
+        self.upload_replayed += len(rows) - len(new)
+        self.frames += len(new)
+        for row in new:
+            self._evaluate(row[0], row[1], row[2:])
+        return len(new)
+
+    def http_request(self, method, path, headers, body):
+        """(status, reply body) for one HTTP request; headers have lower-case names."""
+        if method != "POST" or path != upload.PATH.decode():
+            return 404, b"not found\n"
+        added = self.upload_batch(body, headers.get("content-encoding"))
+        if added is None:
+            return 400, b"bad batch\n"
+        return 200, b"%d\n" % added
+
+    def _reading(self, node, ts, values):
+        self.pending.append((node, ts) + values)
+        self._evaluate(node, ts, values)
+
+    def _evaluate(self, node, ts, values):
+        for name, value, unit in evaluate(values, self.rules):
+            self._alert(node, ts, name, value, unit)
+
+    def _alert(self, node, ts, name, value, unit):
+        digest = self.digests.get(node)
+        if digest is None:
+            digest = self.digests[node] = AlertDigest(self.alert_window)
+        digest.add(name, value, unit, now=ts)
+        self.alerting.add(node)
+        self.pending_alerts.append((node, ts, name, value))
+
+    def flush(self):
+        """Write the buffered rows to the store."""
+        t0 = time.perf_counter()
+        rows, self.pending = self.pending, []
+        alerts, self.pending_alerts = self.pending_alerts, []
+        self.store.insert_readings(rows)
+        self.store.insert_alerts(alerts)
+        self.flush_time += time.perf_counter() - t0
+
+    def send_digests(self, now=None):
+        """Send every node digest whose window has elapsed."""
+        if now is None:
+            now = time.time()
+        for node in list(self.alerting):
+            digest = self.digests[node]
+            if digest.due(now):
+                message = "Node {:08x}: {}".format(node, digest.flush(now))
+                self.alerting.discard(node)
+                self.messages += 1
+                if self.fanout is not None:
+                    self.fanout.send(message)
+
+    # --- network ---
+    async def serve(self, host="0.0.0.0", udp_port=UDP_PORT, tcp_port=TCP_PORT, http_port=None):
+        """Start the listeners and the periodic flush / digest tasks."""
+        loop = asyncio.get_running_loop()
+        if udp_port is not None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RCVBUF)
+            sock.bind((host, udp_port))
+            transport, _ = await loop.create_datagram_endpoint(lambda: _UdpProtocol(self), sock=sock)
+            self.servers.append(transport)
+            self.addresses["udp"] = sock.getsockname()[:2]
+        if tcp_port is not None:
+            server = await asyncio.start_server(self._tcp_client, host, tcp_port)
+            self.servers.append(server)
+            self.addresses["tcp"] = server.sockets[0].getsockname()[:2]
+        if http_port is not None:
+            server = await asyncio.start_server(self._http_client, host, http_port)
+            self.servers.append(server)
+            self.addresses["http"] = server.sockets[0].getsockname()[:2]
+        self.servers.append(asyncio.create_task(self._periodic()))
+
+    async def _periodic(self):
+        next_digest = 0.0
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+            now = time.time()
+            if now >= next_digest:
+                self.send_digests(now)
+                next_digest = now + DIGEST_CHECK
+
+    async def _tcp_client(self, reader, writer):
+        header = frames.HEADER_SIZE
+        try:
+            while True:
+                head = await reader.readexactly(header)
+                if head[0] == outbox.MAGIC:
+                    length = struct.unpack(outbox.BATCH_HEAD_FMT, head)[4]
+                    taken = self.outbox_batch(head + await reader.readexactly(length))
+                    writer.write(struct.pack(outbox.ACK_FMT, taken))
+                    await writer.drain()
+                    continue
+                size = frames.FRAME_SIZES.get(head[1])
+                if head[0] != frames.MAGIC or size is None:
+                    self.bad += 1
+                    break
+                self.ingest(head + await reader.readexactly(size - header))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _http_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path, _ = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_UPLOAD:
+                    self.bad += 1
+                    writer.write(b"HTTP/1.1 413 Too Large\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    await writer.drain()
+                    break
+                body = await reader.readexactly(length)
+                status, reply = self.http_request(method, path, headers, body)
+                writer.write(b"HTTP/1.1 %d %s\r\nContent-Length: %d\r\n\r\n" % (
+                    status, b"OK" if status == 200 else b"Error", len(reply)) + reply)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        for s in self.servers:
+            if isinstance(s, asyncio.Task):
+                s.cancel()
+            else:
+                s.close()
+        self.servers = []
+        self.flush()
+
+    def stats(self):
+        return {"packets": self.packets, "frames": self.frames, "bad": self.bad,
+                "lost": self.lost, "replayed": self.keys.duplicates + self.upload_replayed, "nodes": len(self.last_seq), "rows": self.store.rows,
+                "duplicates": self.store.duplicates, "batches": self.store.batches,
+                "messages": self.messages, "flush_s": round(self.flush_time, 3)}
+
+class _UdpProtocol(asyncio.DatagramProtocol):
+    def __init__(self, gateway):
+        self.gateway = gateway
+
+    def datagram_received(self, data, addr):
+        self.gateway.ingest(data, addr)
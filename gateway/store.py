@@ -0,0 +1,104 @@
+"""
+    ----------------------------------------------------------------------------
+    GATEWAY TIME-SERIES STORE
+    > Operation:
+        - SQLite database with one row per node reading, keyed by
+          (node, ts) so a node's history is one index range scan
+        - Readings and alert events are inserted in batches, one
+          transaction per batch
+        - Duplicate frames (same node and timestamp) are ignored;
+          insert_new_readings() returns the rows that were new
+        - WAL journal so queries do not block ingestion
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    node INTEGER NOT NULL,
+    ts   INTEGER NOT NULL,
+    temp REAL, hum REAL, soil REAL, tds REAL,
+    PRIMARY KEY (node, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS alerts (
+    node  INTEGER NOT NULL,
+    ts    INTEGER NOT NULL,
+    name  TEXT NOT NULL,
+    value REAL
+);
+CREATE INDEX IF NOT EXISTS alerts_node_ts ON alerts (node, ts);
+"""
+
+class Store:
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        # Counters
+        self.batches = 0
+        self.rows = 0
+        self.duplicates = 0
+
+    def insert_readings(self, rows):
+        """rows: [(node, ts, temp, hum, soil, tds), ...] in one transaction."""
+        if not rows:
+            return 0
+        before = self.db.total_changes
+        with self.db:
+            self.db.executemany("INSERT OR IGNORE INTO readings VALUES (?, ?, ?, ?, ?, ?)", rows)
+        added = self.db.total_changes - before
+        self.batches += 1
+        self.rows += added
+        self.duplicates += len(rows) - added
+        return added
+
+    def insert_new_readings(self, rows):
+        """Like insert_readings(), one row at a time; returns the rows that were not stored yet."""
+        new = []
+        with self.db:
+            for row in rows:
+                before = self.db.total_changes
+                self.db.execute("INSERT OR IGNORE INTO readings VALUES (?, ?, ?, ?, ?, ?)", row)
+                if self.db.total_changes != before:
+                    new.append(row)
+        if rows:
+            self.batches += 1
+        self.rows += len(new)
+        self.duplicates += len(rows) - len(new)
+        return new
+
+    def insert_alerts(self, rows):
+        """rows: [(node, ts, name, value), ...] in one transaction."""
+        if rows:
+            with self.db:
+                self.db.executemany("INSERT INTO alerts VALUES (?, ?, ?, ?)", rows)
+
+    def readings(self, node, since=0, until=None):
+        """Readings of one node between two unix times, oldest first."""
+        if until is None:
+            until = 1 << 32
+        return self.db.execute(
+            "SELECT ts, temp, hum, soil, tds FROM readings WHERE node = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+            (node, since, until)).fetchall()
+
+    def alerts(self, node, since=0):
+        return self.db.execute(
+            "SELECT ts, name, value FROM alerts WHERE node = ? AND ts >= ? ORDER BY ts",
+            (node, since)).fetchall()
+
+    def nodes(self):
+        """(node, last ts, readings) for every node seen."""
+        return self.db.execute(
+            "SELECT node, MAX(ts), COUNT(*) FROM readings GROUP BY node ORDER BY node").fetchall()
+
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM readings").fetchone()[0]
+
+    def close(self):
+        self.db.close()
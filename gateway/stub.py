@@ -0,0 +1,64 @@
+"""
+    ----------------------------------------------------------------------------
+    MESSAGING API STUB
+    > Operation:
+        - Local HTTP server standing in for api.telegram.org and
+          api.callmebot.com, so the gateway can be tested without real keys
+        - Records every message it receives
+        - resolve() gives the host mapping for KeepAliveClient / Fanout
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+HOSTS = ("api.telegram.org", "api.callmebot.com")
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        text = parse_qs(url.query).get("text", [""])[0]
+        with self.server.lock:
+            self.server.messages.append((self.headers.get("Host"), text))
+        if url.path == "/whatsapp.php":
+            body = b"Message queued. You will receive it in a few seconds."
+        else:
+            body = b'{"ok":true,"result":{"message_id":1}}'
+        self.send_response(self.server.status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class MessagingStub:
+    def __init__(self, host="127.0.0.1", port=0, status=200):
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.messages = []
+        self.server.lock = threading.Lock()
+        self.server.status = status
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def messages(self):
+        """[(Host header, message text), ...] in arrival order."""
+        with self.server.lock:
+            return list(self.server.messages)
+
+    def resolve(self):
+        addr = self.server.server_address
+        return {host: addr for host in HOSTS}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
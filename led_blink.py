@@ -21,12 +21,8 @@ BLINK_COUNT = 5        # Number of times to blink
 ON_DURATION = 2.0      # Seconds to keep LED ON
 OFF_DURATION = 2.0     # Seconds to keep LED OFF
 
-# ===== HARDWARE SETUP =====
-# Initialize LED on specified pin as output
-led = Pin(LED_PIN, Pin.OUT)
-
 # ===== FUNCTION DEFINITIONS =====
-def blink_led():
+def blink_led(led):
     """
     Blinks the LED once - turns ON, waits, then OFF, waits
     """
@@ -42,10 +38,13 @@ def main():
     print(f"Starting LED blink program...")
     print(f"LED will blink {BLINK_COUNT} times")
 
+    # Initialize LED on specified pin as output
+    led = Pin(LED_PIN, Pin.OUT)
+
     # Blink loop
     for blink_number in range(BLINK_COUNT):
         print(f"Blink #{blink_number + 1}")
-        blink_led()
+        blink_led(led)
 
     print("Program completed!")
 
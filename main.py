@@ -1,8 +1,20 @@
-import network
-import urequests as requests # MicroPython uses urequests
+from buni.boot_profile import PROFILE # first, so its clock starts at boot on CPython
+import struct
 import time
 from machine import Pin, ADC
 import dht # Use standard MicroPython DHT library
+from buni.notify_queue import NotificationQueue
+from buni.alert_digest import AlertDigest
+from buni.calibration import TDSTable
+from buni.history import History
+from buni.dht_cache import DHTCache
+from buni.flash_log import FlashLog
+from buni.msgbuild import MessageBuilder, URL_SIZE, quoted
+from buni.rules import RuleSet, ABOVE, BELOW, WARNING
+from buni.stats import StreamStats
+from buni.outbox import Outbox, HIGH, MESSAGE as OUTBOX_MESSAGE, BATCH_HEAD_SIZE, RECORD_HEAD_FMT, RECORD_HEAD_SIZE
+from buni import net # WiFi / HTTP modules load on first use, after the first reading
+PROFILE.mark("imports")
 
 # --- CONFIGURATION ---
 SSID = 'Jenga254' #wifi name
@@ -21,100 +33,131 @@ DHT_PIN_NUM = 10
 LED_PIN_NUM = 12
 ADC_PIN_NUM = 29 # Note: On Pico W, GP29 is usually VSYS. Ensure you are using the correct ADC pin (GP26, 27, or 28).
 
-# Thresholds
-TEMP_HIGH_LIMIT = 30
-HUM_LOW_LIMIT = 40
-TDS_HIGH_LIMIT = 800
+# Alert rules (buni/rules.py): raised after the minimum time past the limit,
+# cleared once back past it by the hysteresis
+# (name, channel, comparison, limit, hysteresis, severity, minimum seconds, unit)
+# A channel can also be a statistic from buni/stats.py, e.g. "tds_avg" (smoothed)
+# or "temp_slope" (change per minute)
+CHANNELS = ("temp", "hum", "tds")
+RULES = (
+    ("High Temp", "temp", ABOVE, 30, 1.0, WARNING, 30, "C"),
+    ("Low Humidity", "hum", BELOW, 40, 3, WARNING, 30, "%"),
+    ("High TDS", "tds_avg", ABOVE, 800, 25, WARNING, 30, "ppm"),
+)
+
+# Notification queue
+NOTIFY_QUEUE_SIZE = 8 # pending messages kept per channel
+ALERT_WINDOW = 300 # seconds per alert digest (alerts in between are collected, not dropped)
+
+# Reading history kept in RAM
+HISTORY_SIZE = 360 # 30 min of readings at one every 5 s
+LOG_DIR = 'log' # flash log folder, readings survive reboots (None to disable)
+OUTBOX_DIR = 'outbox' # digests kept on flash until sent, through outages and reboots (None to disable)
+OUTBOX_BATCHES = 2 # outbox batches handed to the queues per cycle
+UPLOAD_HOST = None # e.g. '192.168.1.10': the history as one compressed POST per interval (buni/upload.py)
+UPLOAD_PORT = 9080
+UPLOAD_INTERVAL = 1500 # seconds between batches, inside the 30 min history
 
 # --- CLASSES ---
 
-class WiFiConnection:
-    @staticmethod
-    def connect(ssid, password):
-        wlan = network.WLAN(network.STA_IF)
-        wlan.active(True)
-        wlan.connect(ssid, password)
-        
-        # Wait for connect
-        max_wait = 10
-        while max_wait > 0:
-            if wlan.status() < 0 or wlan.status() >= 3:
-                break
-            max_wait -= 1
-            print('Waiting for connection...')
-            time.sleep(1)
-
-        if wlan.status() != 3:
-            print('Network connection failed')
-            return False
-        else:
-            print('Connected')
-            print('IP:', wlan.ifconfig()[0])
-            return True
+# By default both messengers share one keep-alive connection per API host with a
+# circuit breaker per host (net.http()), created on the first send
+MESSAGE = MessageBuilder() # digest text, rendered without building strings
+URL = MessageBuilder(URL_SIZE) # request path; the messengers send one at a time
+
+def url_truncated():
+    """True (and reported) when the last message did not fit in URL; it is not sent cut short."""
+    if not URL.truncated:
+        return False
+    print(f"Message too long for the URL buffer ({URL.truncated} bytes over), not sent")
+    URL.truncated = 0
+    return True
 
 class WhatsApp:
-    def __init__(self, phone, api_key):
+    HOST = 'api.callmebot.com'
+
+    def __init__(self, phone, api_key, http=None):
         self.phone = phone
         self.api_key = api_key
+        self.http = http
+        # Fixed parts of the URL, encoded once
+        self.prefix = b'/whatsapp.php?phone=' + quoted(phone) + b'&text='
+        self.suffix = b'&apikey=' + quoted(api_key)
 
     def send(self, message):
-        # WhatsApp CallMeBot requires URL encoding (spaces = %20)
-        encoded_msg = message.replace(' ', '%20')
-        url = f'https://api.callmebot.com/whatsapp.php?phone={self.phone}&text={encoded_msg}&apikey={self.api_key}'
+        # WhatsApp CallMeBot requires URL encoding; the message is percent-encoded
+        # straight into the URL buffer
+        path = URL.reset().write(self.prefix).quote(message).write(self.suffix).view()
+        if url_truncated():
+            return False
+        http = self.http or net.http()
         try:
-            response = requests.get(url)
-            if response.status_code == 200:
+            ok = http.get(self.HOST, path) == 200
+            if ok:
                 print("WhatsApp Sent!")
             else:
-                print(f"WhatsApp Error: {response.text}")
-            response.close()
+                print(f"WhatsApp Error: {bytes(http.body())}")
+            return ok
         except Exception as e:
             print("WhatsApp Request Failed:", e)
+            return False
+
+    def available(self):
+        """False while the API's circuit breaker is open (the queue holds messages)."""
+        return (self.http or net.http()).available(self.HOST)
 
 class Telegram:
-    def __init__(self, token, chat_id):
+    HOST = "api.telegram.org"
+
+    def __init__(self, token, chat_id, http=None):
         self.token = token
         self.chat_id = chat_id
+        self.http = http
+        self.prefix = b"/bot" + token.encode() + b"/sendMessage?chat_id=" + quoted(chat_id) + b"&text="
 
     def send(self, message):
-        url = f"https://api.telegram.org/bot{self.token}/sendMessage?chat_id={self.chat_id}&text={message}"
+        # Raw spaces (or |, &, %) would break the request line or the query
+        path = URL.reset().write(self.prefix).quote(message).view()
+        if url_truncated():
+            return False
+        http = self.http or net.http()
         try:
-            response = requests.get(url)
-            response.close()
-            print("Telegram Sent!")
+            ok = http.get(self.HOST, path) == 200
+            if ok:
+                print("Telegram Sent!")
+            else:
+                print(f"Telegram Error: {bytes(http.body())}")
+            return ok
         except Exception as e:
             print("Telegram Request Failed:", e)
+            return False
+
+    def available(self):
+        """False while the API's circuit breaker is open (the queue holds messages)."""
+        return (self.http or net.http()).available(self.HOST)
 
 class SensorManager:
     def __init__(self, dht_pin, adc_pin):
         # Initialize DHT
         self.dht_sensor = dht.DHT22(Pin(dht_pin))
+        self.dht_cache = DHTCache(self.dht_sensor)
         # Initialize ADC
         self.adc = ADC(adc_pin)
         self.vref = 3.3
+        # raw -> ppm lookup built once; see calibration.py for the formula
+        self.tds_table = TDSTable(self.vref)
 
     def read_dht(self):
-        try:
-            self.dht_sensor.measure()
-            temp = self.dht_sensor.temperature()
-            hum = self.dht_sensor.humidity()
-            return temp, hum
-        except Exception as e:
-            print("DHT Read Error:", e)
-            return None, None
+        temp, hum = self.dht_cache.read()
+        if temp is None:
+            print("DHT Read Error:", self.dht_cache.last_error)
+        return temp, hum
 
     def read_tds(self, temperature=25):
-        # 1. Read Raw
+        # Raw -> voltage -> EC -> temperature compensated TDS (ppm),
+        # all folded into one table lookup
         raw = self.adc.read_u16()
-        # 2. Convert to Voltage
-        voltage = (raw / 65535.0) * self.vref
-        # 3. Calculate TDS (Approximation)
-        # Simplified TDS logic for demo purposes
-        ec = (voltage * 1000) / 560 
-        compensation_coeff = 1 + 0.02 * (temperature - 25)
-        ec_25 = ec / compensation_coeff
-        tds_val = ec_25 * 0.5 * 1000 # Scaling up for display visibility usually
-        return round(tds_val, 2)
+        return self.tds_table.ppm(raw, temperature)
 
 class LEDController:
     def __init__(self, pin):
@@ -137,25 +180,87 @@ class LEDController:
 
 # --- MAIN PROGRAM ---
 
+def check_conditions(rules, stats, temp, hum, tds_val, digest):
+    # Readings go into the running statistics, the rules check both;
+    # raised and cleared alerts go to the digest; True while any is active
+    if temp is not None:
+        print(f"Temp: {temp}C, Hum: {hum}%, TDS: {tds_val}")
+    else:
+        print("Sensor Error: Could not read DHT22")
+    now = time.time()
+    stats.update((temp, hum, tds_val), now)
+    changed = rules.evaluate(stats.values, now)
+    if changed:
+        rules.report(changed, digest)
+    return rules.alerting()
+
+def send_digest(digest, wa, tg, outbox=None):
+    alert_message = bytes(digest.flush_into(MESSAGE)) # the one copy the queues keep
+    print("Sending Message:", alert_message.decode())
+    if outbox and outbox.put(OUTBOX_MESSAGE, alert_message, HIGH):
+        return # on flash now; outbox_sender() hands it to the queues
+    
+    if SEND_BOTH:
+        wa.send(alert_message)
+        tg.send(alert_message)
+    else:
+        wa.send(alert_message)
+
+def outbox_sender(wa, tg):
+    # send(batch, count) for Outbox.drain(ack=False): digests go to the queues,
+    # tagged with their outbox sequence, while they have room; the rest stays
+    # on flash (backpressure)
+    def send(batch, count):
+        offset = BATCH_HEAD_SIZE # records follow the batch header back to back
+        for taken in range(count):
+            if wa.pending() >= wa.size or (SEND_BOTH and tg.pending() >= tg.size):
+                return taken
+            length, seq = struct.unpack_from(RECORD_HEAD_FMT, batch, offset)[2:4]
+            offset += RECORD_HEAD_SIZE
+            payload = bytes(batch[offset:offset + length])
+            offset += length
+            wa.send(payload, seq)
+            if SEND_BOTH:
+                tg.send(payload, seq)
+        return count
+    return send
+
+def confirm_digests(outbox, wa, tg):
+    # the outbox keeps each digest until the queues have delivered (or given up on) it
+    if outbox:
+        outbox.confirm(min(wa.done_tag, tg.done_tag) if SEND_BOTH else wa.done_tag)
+
 def main():
     # 1. Setup Hardware
     led_ctrl = LEDController(LED_PIN_NUM)
     sensors = SensorManager(DHT_PIN_NUM, ADC_PIN_NUM)
-    
-    # 2. Setup Network
-    if not WiFiConnection.connect(SSID, PASSWORD):
-        print("Stopping program due to WiFi failure.")
-        return
+    PROFILE.mark("hardware")
 
-    # 3. Setup Messengers
-    wa = WhatsApp(PHONE_NUMBER, WA_API_KEY)
-    tg = Telegram(TG_BOT_TOKEN, TG_CHAT_ID)
+    # 2. Setup Messengers (queued, so send() returns right away)
+    wa = NotificationQueue(WhatsApp(PHONE_NUMBER, WA_API_KEY), NOTIFY_QUEUE_SIZE)
+    tg = NotificationQueue(Telegram(TG_BOT_TOKEN, TG_CHAT_ID), NOTIFY_QUEUE_SIZE)
 
     print("System Started...")
     
-    # Variables to manage message spamming
-    last_alert_time = 0
-    ALERT_COOLDOWN = 60  # Only send messages once every 60 seconds
+    # Collects alerts by type so nothing is lost between messages
+    digest = AlertDigest(ALERT_WINDOW)
+    stats = StreamStats(CHANNELS)
+    rules = RuleSet(RULES, stats.names)
+    history = History(CHANNELS, HISTORY_SIZE)
+    flash_log = None
+    if LOG_DIR:
+        try:
+            flash_log = FlashLog(LOG_DIR)
+        except Exception as e:
+            print("Flash log unavailable:", e)
+    outbox = None
+    if OUTBOX_DIR:
+        try:
+            outbox = Outbox(OUTBOX_DIR)
+        except Exception as e:
+            print("Outbox unavailable:", e)
+    sender = outbox_sender(wa, tg)
+    uploader = None
 
     while True:
         # Read Sensors
@@ -164,45 +269,47 @@ def main():
         # Handle cases where DHT fails
         current_temp_for_tds = temp if temp is not None else 25
         tds_val = sensors.read_tds(current_temp_for_tds)
+        if temp is not None and PROFILE.mark("first reading"):
+            PROFILE.report()
 
-        alert_message = ""
-        is_alert = False
+        # Network: connects and reconnects in the background; the loop keeps
+        # sampling and queueing alerts while the link is down
+        wifi_up = net.wifi(SSID, PASSWORD).tick()
+        if wifi_up and PROFILE.mark("wifi up"):
+            PROFILE.report()
+        history.append(time.time(), temp, hum, tds_val)
+        if flash_log:
+            flash_log.append(time.time(), temp, hum, None, tds_val)
 
         # Check Conditions
-        if temp is not None:
-            print(f"Temp: {temp}C, Hum: {hum}%, TDS: {tds_val}")
-            
-            if temp > TEMP_HIGH_LIMIT:
-                alert_message = f"ALERT: High Temp detected! {temp}C"
-                is_alert = True
-            elif hum < HUM_LOW_LIMIT:
-                alert_message = f"ALERT: Low Humidity! {hum}%"
-                is_alert = True
-            
-            if tds_val > TDS_HIGH_LIMIT:
-                alert_message = f"ALERT: High TDS! {tds_val} ppm"
-                is_alert = True
-        else:
-            print("Sensor Error: Could not read DHT22")
+        is_alert = check_conditions(rules, stats, temp, hum, tds_val, digest)
 
         # Handle Alerts
         if is_alert:
             led_ctrl.alert()
-            
-            # Check if enough time has passed since last message
-            if (time.time() - last_alert_time) > ALERT_COOLDOWN:
-                print(f"Sending Message: {alert_message}")
-                
-                if SEND_BOTH:
-                    wa.send(alert_message)
-                    tg.send(alert_message)
-                else:
-                    wa.send(alert_message)
-                
-                last_alert_time = time.time() # Reset cooldown
         else:
             led_ctrl.normal()
 
+        # One digest per window with everything seen since the last one
+        if digest.due():
+            send_digest(digest, wa, tg, outbox)
+
+        # Outbox digests into the queues, then at most one queued message
+        # per channel per cycle
+        if wifi_up:
+            if outbox and outbox.backlog():
+                outbox.drain(sender, OUTBOX_BATCHES, ack=False)
+            if UPLOAD_HOST:
+                if uploader is None:
+                    uploader = net.uploader(history, UPLOAD_HOST, UPLOAD_PORT, UPLOAD_INTERVAL)
+                if uploader.due():
+                    uploader.upload()
+            wa.pump()
+            tg.pump()
+            confirm_digests(outbox, wa, tg)
+        if wa.pending() or tg.pending():
+            print("Notify queue WA:", wa.stats(), "TG:", tg.stats())
+
         time.sleep(5)
 
 if __name__ == "__main__":
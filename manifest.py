@@ -0,0 +1,16 @@
+# MicroPython freeze manifest: builds the buni package into the firmware as
+# precompiled bytecode, so the device scripts import it straight from flash
+# (no parsing / compiling at boot and no RAM for the module source).
+#
+# From a micropython checkout, for a Pico W:
+#   make -C ports/rp2 BOARD=RPI_PICO_W FROZEN_MANIFEST=/path/to/this/manifest.py
+# then copy only the script (main.py or soil-moisture-monitor.py) to the board.
+#
+# Without a firmware build, precompile instead and copy the .mpy files:
+#   mpy-cross -march=armv6m buni/<module>.py   (into a buni/ folder on the board)
+
+# The board's own frozen modules (network, asyncio, dht, ...)
+include("$(BOARD_DIR)/manifest.py")
+
+# Helper library; the scripts load its network modules lazily (buni/net.py)
+package("buni")
@@ -0,0 +1,98 @@
+"""
+    ----------------------------------------------------------------------------
+    HOST-SIDE HARDWARE SIMULATION
+    > Operation:
+        - Stand-ins for machine (with the relay expander on its I2C bus),
+          dht, PicoDHT22, network, pcf8574, usocket, ussl and urequests
+          (sim/modules), driven by one simulated world (sim/world.py) on a
+          virtual clock (sim/clock.py)
+        - Sleeps are instant, so a day of a control loop runs in seconds
+        - Usage from the repo folder:
+              python -m sim main.py --hours 24 --seed 1
+          or from Python:
+              import sim
+              world = sim.install(seed=1)
+              ... import / run the code under test ...
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+from sim import clock as _clock
+from sim import scenario
+from sim.clock import SimulationEnd
+from sim.world import WORLD, reset
+
+MODULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "modules")
+_installed = False
+
+def install(seed=None, setup=scenario.greenhouse):
+    """Make the stand-in modules importable and put `time` and asyncio on the virtual clock."""
+    global _installed
+    reset(seed, setup)
+    net = sys.modules.get("buni.net")
+    if net is not None:
+        net.reset()            # shared WiFi / HTTP objects belong to the previous run
+    if not _installed:
+        # buni modules loaded before (e.g. by a host-side test of the gateway) hold
+        # the real clock and sockets: the code under test imports them again
+        for name in [m for m in sys.modules if m == "buni" or m.startswith("buni.")]:
+            del sys.modules[name]
+        sys.path.insert(0, MODULES_DIR)
+        _clock.patch_time(WORLD.clock)
+        asyncio.set_event_loop_policy(_clock.VirtualLoopPolicy(WORLD.clock))
+        _installed = True
+    return WORLD
+
+def run_script(path, seconds, seed=None, quiet=False, setup=scenario.greenhouse):
+    """
+    Run a device script as __main__ for `seconds` of simulated time.
+    The script runs in a scratch folder standing in for the Pico filesystem.
+    Returns a summary dict.
+    """
+    import runpy
+    import time
+
+    world = install(seed, setup)
+    world.clock.end = seconds
+    path = os.path.abspath(path)
+    repo = os.path.dirname(path)
+    if repo not in sys.path:
+        sys.path.insert(1, repo)
+    old_cwd = os.getcwd()
+    old_stdout = sys.stdout
+    fs_root = tempfile.mkdtemp(prefix="pico_fs_")
+    started = time.perf_counter()
+    error = None
+    try:
+        os.chdir(fs_root)
+        if quiet:
+            sys.stdout = open(os.devnull, "w")
+        runpy.run_path(path, run_name="__main__")
+    except SimulationEnd:
+        pass
+    except BaseException as e:
+        error = repr(e)
+    finally:
+        if quiet:
+            sys.stdout.close()
+            sys.stdout = old_stdout
+        os.chdir(old_cwd)
+    wall = time.perf_counter() - started
+    return {
+        "script": os.path.basename(path),
+        "sim_seconds": world.clock.now,
+        "wall_seconds": wall,
+        "speedup": world.clock.now / wall if wall else 0,
+        "sleeps": world.clock.sleeps,
+        "counters": dict(sorted(world.counters.items())),
+        "relays": list(world.relays),
+        "fs_root": fs_root,
+        "error": error,
+    }
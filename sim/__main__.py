@@ -0,0 +1,36 @@
+"""
+    Run a device script on the simulated hardware:
+        python -m sim <script.py> [--hours H] [--seed N] [--quiet]
+"""
+
+import sys
+
+import sim
+
+def main(argv):
+    if not argv or argv[0].startswith("-"):
+        print(__doc__)
+        return 1
+    script = argv[0]
+    hours = 24.0
+    seed = None
+    quiet = False
+    i = 1
+    while i < len(argv):
+        if argv[i] == "--hours":
+            hours = float(argv[i + 1])
+            i += 1
+        elif argv[i] == "--seed":
+            seed = int(argv[i + 1])
+            i += 1
+        elif argv[i] == "--quiet":
+            quiet = True
+        i += 1
+    summary = sim.run_script(script, hours * 3600, seed=seed, quiet=quiet)
+    print("\n===== SIMULATION SUMMARY =====")
+    for key, value in summary.items():
+        print("{:>13}: {}".format(key, value))
+    return 0 if summary["error"] is None else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,96 @@
+"""
+    ----------------------------------------------------------------------------
+    MQTT BROKER STAND-IN (CPython)
+    > Operation:
+        - Small MQTT 3.1.1 broker on localhost for testing mqtt.py: accepts
+          CONNECT, PUBLISH (QoS 0/1, answers PUBACK), PINGREQ, DISCONNECT
+        - Records every PUBLISH it receives as (client id, topic, payload, qos)
+        - ack=False stops answering PUBACK and ping=False stops answering
+          PINGREQ, to exercise resends and reconnects
+        - Not a real broker: no subscriptions, nothing is forwarded
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import socketserver
+import threading
+
+class _Session(socketserver.BaseRequestHandler):
+    def setup(self):
+        self.request.setsockopt(6, 1, 1)   # TCP_NODELAY
+        self.client_id = None
+
+    def _read(self, n):
+        data = b""
+        while len(data) < n:
+            chunk = self.request.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError("client closed")
+            data += chunk
+        return data
+
+    def handle(self):
+        broker = self.server.broker
+        try:
+            while True:
+                first = self._read(1)[0]
+                length, shift = 0, 0
+                while True:
+                    byte = self._read(1)[0]
+                    length |= (byte & 0x7F) << shift
+                    shift += 7
+                    if not byte & 0x80:
+                        break
+                body = self._read(length) if length else b""
+                kind = first & 0xF0
+                if kind == 0x10:                       # CONNECT
+                    n = (body[10] << 8) | body[11]
+                    self.client_id = body[12:12 + n].decode()
+                    broker.connects += 1
+                    self.request.sendall(b"\x20\x02\x00\x00")
+                elif kind == 0x30:                     # PUBLISH
+                    qos = (first >> 1) & 3
+                    n = (body[0] << 8) | body[1]
+                    topic = body[2:2 + n].decode()
+                    start = 2 + n + (2 if qos else 0)
+                    with broker.lock:
+                        broker.messages.append((self.client_id, topic, body[start:], qos))
+                        if len(broker.messages) > broker.keep:
+                            del broker.messages[0]
+                        broker.received += 1
+                        if first & 0x08:
+                            broker.duplicates += 1
+                    if qos and broker.ack:
+                        self.request.sendall(b"\x40\x02" + body[2 + n:4 + n])
+                elif kind == 0xC0:                     # PINGREQ
+                    broker.pings += 1
+                    if broker.ping:
+                        self.request.sendall(b"\xd0\x00")
+                elif kind == 0xE0:                     # DISCONNECT
+                    return
+        except (ConnectionError, OSError):
+            pass
+
+class Broker:
+    def __init__(self, host="127.0.0.1", port=0, keep=10000):
+        self.server = socketserver.ThreadingTCPServer((host, port), _Session)
+        self.server.daemon_threads = True
+        self.server.broker = self
+        self.port = self.server.server_address[1]
+        self.lock = threading.Lock()
+        self.messages = []
+        self.keep = keep
+        self.ack = True
+        self.ping = True
+        # Counters
+        self.connects = 0
+        self.received = 0
+        self.duplicates = 0
+        self.pings = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
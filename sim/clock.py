@@ -0,0 +1,168 @@
+"""
+    ----------------------------------------------------------------------------
+    VIRTUAL CLOCK
+    > Operation:
+        - Simulated time that only moves when the program sleeps (or when a
+          simulated device "takes time", e.g. a network request)
+        - Patches time.sleep / time.time / time.localtime and adds the
+          MicroPython ticks_* and sleep_ms/sleep_us functions to `time`
+        - Event loop whose timers run on the virtual clock, so uasyncio code
+          also runs at accelerated time
+        - Hardware timers (machine.Timer) fire at their exact virtual times
+          as the clock moves; callbacks queued with micropython.schedule run
+          at once while the program sleeps, and only after a blocking device
+          call (a request, a TLS handshake, ...) while it is busy
+        - Raises SimulationEnd (a BaseException, so scripts' own
+          `except Exception` handlers do not swallow it) when the configured
+          end time is reached
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import asyncio
+import selectors
+import threading
+import time
+
+# ===== CONFIGURATION =====
+START_EPOCH = 1748736000       # 2025-06-01 00:00:00 UTC
+TICKS_PERIOD = 1 << 30         # MicroPython ticks wrap at 2**30
+_TICKS_HALF = TICKS_PERIOD >> 1
+
+_real_gmtime = time.gmtime
+
+class SimulationEnd(BaseException):
+    """Raised from a sleep once the simulated run time is over."""
+
+class VirtualClock:
+    def __init__(self, start_epoch=START_EPOCH):
+        self.start_epoch = start_epoch
+        self.now = 0.0          # seconds since the start of the simulation
+        self.end = None         # stop the simulation at this many seconds
+        self.sleeps = 0
+        self.timers = []        # objects with .due (seconds) and .fire(), see machine.Timer
+        self.pending = []       # (function, arg) queued by micropython.schedule
+        self._lock = threading.RLock()
+
+    def advance(self, seconds, idle=False):
+        """
+        Move time forward (used by simulated devices; never ends the run).
+        idle: the program is waiting, so scheduled callbacks run as soon as a
+        timer queues them; otherwise they wait until the time has passed.
+        """
+        if seconds > 0:
+            with self._lock:
+                target = self.now + seconds
+                if self.timers:
+                    self._fire_timers(target, idle)
+                if target > self.now:
+                    self.now = target
+                if self.pending:
+                    self.run_pending()
+
+    def _fire_timers(self, target, idle):
+        while True:
+            timer = None
+            for t in self.timers:
+                if t.due <= target and (timer is None or t.due < timer.due):
+                    timer = t
+            if timer is None:
+                return
+            if timer.due > self.now:
+                self.now = timer.due
+            timer.fire()
+            if idle and self.pending:
+                self.run_pending()
+
+    def run_pending(self):
+        """Run the callbacks queued by micropython.schedule, oldest first."""
+        while self.pending:
+            func, arg = self.pending.pop(0)
+            func(arg)
+
+    def sleep(self, seconds):
+        self.sleeps += 1
+        self.advance(seconds, idle=True)
+        self.check_end()
+
+    def check_end(self):
+        if self.end is not None and self.now >= self.end:
+            raise SimulationEnd()
+
+    # --- time module replacements ---
+    def time(self):
+        return self.start_epoch + int(self.now)
+
+    def localtime(self, secs=None):
+        return _real_gmtime(self.time() if secs is None else secs)
+
+    def ticks_ms(self):
+        return int(self.now * 1000) % TICKS_PERIOD
+
+    def ticks_us(self):
+        return int(self.now * 1000000) % TICKS_PERIOD
+
+    def sleep_ms(self, ms):
+        self.sleep(ms / 1000)
+
+    def sleep_us(self, us):
+        self.sleep(us / 1000000)
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) % TICKS_PERIOD
+
+def ticks_diff(a, b):
+    return ((a - b + _TICKS_HALF) % TICKS_PERIOD) - _TICKS_HALF
+
+def patch_time(clock):
+    """Point the `time` module at the virtual clock."""
+    time.sleep = clock.sleep
+    time.time = clock.time
+    time.localtime = clock.localtime
+    time.ticks_ms = clock.ticks_ms
+    time.ticks_us = clock.ticks_us
+    time.ticks_cpu = clock.ticks_us
+    time.ticks_add = ticks_add
+    time.ticks_diff = ticks_diff
+    time.sleep_ms = clock.sleep_ms
+    time.sleep_us = clock.sleep_us
+
+# ===== ASYNCIO ON VIRTUAL TIME =====
+class _VirtualSelector:
+    """Returns ready I/O at once; a timed wait just advances the virtual clock."""
+    def __init__(self, clock):
+        self._clock = clock
+        self._selector = selectors.DefaultSelector()
+
+    def select(self, timeout=None):
+        events = self._selector.select(0)
+        if events:
+            return events
+        if timeout is None:
+            # nothing scheduled: wait for real I/O (e.g. an executor thread finishing)
+            return self._selector.select(None)
+        if timeout > 0:
+            self._clock.advance(timeout, idle=True)
+            self._clock.check_end()
+        return self._selector.select(0)
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    def __init__(self, clock):
+        super().__init__(_VirtualSelector(clock))
+        self._clock = clock
+
+    def time(self):
+        return self._clock.now
+
+class VirtualLoopPolicy(asyncio.DefaultEventLoopPolicy):
+    def __init__(self, clock):
+        super().__init__()
+        self._clock = clock
+
+    def new_event_loop(self):
+        return VirtualEventLoop(self._clock)
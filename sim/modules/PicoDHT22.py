@@ -0,0 +1,17 @@
+"""
+    Stand-in for the PicoDHT22 driver (see sim/world.py).
+"""
+
+from dht import _measure
+
+class PicoDHT22:
+    def __init__(self, dataPin, powerPin=None, dht11=False, smID=1):
+        self.dataPin = dataPin
+        self.last_read = None
+
+    def read(self):
+        """(temperature, humidity), or (None, None) when the read fails."""
+        try:
+            return _measure(self)
+        except OSError:
+            return None, None
@@ -0,0 +1,36 @@
+"""
+    Stand-in for the MicroPython `dht` module (see sim/world.py).
+"""
+
+from sim.world import WORLD
+
+def _measure(sensor):
+    """Shared by dht.DHT22 and PicoDHT22: one bit-banged transaction."""
+    clock = WORLD.clock
+    WORLD.count("dht_reads")
+    clock.advance(WORLD.dht_read_time)
+    too_soon = sensor.last_read is not None and clock.now - sensor.last_read < WORLD.dht_min_interval
+    sensor.last_read = clock.now
+    if too_soon or WORLD.random.random() < WORLD.dht_fail_rate:
+        WORLD.count("dht_failures")
+        raise OSError(110, "ETIMEDOUT")
+    return round(WORLD.dht_temp(clock.now), 1), round(max(0.0, min(100.0, WORLD.dht_hum(clock.now))), 1)
+
+class DHT22:
+    def __init__(self, pin):
+        self.pin = pin
+        self.last_read = None
+        self._t = None
+        self._h = None
+
+    def measure(self):
+        self._t, self._h = _measure(self)
+
+    def temperature(self):
+        return self._t
+
+    def humidity(self):
+        return self._h
+
+class DHT11(DHT22):
+    pass
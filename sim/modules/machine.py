@@ -0,0 +1,192 @@
+"""
+    Stand-in for the MicroPython `machine` module (see sim/world.py).
+"""
+
+from sim.world import WORLD
+from sim.clock import SimulationEnd
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        self.pull = pull
+        self._value = 0 if value is None else value
+        self.writes = 0
+        WORLD.pins[id] = self
+
+    def init(self, mode=-1, pull=-1, value=None):
+        self.mode = mode
+        self.pull = pull
+        if value is not None:
+            self.value(value)
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        self._value = 1 if v else 0
+        self.writes += 1
+        WORLD.count("pin_writes")
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def high(self):
+        self.value(1)
+
+    def low(self):
+        self.value(0)
+
+    def toggle(self):
+        self.value(not self._value)
+
+    def irq(self, handler=None, trigger=None):
+        return None
+
+class ADC:
+    CORE_TEMP = 4
+
+    def __init__(self, pin):
+        if isinstance(pin, Pin):
+            gpio = pin.id
+        else:
+            gpio = pin if pin >= 26 else pin + 26    # ADC(0..4) are channels
+        self.gpio = gpio
+
+    def read_u16(self):
+        WORLD.count("adc_reads")
+        return WORLD.adc_value(self.gpio)
+
+class I2C:
+    """
+    I2C bus with the relay PCF8574 at WORLD.relay_address: bit n of the
+    port byte is WORLD.relays[n]. A write can be lost (WORLD.relay_miss_rate);
+    other addresses do not acknowledge.
+    """
+    def __init__(self, id=0, scl=None, sda=None, freq=400000):
+        self.id = id
+        self.freq = freq
+
+    def scan(self):
+        return [WORLD.relay_address]
+
+    def _check(self, addr):
+        if addr != WORLD.relay_address:
+            WORLD.count("i2c_nack")
+            raise OSError(5, "EIO")
+
+    def writeto(self, addr, buf, stop=True):
+        self._check(addr)
+        WORLD.count("i2c_writes")
+        if not len(buf):
+            return 1
+        if WORLD.random.random() < WORLD.relay_miss_rate:
+            WORLD.count("relay_missed_writes")
+            return 1
+        byte = buf[-1]                 # the port holds the last byte written
+        for n in range(8):
+            WORLD.relays[n] = (byte >> n) & 1
+        return len(buf)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        self._check(addr)
+        WORLD.count("i2c_reads")
+        byte = 0
+        for n in range(8):
+            byte |= WORLD.relays[n] << n
+        for i in range(len(buf)):
+            buf[i] = byte
+
+    def readfrom(self, addr, nbytes, stop=True):
+        buf = bytearray(nbytes)
+        self.readfrom_into(addr, buf, stop)
+        return bytes(buf)
+
+class Timer:
+    """
+    Hardware timer on the virtual clock: the callback runs at each period
+    (up to WORLD.irq_latency_us late), also in the middle of a sleep or a
+    blocking network call, like an interrupt.
+    """
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self.id = id
+        self.due = None
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, freq=-1, period=-1, callback=None, tick_hz=1000, hard=True):
+        self.deinit()
+        self.mode = mode
+        self.period = 1 / freq if freq > 0 else period / tick_hz
+        self.callback = callback
+        clock = WORLD.clock
+        self.due = clock.now + self.period
+        clock.timers.append(self)
+
+    def deinit(self):
+        if self in WORLD.clock.timers:
+            WORLD.clock.timers.remove(self)
+
+    def fire(self):
+        clock = WORLD.clock
+        if WORLD.irq_latency_us:
+            clock.now = self.due + WORLD.random.random() * WORLD.irq_latency_us / 1000000
+        if self.mode == self.PERIODIC:
+            self.due += self.period
+        else:
+            self.deinit()
+        WORLD.count("timer_irqs")
+        if self.callback:
+            self.callback(self)
+
+class WDT:
+    def __init__(self, id=0, timeout=5000):
+        self.timeout = timeout
+
+    def feed(self):
+        WORLD.count("wdt_feeds")
+
+def freq(hz=None):
+    return 125000000
+
+def unique_id():
+    return b"\xe6\x61\x41\x04\x03\x37\x2a\x2b"
+
+def idle():
+    pass
+
+def lightsleep(ms=None):
+    WORLD.clock.sleep((ms or 0) / 1000)
+
+deepsleep = lightsleep
+
+def reset():
+    raise SimulationEnd()
+
+PWRON_RESET = 1
+WDT_RESET = 3
+
+def reset_cause():
+    return WORLD.devices.get("reset_cause", PWRON_RESET)
+
+def disable_irq():
+    return 0
+
+def enable_irq(state=0):
+    pass
@@ -0,0 +1,21 @@
+"""
+    Stand-in for the MicroPython `micropython` module (see sim/clock.py).
+    schedule() queues on the virtual clock; the queue is run between timer
+    interrupts while the program sleeps, or after a blocking device call.
+"""
+
+from sim.world import WORLD
+
+SCHEDULE_DEPTH = 8     # MicroPython's default MICROPY_SCHEDULER_DEPTH
+
+def schedule(func, arg):
+    pending = WORLD.clock.pending
+    if len(pending) >= SCHEDULE_DEPTH:
+        raise RuntimeError("schedule queue full")
+    pending.append((func, arg))
+
+def const(value):
+    return value
+
+def alloc_emergency_exception_buf(size):
+    pass
@@ -0,0 +1,66 @@
+"""
+    Stand-in for the MicroPython `network` module (see sim/world.py).
+"""
+
+from sim.world import WORLD
+
+STA_IF = 0
+AP_IF = 1
+STAT_IDLE = 0
+STAT_CONNECTING = 1
+STAT_CONNECT_FAIL = -1
+STAT_NO_AP_FOUND = -2
+STAT_WRONG_PASSWORD = -3
+STAT_GOT_IP = 3
+
+class WLAN:
+    def __init__(self, interface=STA_IF):
+        self.interface = interface
+        self._active = False
+        self._status = STAT_IDLE
+        self._ready_at = None      # connect attempt completes at this sim time
+        self._will_fail = False
+        WORLD.devices["wlan"] = self
+
+    def active(self, is_active=None):
+        if is_active is None:
+            return self._active
+        self._active = bool(is_active)
+        if not self._active:
+            self._status = STAT_IDLE
+
+    def connect(self, ssid=None, key=None):
+        WORLD.count("wifi_connects")
+        self._status = STAT_CONNECTING
+        self._ready_at = WORLD.clock.now + WORLD.wifi_connect_time
+        self._will_fail = WORLD.random.random() < WORLD.wifi_fail_rate
+
+    def disconnect(self):
+        self._status = STAT_IDLE
+
+    def status(self, param=None):
+        if param == "rssi":
+            return -60
+        if self._status == STAT_GOT_IP and WORLD.in_outage():
+            WORLD.count("wifi_drops")
+            self._status = STAT_NO_AP_FOUND
+        elif self._status == STAT_CONNECTING and WORLD.clock.now >= self._ready_at:
+            if self._will_fail or WORLD.in_outage():
+                WORLD.count("wifi_connect_failures")
+                self._status = STAT_CONNECT_FAIL
+            else:
+                self._status = STAT_GOT_IP
+        return self._status
+
+    def isconnected(self):
+        return self._active and self.status() == STAT_GOT_IP
+
+    def ifconfig(self, config=None):
+        if self.isconnected():
+            return ("192.168.4.20", "255.255.255.0", "192.168.4.1", "8.8.8.8")
+        return ("0.0.0.0", "0.0.0.0", "0.0.0.0", "0.0.0.0")
+
+    def config(self, *args, **kwargs):
+        if args == ("mac",):
+            return b"\x28\xcd\xc1\x00\x00\x01"
+        return None
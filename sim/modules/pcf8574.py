@@ -0,0 +1,37 @@
+"""
+    Stand-in for the PCF8574 relay expander driver (see sim/world.py).
+    The relay states live in WORLD.relays; writes can be lost with
+    WORLD.relay_miss_rate to reproduce a relay that did not switch.
+"""
+
+from sim.world import WORLD
+
+class PCF8574_PIN:
+    IN = 0
+    OUT = 1
+    RELAY1_PIN = 0
+    RELAY2_PIN = 1
+    RELAY3_PIN = 2
+    RELAY4_PIN = 3
+
+    def __init__(self, pin, mode=OUT):
+        self.pin = pin
+        self.mode = mode
+
+    def value(self, v=None):
+        if v is None:
+            return WORLD.relays[self.pin]
+        WORLD.count("i2c_writes")
+        if WORLD.random.random() < WORLD.relay_miss_rate:
+            WORLD.count("relay_missed_writes")
+            return
+        WORLD.relays[self.pin] = 1 if v else 0
+
+    def toggle(self):
+        self.value(not WORLD.relays[self.pin])
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
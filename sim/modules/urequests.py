@@ -0,0 +1,37 @@
+"""
+    Stand-in for the MicroPython `urequests` module (see sim/world.py).
+"""
+
+from sim.world import WORLD
+
+class Response:
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode()
+
+    def json(self):
+        import json
+        return json.loads(self.content)
+
+    def close(self):
+        pass
+
+def request(method, url, data=None, json=None, headers=None, timeout=None):
+    rest = url.split("://", 1)[-1]
+    host, _, path = rest.partition("/")
+    if not WORLD.link_up():
+        raise OSError(113, "EHOSTUNREACH")
+    WORLD.count("tls_handshakes")
+    WORLD.clock.advance(WORLD.tls_handshake)
+    status, body = WORLD.http(host, "/" + path)
+    return Response(status, body)
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
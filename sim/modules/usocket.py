@@ -0,0 +1,112 @@
+"""
+    Stand-in for the MicroPython `usocket` module (see sim/world.py).
+    Understands the HTTP/1.1 GET requests the notifiers make; every request
+    is answered by WORLD.http(). A connection to an address in
+    WORLD.services is handed to that service instead: it gets the bytes
+    sent so far, removes what it used and returns its reply. UDP datagrams
+    (gateway frames) are recorded in WORLD.datagrams.
+"""
+
+from sim.world import WORLD
+
+AF_INET = 2
+SOCK_STREAM = 1
+SOCK_DGRAM = 2
+SOL_SOCKET = 1
+SO_REUSEADDR = 4
+
+def getaddrinfo(host, port, af=0, type=0, proto=0, flags=0):
+    if not WORLD.link_up():
+        raise OSError(-2, "EAI_NONAME")
+    return [(AF_INET, SOCK_STREAM, 0, "", (host, port))]
+
+class socket:
+    def __init__(self, af=AF_INET, type=SOCK_STREAM, proto=0):
+        self.host = None
+        self.service = None
+        self._tx = bytearray()
+        self._rx = bytearray()
+        self._open = True
+
+    def settimeout(self, value):
+        pass
+
+    def setblocking(self, flag):
+        pass
+
+    def setsockopt(self, *args):
+        pass
+
+    def connect(self, addr):
+        if not WORLD.link_up():
+            raise OSError(113, "EHOSTUNREACH")
+        WORLD.count("tcp_connects")
+        WORLD.clock.advance(WORLD.http_latency / 2)
+        self.host = addr[0]
+        self.service = WORLD.services.get(tuple(addr))
+
+    def _handle(self):
+        end = self._tx.find(b"\r\n\r\n")
+        while end >= 0:
+            head = bytes(self._tx[:end]).decode().split("\r\n")
+            del self._tx[:end + 4]
+            path = head[0].split(" ")[1]
+            host = self.host
+            for line in head[1:]:
+                if line.lower().startswith("host:"):
+                    host = line[5:].strip()
+            status, body = WORLD.http(host, path)
+            self._rx += b"HTTP/1.1 %d OK\r\nContent-Length: %d\r\n\r\n" % (status, len(body)) + body
+            end = self._tx.find(b"\r\n\r\n")
+
+    def send(self, data):
+        if not self._open:
+            raise OSError(9, "EBADF")
+        self._tx += data
+        if self.service is None:
+            self._handle()
+            return len(data)
+        if not WORLD.link_up():
+            raise OSError(113, "EHOSTUNREACH")
+        WORLD.count("tcp_bytes", len(data))
+        WORLD.clock.advance(len(data) / WORLD.tcp_rate)
+        reply = self.service(self._tx)
+        if reply:
+            WORLD.clock.advance(WORLD.tcp_rtt)
+            self._rx += reply
+        return len(data)
+
+    def sendto(self, data, addr):
+        if not WORLD.link_up():
+            raise OSError(113, "EHOSTUNREACH")
+        WORLD.count("udp_datagrams")
+        WORLD.count("udp_bytes", len(data))
+        WORLD.datagrams.append((WORLD.clock.now, addr, bytes(data)))
+        if len(WORLD.datagrams) > WORLD.max_requests_kept:
+            del WORLD.datagrams[0]
+        return len(data)
+
+    def sendall(self, data):
+        self.send(data)
+
+    write = send
+
+    def recv_into(self, buf, nbytes=0):
+        n = min(len(buf), len(self._rx))
+        if nbytes:
+            n = min(n, nbytes)
+        buf[:n] = self._rx[:n]
+        del self._rx[:n]
+        return n
+
+    readinto = recv_into
+
+    def recv(self, bufsize):
+        data = bytes(self._rx[:bufsize])
+        del self._rx[:bufsize]
+        return data
+
+    read = recv
+
+    def close(self):
+        self._open = False
@@ -0,0 +1,61 @@
+"""
+    ----------------------------------------------------------------------------
+    SIMULATION WAVEFORMS AND SCENARIOS
+    > Operation:
+        - Waveforms are functions of simulated time (seconds) used for the
+          ADC channels and the DHT22 readings
+        - constant / sine / sawtooth / scripted (piecewise linear) plus
+          noisy() to add random noise from the world's seeded generator
+        - greenhouse() sets up a default day/night scenario
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import math
+
+DAY = 86400
+
+def constant(value):
+    return lambda t: value
+
+def sine(mean, amplitude, period=DAY, peak_at=0.0):
+    """Sine wave with its maximum at `peak_at` seconds into each period."""
+    return lambda t: mean + amplitude * math.cos(2 * math.pi * (t - peak_at) / period)
+
+def sawtooth(start, end, period):
+    """Ramp from start to end over `period`, then jump back (e.g. soil drying, then watering)."""
+    return lambda t: start + (end - start) * ((t % period) / period)
+
+def scripted(points, repeat=None):
+    """
+    Piecewise linear through [(t, value), ...] (sorted by t); holds the last
+    value afterwards, or loops every `repeat` seconds.
+    """
+    def wave(t):
+        if repeat:
+            t = t % repeat
+        if t <= points[0][0]:
+            return points[0][1]
+        for (t0, v0), (t1, v1) in zip(points, points[1:]):
+            if t <= t1:
+                return v0 + (v1 - v0) * (t - t0) / (t1 - t0)
+        return points[-1][1]
+    return wave
+
+def noisy(wave, sigma, world):
+    """Add gaussian noise (from the world's seeded generator) to a waveform."""
+    return lambda t: wave(t) + world.random.gauss(0, sigma)
+
+def greenhouse(world):
+    """Default scenario: hot afternoons, dry nights, soil drying over 36 h, TDS creeping up."""
+    hour = 3600
+    world.dht_temp = noisy(sine(26.0, 6.0, DAY, peak_at=14 * hour), 0.3, world)
+    world.dht_hum = noisy(sine(55.0, 20.0, DAY, peak_at=2 * hour), 1.0, world)
+    soil = noisy(sawtooth(34000, 62000, 36 * hour), 400, world)
+    tds = noisy(sine(16000, 3500, 3 * DAY, peak_at=DAY), 300, world)
+    world.adc[26] = soil
+    world.adc[27] = soil
+    world.adc[28] = tds
+    world.adc[29] = tds
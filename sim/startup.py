@@ -0,0 +1,142 @@
+"""
+    ----------------------------------------------------------------------------
+    IMPORT / STARTUP BENCHMARK (CPython)
+    > Operation:
+        - Starts a device script in a fresh interpreter on the simulated
+          hardware and times, in real time, how long it takes to get through
+          its imports, its hardware setup and its first valid reading (the
+          boot profile marks of buni/boot_profile.py)
+        - lazy: the script as it is, network modules load after the first
+          reading; eager: the network stack (wifi_manager, http_client,
+          circuit_breaker, frames, deadband, mqtt, network) is imported up
+          front, as the scripts did before
+        - source: the repository's modules are compiled from source on
+          import (a plain copy on the Pico); precompiled: from cached
+          bytecode (like frozen or .mpy modules)
+        - Reports the median of several runs and which buni modules were
+          loaded at the first reading
+        - Usage from the repo folder:
+              python -m sim.startup [script.py ...] [--runs N]
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+# ===== CONFIGURATION =====
+SCRIPTS = ("main.py", "soil-moisture-monitor.py")
+RUNS = 5
+NETWORK_MODULES = ("network", "buni.wifi_manager", "buni.http_client", "buni.circuit_breaker",
+                   "buni.frames", "buni.deadband", "buni.mqtt")
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _child(script, eager):
+    """Runs in the fresh interpreter: start the script, stop at its first reading."""
+    import runpy
+    import time
+
+    import sim
+    from sim.clock import SimulationEnd
+
+    world = sim.install(seed=1)
+    world.dht_fail_rate = 0.0
+    sys.path.insert(1, REPO)
+    os.chdir(tempfile.mkdtemp(prefix="pico_fs_"))
+    before = set(sys.modules)
+    t0 = time.perf_counter()
+    from buni.boot_profile import PROFILE
+    stamps = {}
+    mark = PROFILE.mark
+
+    def timed_mark(name):
+        stamps[name] = (time.perf_counter() - t0) * 1000
+        if name == "first reading":
+            raise SimulationEnd()
+        return mark(name)
+
+    PROFILE.mark = timed_mark
+    if eager:
+        for name in NETWORK_MODULES:
+            __import__(name)
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        runpy.run_path(os.path.join(REPO, script), run_name="__main__")
+    except SimulationEnd:
+        pass
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    loaded = sorted(m for m in set(sys.modules) - before if m.startswith("buni.") or m in NETWORK_MODULES)
+    print(json.dumps({"stamps": stamps, "modules": loaded}))
+
+def _run(script, eager, pycache):
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=pycache)
+    cmd = [sys.executable, "-m", "sim.startup", "--child", script]
+    if eager:
+        cmd.append("--eager")
+    out = subprocess.run(cmd, cwd=REPO, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def _median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+def measure(script, eager, precompiled, runs, pycache):
+    """Median ms to each boot mark over `runs` fresh interpreters."""
+    repo_cache = pycache + os.path.abspath(REPO)
+    results = []
+    for _ in range(runs):
+        if not precompiled:
+            # stdlib bytecode stays cached; only the repository's modules recompile
+            shutil.rmtree(repo_cache, ignore_errors=True)
+        results.append(_run(script, eager, pycache))
+    stamps = {}
+    for name in ("imports", "hardware", "first reading"):
+        values = [r["stamps"][name] for r in results if name in r["stamps"]]
+        if values:
+            stamps[name] = _median(values)
+    return stamps, results[-1]["modules"]
+
+def main(argv):
+    scripts = []
+    runs = RUNS
+    i = 0
+    while i < len(argv):
+        if argv[i] == "--runs":
+            runs = int(argv[i + 1])
+            i += 1
+        elif argv[i] == "--child":
+            _child(argv[i + 1], "--eager" in argv)
+            return 0
+        elif not argv[i].startswith("-"):
+            scripts.append(argv[i])
+        i += 1
+
+    pycache = tempfile.mkdtemp(prefix="pycache_")
+    try:
+        _run(SCRIPTS[0], True, pycache)          # warm the stdlib bytecode cache
+        for script in scripts or SCRIPTS:
+            print(script)
+            print("  {:<9} {:<12} {:>9} {:>10} {:>14}".format("imports", "modules", "imports", "hardware", "first reading"))
+            for eager in (True, False):
+                for precompiled in (False, True):
+                    stamps, modules = measure(script, eager, precompiled, runs, pycache)
+                    print("  {:<9} {:<12} {:>6.1f} ms {:>7.1f} ms {:>11.1f} ms".format(
+                        "eager" if eager else "lazy", "precompiled" if precompiled else "source",
+                        stamps.get("imports", 0), stamps.get("hardware", 0), stamps.get("first reading", 0)))
+                print("  {} buni/network modules at the first reading: {}".format(
+                    "eager" if eager else "lazy", ", ".join(modules)))
+    finally:
+        shutil.rmtree(pycache, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,121 @@
+"""
+    ----------------------------------------------------------------------------
+    SIMULATED WORLD
+    > Operation:
+        - Shared state behind the stand-in hardware modules: the virtual
+          clock, sensor waveforms, WiFi link, messaging APIs and relays
+        - Failure injection: DHT22 read failures, WiFi connect failures and
+          outages, HTTP timeouts / error codes
+        - Counters for everything the simulated hardware was asked to do
+        - reset() gives a fresh, seeded world
+    ---
+    Author: Angaza Elimu - Buni Team
+    Version: 1.0.025
+    ----------------------------------------------------------------------------
+"""
+
+import random
+
+from sim.clock import VirtualClock
+from sim import scenario
+
+class World:
+    def __init__(self, seed=None, clock=None):
+        self.clock = clock or VirtualClock()
+        self.random = random.Random(seed)
+        # --- sensors ---
+        self.adc = {}                  # GPIO number -> waveform(t) giving a raw 0..65535 value
+        self.adc_noise = 0             # extra per-sample noise (raw counts)
+        self.dht_temp = scenario.constant(25.0)
+        self.dht_hum = scenario.constant(50.0)
+        self.dht_fail_rate = 0.02      # chance a DHT22 read fails
+        self.dht_min_interval = 2.0    # reads closer than this fail (DHT22 limit)
+        self.dht_read_time = 0.005     # seconds a bit-banged read takes
+        # --- WiFi ---
+        self.wifi_connect_time = 3.0
+        self.wifi_fail_rate = 0.1      # chance a connect attempt fails
+        self.wifi_outages = []         # [(start_s, end_s)] with no access point
+        # --- messaging APIs ---
+        self.http_latency = 0.6        # seconds per request
+        self.tls_handshake = 2.0       # seconds per new TLS connection
+        self.http_timeout = 10.0       # seconds lost on an injected timeout
+        self.http_fail_rate = 0.02     # chance of a timeout
+        self.http_error_rate = 0.0     # chance of a 5xx response
+        self.http_status = 200
+        self.requests = []             # (t, host, path) of recent requests
+        self.max_requests_kept = 1000
+        self.datagrams = []            # (t, addr, bytes) of recent UDP datagrams
+        # --- other TCP servers (e.g. the gateway's outbox receiver) ---
+        self.services = {}             # (host, port) -> handler(rx bytearray) -> reply bytes
+        self.tcp_rate = 50000          # bytes per second through the WiFi link
+        self.tcp_rtt = 0.02            # seconds per request / reply round trip
+        # --- relays (PCF8574 pins) ---
+        self.relays = [0] * 8
+        self.relay_miss_rate = 0.0     # chance a relay write is lost
+        self.relay_address = 0x20      # I2C address of the expander (machine.I2C)
+        # --- timer interrupts ---
+        self.irq_latency_us = 10       # a timer IRQ runs up to this late
+        # --- other modules can hang their models here ---
+        self.pins = {}
+        self.devices = {}
+        self.counters = {}
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def in_outage(self):
+        now = self.clock.now
+        for start, end in self.wifi_outages:
+            if start <= now < end:
+                return True
+        return False
+
+    def adc_value(self, gpio):
+        wave = self.adc.get(gpio)
+        value = 32768 if wave is None else wave(self.clock.now)
+        if self.adc_noise:
+            value += self.random.gauss(0, self.adc_noise)
+        return max(0, min(65535, int(value)))
+
+    def link_up(self):
+        wlan = self.devices.get("wlan")
+        return wlan is not None and wlan.isconnected()
+
+    def http(self, host, path):
+        """
+        One request to a messaging API. Returns (status, body) or raises
+        OSError like a real socket would. Takes simulated time.
+        """
+        self.count("http_requests")
+        if not self.link_up():
+            self.count("http_no_link")
+            raise OSError(113, "EHOSTUNREACH")
+        if self.random.random() < self.http_fail_rate:
+            self.clock.advance(self.http_timeout)
+            self.count("http_timeouts")
+            raise OSError(110, "ETIMEDOUT")
+        self.clock.advance(self.http_latency)
+        self.requests.append((self.clock.now, host, path))
+        if len(self.requests) > self.max_requests_kept:
+            del self.requests[0]
+        if self.random.random() < self.http_error_rate:
+            self.count("http_5xx")
+            return 503, b"Service Unavailable"
+        self.count("http_ok")
+        if host.endswith("telegram.org"):
+            return self.http_status, b'{"ok":true,"result":{"message_id":1}}'
+        return self.http_status, b"Message queued. You will receive it in a few seconds."
+
+WORLD = World()
+
+def reset(seed=None, setup=scenario.greenhouse):
+    """
+    Start over with a fresh, seeded world. The WORLD object and its clock are
+    reused, so stand-in modules and the patched `time` module keep working.
+    """
+    clock = WORLD.clock
+    clock.__init__(clock.start_epoch)
+    WORLD.__init__(seed, clock)
+    if setup is not None:
+        setup(WORLD)
+    return WORLD
@@ -2,18 +2,30 @@
 # Author: diana
 # Target: Raspberry Pi Pico / Pico W (MicroPython)
 
+from buni.boot_profile import PROFILE   # first, so its clock starts at boot on CPython
+import struct
 import time
 try:
-    import network
-except:
-    network = None
-try:
-    import urequests as requests
-except:
-    import requests
-
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
 from machine import Pin, ADC
 import dht
+from buni.notify_queue import NotificationQueue
+from buni.alert_digest import AlertDigest
+from buni.adc_burst import BurstSampler, MEDIAN
+from buni.calibration import SoilTable, TDSTable
+from buni.history import History
+from buni.dht_cache import DHTCache
+from buni.flash_log import FlashLog
+from buni.msgbuild import MessageBuilder, URL_SIZE, quoted
+from buni.rules import RuleSet, ABOVE, BELOW, INFO, WARNING, CRITICAL
+from buni.stats import StreamStats
+from buni.outbox import Outbox, GatewaySender, HIGH, PRIORITY_FIRST, MESSAGE as OUTBOX_MESSAGE
+from buni.outbox import BATCH_HEAD_SIZE, RECORD_HEAD_FMT, RECORD_HEAD_SIZE
+# WiFi, HTTP, gateway and MQTT modules load on first use, after the first reading
+from buni import net
+PROFILE.mark("imports")
 
 # ===== CONFIG =====
 # Wi-Fi
@@ -36,16 +48,64 @@ TDS_ADC_PIN = 29       # GP29 analog for TDS (note: check your board; GP26-28 ar
 DRY_VALUE = 65535
 WET_VALUE = 31405
 
-# Thresholds
-DRY_THRESHOLD = 30     # percent
-WET_THRESHOLD = 70     # percent
-TEMP_HIGH_LIMIT = 30   # degC
-HUM_LOW_LIMIT = 40     # %
-TDS_HIGH_LIMIT = 800   # ppm
+# ADC burst sampling (0 = single read_u16 sample)
+ADC_BURST_SAMPLES = 16     # samples per reading
+ADC_BURST_METHOD = MEDIAN  # MEDIAN, TRIMMED_MEAN or AVERAGE (see adc_burst.py)
+ADC_BURST_BUDGET_US = 2000 # max sampling time per reading
+
+# Timer capture (capture.py): soil and TDS sampled by a timer interrupt at an exact
+# rate, each reading is the mean since the previous cycle; 0 = burst sampling above
+CAPTURE_HZ = 50            # samples per second per sensor (up to ~1000)
+
+# Alert rules (rules.py): an alert is raised once the reading has been past its
+# limit for the minimum time and clears once it is back past it by the hysteresis
+# (name, channel, comparison, limit, hysteresis, severity, minimum seconds, unit)
+# A channel is a reading ("temp") or a statistic of it from stats.py: "tds_avg"
+# (smoothed), "temp_slope" (per minute), "_mean", "_sd", "_min", "_max"
+RULES = (
+    ("High temperature", "temp", ABOVE, 30, 1.0, WARNING, 30, "C"),
+    ("Low humidity", "hum", BELOW, 40, 3, WARNING, 30, "%"),
+    ("Soil dry", "soil", BELOW, 30, 3, CRITICAL, 60, "%"),
+    ("Soil wet", "soil", ABOVE, 70, 3, WARNING, 60, "%"),
+    ("High TDS", "tds_avg", ABOVE, 800, 25, WARNING, 30, "ppm"),
+    ("Temperature rising fast", "temp_slope", ABOVE, 0.2, 0.05, INFO, 60, "C/min"),
+)
 
 # Timing
 SAMPLE_INTERVAL = 5        # seconds between cycles
-ALERT_COOLDOWN = 60        # seconds between alert messages
+ALERT_WINDOW = 300         # seconds per alert digest (alerts in between are coalesced)
+USE_ASYNC = True           # run sampling / LED / notify / WiFi as cooperative tasks
+USE_DUAL_CORE = False      # sampling on core 1, WiFi and notifications on core 0 (dual_core.py); overrides USE_ASYNC
+WIFI_POLL_MS = 500         # async mode: how often the WiFi task advances the connection
+NOTIFY_QUEUE_SIZE = 8      # pending messages kept per channel
+NOTIFY_RETRY_DELAY = 10    # seconds to wait after a failed send before retrying
+HISTORY_SIZE = 360         # readings kept in RAM (30 min at SAMPLE_INTERVAL = 5)
+HISTORY_CHANNELS = ("temp", "hum", "soil", "tds")
+STATS_INTERVAL = 60        # seconds between statistics summaries on MQTT <prefix>/stats
+LOG_DIR = "log"            # flash log folder (readings survive reboots); None to disable
+
+# Store-and-forward outbox (outbox.py): alert digests, and readings for the gateway,
+# are kept on flash until the receiver has them, through outages and reboots
+OUTBOX_DIR = "outbox"      # None to disable (alerts then wait in the RAM queues only)
+OUTBOX_ORDER = PRIORITY_FIRST  # or OLDEST_FIRST
+OUTBOX_BATCHES = 4         # batches sent per cycle while draining a backlog
+
+# Fleet gateway (gateway/): readings go there and it sends the alerts; None = alert directly
+GATEWAY_HOST = None        # e.g. "192.168.1.10"
+GATEWAY_PORT = 9750
+GATEWAY_DELTA = True       # send only readings that changed, as delta frames (deadband.py); not with the outbox
+
+# Batch upload (upload.py): the RAM history as one compressed HTTP POST per interval,
+# e.g. to the gateway started with --http 9080; None to disable
+UPLOAD_HOST = None         # e.g. "192.168.1.10"
+UPLOAD_PORT = 9080
+UPLOAD_INTERVAL = 1500     # seconds between batches; below HISTORY_SIZE * SAMPLE_INTERVAL so a failed one is retried
+
+# MQTT telemetry (mqtt.py): batched readings + QoS 1 alerts; None to disable
+MQTT_HOST = None           # e.g. "192.168.1.10"
+MQTT_PORT = 1883
+MQTT_TOPIC = "buni/{:08x}" # formatted with the node id; /readings, /stats and /alerts below it
+MQTT_POLL_MS = 100         # async mode: how often the MQTT task services the socket
 
 # LED indicator pin
 LED_PIN = 12
@@ -58,162 +118,196 @@ def safe_sleep(s):
     except KeyboardInterrupt:
         raise
 
-# ===== WiFi =====
-class WiFi:
-    @staticmethod
-    def connect(ssid, password, timeout=15):
-        if network is None:
-            print("Network module not available on this build.")
-            return False
-        wlan = network.WLAN(network.STA_IF)
-        wlan.active(True)
-        if wlan.isconnected():
-            print("Already connected:", wlan.ifconfig())
-            return True
-        wlan.connect(ssid, password)
-        t0 = time.time()
-        while time.time() - t0 < timeout:
-            if wlan.isconnected():
-                print("WiFi connected:", wlan.ifconfig())
-                return True
-            print("Waiting for WiFi...")
-            time.sleep(1)
-        print("WiFi connection failed.")
-        return False
+try:
+    from time import ticks_ms, ticks_add, ticks_diff
+except ImportError:
+    # CPython fallback so the loop can be exercised off-device
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_add(t, delta):
+        return t + delta
+
+    def ticks_diff(a, b):
+        return a - b
+
+async def sleep_ms(ms):
+    """uasyncio has sleep_ms; CPython asyncio only has sleep(seconds)."""
+    if hasattr(asyncio, "sleep_ms"):
+        await asyncio.sleep_ms(ms)
+    else:
+        await asyncio.sleep(ms / 1000)
 
 # ===== Notifiers =====
+# By default both notifiers share one keep-alive connection per API host with a
+# circuit breaker per host (net.http()), created on the first send
+MESSAGE = MessageBuilder()     # digest text, rendered without building strings
+URL = MessageBuilder(URL_SIZE) # request path; the notifiers send one at a time
+def url_truncated():
+    """True (and reported) when the last message did not fit in URL; it is not sent cut short."""
+    if not URL.truncated:
+        return False
+    print("Message too long for the URL buffer ({} bytes over), not sent".format(URL.truncated))
+    URL.truncated = 0
+    return True
+
 class WhatsAppNotifier:
-    def __init__(self, phone, apikey):
+    HOST = "api.callmebot.com"
+
+    def __init__(self, phone, apikey, http=None):
         self.phone = phone
         self.apikey = apikey
+        self.http = http
+        # fixed parts of the URL, encoded once
+        self.prefix = b"/whatsapp.php?phone=" + quoted(phone) + b"&text="
+        self.suffix = b"&apikey=" + quoted(apikey)
 
     def send(self, message):
-        # callmebot expects URL encoded text; spaces -> %20
-        msg = str(message).replace(" ", "%20")
-        url = f"https://api.callmebot.com/whatsapp.php?phone={self.phone}&text={msg}&apikey={self.apikey}"
+        # callmebot expects URL encoded text (str or bytes; encoded straight into the URL buffer)
+        path = URL.reset().write(self.prefix).quote(message).write(self.suffix).view()
+        if url_truncated():
+            return False
         try:
-            resp = requests.get(url)
-            if hasattr(resp, "status_code"):
-                ok = resp.status_code == 200
-            else:
-                ok = True
+            ok = (self.http or net.http()).get(self.HOST, path) == 200
             print("WhatsApp send ->", "OK" if ok else "ERR")
-            try:
-                resp.close()
-            except:
-                pass
             return ok
         except Exception as e:
             print("WhatsApp send error:", e)
             return False
 
+    def available(self):
+        """False while the API's circuit breaker is open (the queue holds messages)."""
+        return (self.http or net.http()).available(self.HOST)
+
 class TelegramNotifier:
-    def __init__(self, token, chat_id):
+    HOST = "api.telegram.org"
+
+    def __init__(self, token, chat_id, http=None):
         self.token = token
         self.chat_id = chat_id
+        self.http = http
+        self.prefix = b"/bot" + token.encode() + b"/sendMessage?chat_id=" + quoted(chat_id) + b"&text="
 
     def send(self, message):
-        url_msg = str(message).replace(" ", "%20")
-        url = f"https://api.telegram.org/bot{self.token}/sendMessage?chat_id={self.chat_id}&text={url_msg}"
+        path = URL.reset().write(self.prefix).quote(message).view()
+        if url_truncated():
+            return False
         try:
-            resp = requests.get(url)
-            if hasattr(resp, "status_code"):
-                ok = resp.status_code == 200
-            else:
-                ok = True
+            ok = (self.http or net.http()).get(self.HOST, path) == 200
             print("Telegram send ->", "OK" if ok else "ERR")
-            try:
-                resp.close()
-            except:
-                pass
             return ok
         except Exception as e:
             print("Telegram send error:", e)
             return False
 
+    def available(self):
+        """False while the API's circuit breaker is open (the queue holds messages)."""
+        return (self.http or net.http()).available(self.HOST)
+
 # ===== Sensors =====
 class DHT22Sensor:
     def __init__(self, pin_no):
         self.pin = Pin(pin_no)
         self.sensor = dht.DHT22(self.pin)
+        # at most one measurement per 2 s; reads in between come from the cache
+        self.cache = DHTCache(self.sensor)
 
     def read(self):
         """Return (temp_c, hum_percent) or (None, None) on failure."""
-        try:
-            self.sensor.measure()
-            t = self.sensor.temperature()
-            h = self.sensor.humidity()
-            # Cast to float for calculations
-            return float(t), float(h)
-        except Exception as e:
-            print("DHT read error:", e)
-            return None, None
+        t, h = self.cache.read()
+        if t is None:
+            print("DHT read error:", self.cache.last_error)
+        return t, h
+
+def make_burst(adc, samples=ADC_BURST_SAMPLES):
+    """BurstSampler for an ADC, or None when burst sampling is disabled."""
+    if samples <= 1:
+        return None
+    return BurstSampler(adc, samples, ADC_BURST_METHOD, ADC_BURST_BUDGET_US)
 
 class SoilMoisture:
-    def __init__(self, analog_pin, dry=DRY_VALUE, wet=WET_VALUE):
+    def __init__(self, analog_pin, dry=DRY_VALUE, wet=WET_VALUE, burst=ADC_BURST_SAMPLES):
         self.adc = ADC(Pin(analog_pin))
         self.dry = int(dry)
         self.wet = int(wet)
+        # raw -> percent lookup, built once (handles inverted calibration too)
+        self.table = SoilTable(self.dry, self.wet)
+        self.burst = make_burst(self.adc, burst)
+        self.spread = 0   # max - min of the last burst (raw ADC units)
+        self.capture = None   # Capture and channel, set by start_capture()
+        self.channel = 0
 
     def read_raw(self):
-        return int(self.adc.read_u16())
+        if self.capture is not None:
+            raw, self.spread, n = self.capture.read(self.channel)
+            if n:
+                return raw
+        if self.burst is None:
+            return int(self.adc.read_u16())
+        raw = self.burst.read()
+        self.spread = self.burst.spread
+        return raw
 
     def read_percent(self):
         raw = self.read_raw()
-        # Guard: if same values or inverted config:
-        if self.wet >= self.dry:
-            # misconfigured calibration; clamp and return 0-100 via a safe mapping
-            pct = 0 if raw >= self.dry else 100
-        else:
-            if raw >= self.dry:
-                pct = 0
-            elif raw <= self.wet:
-                pct = 100
-            else:
-                # compute percentage step by step to reduce arithmetic mistakes:
-                numer = raw - self.wet
-                denom = self.dry - self.wet
-                frac = numer / denom   # 0..1
-                pct = 100 - (frac * 100)
-        return int(pct), raw
+        return self.table.percent(raw), raw
 
 class TDSSensor:
-    def __init__(self, analog_pin, vref=3.3):
+    def __init__(self, analog_pin, vref=3.3, burst=ADC_BURST_SAMPLES):
         self.adc = ADC(Pin(analog_pin))
         self.vref = float(vref)
+        self.table = TDSTable(self.vref)
+        self.burst = make_burst(self.adc, burst)
+        self.spread = 0   # max - min of the last burst (raw ADC units)
+        self.capture = None   # Capture and channel, set by start_capture()
+        self.channel = 0
 
     def read_raw(self):
-        return int(self.adc.read_u16())
+        if self.capture is not None:
+            raw, self.spread, n = self.capture.read(self.channel)
+            if n:
+                return raw
+        if self.burst is None:
+            return int(self.adc.read_u16())
+        raw = self.burst.read()
+        self.spread = self.burst.spread
+        return raw
+
+    def read_ppm(self, temperature_c=25.0):
+        """TDS in ppm as an int (table lookup, no float math)."""
+        return self.table.ppm(self.read_raw(), temperature_c)
 
     def read_tds(self, temperature_c=25.0):
         """
-        Convert ADC raw to voltage, then to EC and approximate TDS (ppm).
+        Read TDS (ppm) plus the voltage and EC values shown on the console.
         This is a rough approximation — calibrate with known standards for accuracy.
+        See calibration.TDSTable for the conversion (EC ~ voltage * 1000 / 560,
+        2% per degC compensation, TDS = EC * 0.5).
         """
         raw = self.read_raw()
-        # ADC range is 0..65535
-        voltage = (raw / 65535.0) * self.vref  # volts
-        # EC calculation: this depends on your probe & circuit; we use a demo constant
-        # ec (mS/cm) ~ (voltage * 1000) / K where K is a resistance/scale constant.
-        # Use K = 560 as in original; then convert with temperature compensation.
-        K = 560.0
-        ec = (voltage * 1000.0) / K  # mS/cm (approx)
-        # Temperature compensation: coeff ~ 2% per degC
-        compensation_coeff = 1.0 + 0.02 * (temperature_c - 25.0)
-        if compensation_coeff == 0:
-            ec_25 = ec
-        else:
-            ec_25 = ec / compensation_coeff
-        # Convert EC to TDS (typical factor ~0.5 - 0.7). We'll use 0.5 here.
-        tds = ec_25 * 0.5 * 1000.0  # convert to ppm (scaled)
-        # Round into reasonable values
+        tds = self.table.ppm(raw, temperature_c)
         return {
             "raw": raw,
-            "voltage": round(voltage, 3),
-            "ec": round(ec_25, 3),
-            "tds": int(round(tds)),
+            "spread": self.spread,
+            "voltage": round(self.table.voltage(raw), 3),
+            "ec": round(tds / 500.0, 3),   # mS/cm at 25 degC
+            "tds": tds,
         }
 
+def start_capture(soil, tds):
+    """Sample both ADCs from a timer interrupt (CAPTURE_HZ); None when disabled."""
+    if not CAPTURE_HZ:
+        return None
+    from buni.capture import Capture
+    try:
+        capture = Capture((soil.adc, tds.adc), CAPTURE_HZ).start()
+    except Exception as e:
+        print("Timer capture unavailable:", e)
+        return None
+    soil.capture, soil.channel = capture, 0
+    tds.capture, tds.channel = capture, 1
+    return capture
+
 # ===== LED controller =====
 class LEDController:
     def __init__(self, pin_no):
@@ -233,6 +327,157 @@ class LEDController:
             self.off()
             time.sleep(off_s)
 
+# ===== Cycle helpers (shared by the blocking and async loops) =====
+def open_flash_log():
+    """FlashLog in LOG_DIR, or None when disabled or the filesystem is unavailable."""
+    if LOG_DIR is None:
+        return None
+    try:
+        return FlashLog(LOG_DIR)
+    except Exception as e:
+        print("Flash log unavailable:", e)
+        return None
+
+def open_outbox():
+    """Outbox in OUTBOX_DIR, or None when disabled or the filesystem is unavailable."""
+    if OUTBOX_DIR is None:
+        return None
+    try:
+        from buni.node import node_id
+        return Outbox(OUTBOX_DIR, node_id(), OUTBOX_ORDER)
+    except Exception as e:
+        print("Outbox unavailable:", e)
+        return None
+
+def outbox_sender(wa, tg):
+    """
+    send(batch, count) for Outbox.drain(): the gateway over TCP when one is
+    configured, otherwise the notify queues (taking alerts while both have room,
+    each tagged with its outbox sequence for confirm_alerts()).
+    """
+    if GATEWAY_HOST is not None:
+        return GatewaySender(GATEWAY_HOST, GATEWAY_PORT)
+
+    def send(batch, count):
+        offset = BATCH_HEAD_SIZE   # records follow the batch header back to back
+        for taken in range(count):
+            if wa.pending() >= wa.size or tg.pending() >= tg.size:
+                return taken       # backpressure: the rest stays on flash
+            length, seq = struct.unpack_from(RECORD_HEAD_FMT, batch, offset)[2:4]
+            offset += RECORD_HEAD_SIZE
+            send_alert(bytes(batch[offset:offset + length]), wa, tg, seq)
+            offset += length
+        return count
+    return send
+
+def drain_outbox(outbox, sender):
+    """A few outbox batches to the gateway (acknowledged by it) or into the notify queues."""
+    if outbox and outbox.backlog():
+        outbox.drain(sender, OUTBOX_BATCHES, GATEWAY_HOST is not None)
+
+def confirm_alerts(outbox, wa, tg):
+    """Acknowledge the outbox alerts the notifiers have delivered (or given up on)."""
+    if outbox and GATEWAY_HOST is None:
+        outbox.confirm(min(wa.done_tag, tg.done_tag) if SEND_BOTH else wa.done_tag)
+
+def forward_reading(outbox, uplink, wifi_ok, ts, temp, hum, soil_pct, tds_ppm):
+    """A reading for the gateway: into the outbox, or straight to the uplink while WiFi is up."""
+    if outbox and GATEWAY_HOST is not None:
+        outbox.put_reading(ts, temp, hum, soil_pct, tds_ppm)
+    elif uplink and wifi_ok:
+        uplink.reading(ts, temp, hum, soil_pct, tds_ppm)
+        uplink.flush()
+
+def queue_alert(msg, wa, tg, outbox):
+    """A digest for the notifiers: kept in the outbox first when there is one."""
+    if GATEWAY_HOST is None and not (outbox and outbox.put(OUTBOX_MESSAGE, msg, HIGH)):
+        send_alert(msg, wa, tg)
+
+def open_uplink():
+    """GatewayUplink to GATEWAY_HOST, or None when no gateway is configured."""
+    if GATEWAY_HOST is None:
+        return None
+    try:
+        return net.uplink(GATEWAY_HOST, GATEWAY_PORT, GATEWAY_DELTA)
+    except Exception as e:
+        print("Gateway unavailable:", e)
+        return None
+
+def upload_history(uploader, history, wifi_ok):
+    """Post the history batch when one is due; returns the uploader (made once WiFi is up)."""
+    if UPLOAD_HOST is None or not wifi_ok:
+        return uploader
+    if uploader is None:
+        uploader = net.uploader(history, UPLOAD_HOST, UPLOAD_PORT, UPLOAD_INTERVAL)
+    if uploader.due():
+        uploader.upload()
+    return uploader
+
+def open_mqtt():
+    """TelemetryPublisher for MQTT_HOST, or None when MQTT is not configured."""
+    if MQTT_HOST is None:
+        return None
+    return net.mqtt(MQTT_HOST, MQTT_PORT, MQTT_TOPIC)
+
+def profile_boot(temp, wifi_ok):
+    """Print the boot profile at the first valid reading and when WiFi first comes up."""
+    if temp is not None and PROFILE.mark("first reading"):
+        PROFILE.report()
+    if wifi_ok and PROFILE.mark("wifi up"):
+        PROFILE.report()
+
+def print_readings(temp, hum, soil_raw, soil_pct, tds_info, soil_spread=0):
+    now = time.localtime()
+    print("Time:", now)
+    print("DHT -> Temp: {} C, Humidity: {} %".format(temp, hum))
+    print("Soil -> Raw: {} (spread {}), Moisture: {}%".format(soil_raw, soil_spread, soil_pct))
+    print("TDS -> Raw: {} (spread {}), Voltage: {} V, EC: {} (mS/cm), TDS: {} ppm".format(
+        tds_info["raw"], tds_info["spread"], tds_info["voltage"], tds_info["ec"], tds_info["tds"]
+    ))
+
+def check_alerts(rules, stats, temp, hum, soil_pct, tds_ppm, digest=None):
+    """
+    Add one set of readings to `stats` (a StreamStats of HISTORY_CHANNELS)
+    and run the alert rules (a RuleSet of RULES for stats.names) on the
+    readings and their statistics. Alerts raised or cleared by this reading
+    are printed and recorded in `digest` (an AlertDigest) if given. Returns
+    True while an alert of WARNING or above is active.
+    """
+    failed = temp is None or hum is None
+    if failed:
+        print("Sensor error: DHT22 read failed.")
+        if digest:
+            digest.add("DHT22 read failed")
+    # a missing reading leaves its statistics and rules as they were
+    now = time.time()
+    stats.update((temp, hum, soil_pct, tds_ppm), now)
+    changed = rules.evaluate(stats.values, now)
+    if changed:
+        rules.report(changed, digest)
+    return failed or rules.alerting()
+
+def stats_due(cycle):
+    """True on the cycles that publish a statistics summary (every STATS_INTERVAL)."""
+    return cycle % max(1, STATS_INTERVAL // SAMPLE_INTERVAL) == 0
+
+def send_alert(alert_msg, wa, tg, tag=0):
+    """Queue one alert message on the configured channels (tag: its outbox sequence)."""
+    if SEND_BOTH:
+        try:
+            wa.send(alert_msg, tag)
+        except Exception as e:
+            print("WA send exception:", e)
+        try:
+            tg.send(alert_msg, tag)
+        except Exception as e:
+            print("TG send exception:", e)
+    else:
+        # fallback to WhatsApp only
+        try:
+            wa.send(alert_msg, tag)
+        except Exception as e:
+            print("WA send exception:", e)
+
 # ===== Main =====
 def main():
     print("Starting system...")
@@ -242,19 +487,24 @@ def main():
     dht_sensor = DHT22Sensor(DHT_PIN)
     soil = SoilMoisture(SOIL_ADC_PIN, dry=DRY_VALUE, wet=WET_VALUE)
     tds = TDSSensor(TDS_ADC_PIN)
-
-    # Connect WiFi (optional but needed for notifications)
-    wifi_ok = False
-    try:
-        wifi_ok = WiFi.connect(SSID, PASSWORD)
-    except Exception as e:
-        print("WiFi connect exception:", e)
-
-    # Notifiers
-    wa = WhatsAppNotifier(CALLMEBOT_PHONE, CALLMEBOT_APIKEY)
-    tg = TelegramNotifier(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID)
-
-    last_alert_time = 0
+    capture = start_capture(soil, tds)
+    PROFILE.mark("hardware")
+
+    # Notifiers (behind bounded queues so send() never blocks the loop)
+    wa = NotificationQueue(WhatsAppNotifier(CALLMEBOT_PHONE, CALLMEBOT_APIKEY), NOTIFY_QUEUE_SIZE)
+    tg = NotificationQueue(TelegramNotifier(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID), NOTIFY_QUEUE_SIZE)
+
+    digest = AlertDigest(ALERT_WINDOW)
+    stats = StreamStats(HISTORY_CHANNELS)
+    rules = RuleSet(RULES, stats.names)
+    history = History(HISTORY_CHANNELS, HISTORY_SIZE)
+    flash_log = open_flash_log()
+    outbox = open_outbox()
+    sender = outbox_sender(wa, tg) if outbox else None
+    uplink = None
+    uploader = None
+    telemetry = open_mqtt()
+    mq = NotificationQueue(telemetry.alerts, NOTIFY_QUEUE_SIZE) if telemetry else None
 
     print("Entering main loop. Press Ctrl-C to stop.")
     try:
@@ -268,69 +518,59 @@ def main():
             tds_info = tds.read_tds(temperature_c=(temp if temp is not None else 25.0))
             tds_ppm = tds_info["tds"]
 
+            # WiFi (needed for notifications) connects and reconnects in the
+            # background; each cycle advances it one step without waiting on the radio
+            wifi_ok = net.wifi(SSID, PASSWORD).tick()
+            profile_boot(temp, wifi_ok)
+            if wifi_ok and uplink is None and outbox is None and GATEWAY_HOST is not None:
+                uplink = open_uplink()
+            history.append(time.time(), temp, hum, soil_pct, tds_ppm)
+            if flash_log:
+                flash_log.append(time.time(), temp, hum, soil_pct, tds_ppm)
+            forward_reading(outbox, uplink, wifi_ok, time.time(), temp, hum, soil_pct, tds_ppm)
+            if telemetry:
+                telemetry.reading(time.time(), temp, hum, soil_pct, tds_ppm)
+
             # Print readings
-            now = time.localtime()
-            print("Time:", now)
-            print("DHT -> Temp: {} C, Humidity: {} %".format(temp, hum))
-            print("Soil -> Raw: {}, Moisture: {}%".format(soil_raw, soil_pct))
-            print("TDS -> Raw: {}, Voltage: {} V, EC: {} (mS/cm), TDS: {} ppm".format(
-                tds_info["raw"], tds_info["voltage"], tds_info["ec"], tds_info["tds"]
-            ))
+            print_readings(temp, hum, soil_raw, soil_pct, tds_info, soil.spread)
 
             # Determine status & alerts
-            alerts = []
-            if temp is None or hum is None:
-                alerts.append("Sensor error: DHT22 read failed.")
-            else:
-                if temp > TEMP_HIGH_LIMIT:
-                    alerts.append(f"High temperature: {temp} C (limit {TEMP_HIGH_LIMIT} C)")
-                if hum < HUM_LOW_LIMIT:
-                    alerts.append(f"Low humidity: {hum}% (limit {HUM_LOW_LIMIT}%)")
-
-            if soil_pct < DRY_THRESHOLD:
-                alerts.append(f"Soil dry: {soil_pct}% (threshold {DRY_THRESHOLD}%)")
-            elif soil_pct > WET_THRESHOLD:
-                alerts.append(f"Soil wet: {soil_pct}% (threshold {WET_THRESHOLD}%)")
-
-            if tds_ppm > TDS_HIGH_LIMIT:
-                alerts.append(f"High TDS: {tds_ppm} ppm (limit {TDS_HIGH_LIMIT} ppm)")
+            alerting = check_alerts(rules, stats, temp, hum, soil_pct, tds_ppm, digest)
+            if telemetry and stats_due(cycle):
+                telemetry.summary(stats.pack(time.time()))
 
             # LED logic
-            if alerts:
-                print("ALERTS:", alerts)
+            if alerting:
+                print("Alert active.")
                 led.blink(times=3, on_s=0.15, off_s=0.15)
             else:
                 print("All readings normal.")
                 # short heartbeat blink
                 led.blink(times=1, on_s=0.05, off_s=0.05)
 
-            # Send notifications if needed and cooldown passed
-            now_ts = time.time()
-            if alerts and (now_ts - last_alert_time) >= ALERT_COOLDOWN:
-                alert_msg = " | ".join(alerts)
-                # Always attempt to send (if wifi_ok)
-                if wifi_ok:
-                    if SEND_BOTH:
-                        try:
-                            wa.send(alert_msg)
-                        except Exception as e:
-                            print("WA send exception:", e)
-                        try:
-                            tg.send(alert_msg)
-                        except Exception as e:
-                            print("TG send exception:", e)
-                    else:
-                        # fallback to WhatsApp only
-                        try:
-                            wa.send(alert_msg)
-                        except Exception as e:
-                            print("WA send exception:", e)
-                else:
-                    print("Skipping network alerts: WiFi not connected.")
-                last_alert_time = now_ts
-            else:
-                if alerts:
-                    print("Alert suppressed due to cooldown.")
+            # Send one digest per window with everything seen since the last one
+            # (the gateway applies the same limits and alerts for us when used)
+            if digest.due():
+                msg = bytes(digest.flush_into(MESSAGE))   # the one copy the queues keep
+                queue_alert(msg, wa, tg, outbox)
+                if mq:
+                    mq.send(msg)
+                if not wifi_ok:
+                    print("WiFi not connected: alert kept in queue.")
+
+            # Outbox backlog first (a few batches per cycle), then at most one
+            # queued message per channel per cycle
+            uploader = upload_history(uploader, history, wifi_ok)
+            if wifi_ok:
+                drain_outbox(outbox, sender)
+                wa.pump()
+                tg.pump()
+                confirm_alerts(outbox, wa, tg)
+                if telemetry:
+                    telemetry.client.poll()
+                    mq.pump()
+            if wa.pending() or tg.pending():
+                print("Notify queue WA:", wa.stats(), "TG:", tg.stats())
 
             # Wait until next sample
             safe_sleep(SAMPLE_INTERVAL)
@@ -338,6 +578,340 @@ def main():
     except KeyboardInterrupt:
         print("Stopping monitoring (user interrupt).")
         led.off()
+        if flash_log:
+            flash_log.flush()
+        if outbox:
+            outbox.flush()
+            print("Outbox:", outbox.stats())
+        if uploader:
+            print("Upload:", uploader.stats())
+        if capture:
+            capture.stop()
+            print("Capture:", capture.stats())
+        print("WiFi:", net.wifi(SSID, PASSWORD).stats())
+
+# ===== Async main =====
+class JitterStats:
+    """Lateness of each cycle start against its fixed schedule (ms)."""
+    def __init__(self):
+        self.cycles = 0
+        self.total_ms = 0
+        self.max_ms = 0
+        self.skipped = 0   # whole periods dropped because a cycle overran
+
+    def record(self, late_ms):
+        self.cycles += 1
+        self.total_ms += late_ms
+        if late_ms > self.max_ms:
+            self.max_ms = late_ms
+
+    def mean_ms(self):
+        return self.total_ms / self.cycles if self.cycles else 0
+
+class MonitorState:
+    """State shared by the cooperative tasks."""
+    def __init__(self, wa, tg):
+        self.wa = wa                   # NotificationQueue per channel
+        self.tg = tg
+        self.digest = AlertDigest(ALERT_WINDOW)
+        self.stats = StreamStats(HISTORY_CHANNELS)
+        self.rules = RuleSet(RULES, self.stats.names)
+        self.history = History(HISTORY_CHANNELS, HISTORY_SIZE)
+        self.flash_log = open_flash_log()
+        self.outbox = open_outbox()
+        self.sender = outbox_sender(wa, tg) if self.outbox else None
+        self.uplink = None             # opened by the WiFi task once the link is up
+        self.uploader = None           # BatchUploader, made by the notify task once the link is up
+        self.telemetry = open_mqtt()
+        self.mq = NotificationQueue(self.telemetry.alerts, NOTIFY_QUEUE_SIZE) if self.telemetry else None
+        self.wifi = None               # WiFiManager, loaded by the WiFi task after the first reading
+        self.wifi_ok = False
+        self.led_alert = False         # pattern requested by the sampler
+        self.cycle = 0
+        self.jitter = JitterStats()
+
+async def sample_task(state, dht_sensor, soil, tds, max_cycles=None):
+    """Read sensors and classify on a fixed period, independent of network time."""
+    period_ms = int(SAMPLE_INTERVAL * 1000)
+    deadline = ticks_ms()
+    while max_cycles is None or state.cycle < max_cycles:
+        state.jitter.record(max(0, ticks_diff(ticks_ms(), deadline)))
+        state.cycle += 1
+        print("\n--- Cycle", state.cycle, " ---")
+        temp, hum = dht_sensor.read()
+        soil_pct, soil_raw = soil.read_percent()
+        tds_info = tds.read_tds(temperature_c=(temp if temp is not None else 25.0))
+        profile_boot(temp, False)      # "wifi up" is marked by the WiFi task
+        state.history.append(time.time(), temp, hum, soil_pct, tds_info["tds"])
+        if state.flash_log:
+            state.flash_log.append(time.time(), temp, hum, soil_pct, tds_info["tds"])
+        forward_reading(state.outbox, state.uplink, state.wifi_ok, time.time(), temp, hum, soil_pct, tds_info["tds"])
+        if state.telemetry:
+            state.telemetry.reading(time.time(), temp, hum, soil_pct, tds_info["tds"])
+        print_readings(temp, hum, soil_raw, soil_pct, tds_info, soil.spread)
+
+        state.led_alert = check_alerts(state.rules, state.stats, temp, hum, soil_pct, tds_info["tds"], state.digest)
+        if state.telemetry and stats_due(state.cycle):
+            state.telemetry.summary(state.stats.pack(time.time()))
+        if state.led_alert:
+            print("Alert active.")
+        else:
+            print("All readings normal.")
+        if state.digest.due():
+            # only queues; the notify task does the slow part
+            msg = bytes(state.digest.flush_into(MESSAGE))
+            queue_alert(msg, state.wa, state.tg, state.outbox)
+            if state.mq:
+                state.mq.send(msg)
+
+        # Next deadline is on the fixed grid; skip whole periods if we overran
+        deadline = ticks_add(deadline, period_ms)
+        delay = ticks_diff(deadline, ticks_ms())
+        while delay < 0:
+            state.jitter.skipped += 1
+            deadline = ticks_add(deadline, period_ms)
+            delay += period_ms
+        await sleep_ms(delay)
+
+async def led_task(state, led):
+    """Play the LED pattern the sampler asked for, once per sample period."""
+    while True:
+        if state.led_alert:
+            for _ in range(3):
+                led.on()
+                await sleep_ms(150)
+                led.off()
+                await sleep_ms(150)
+            await sleep_ms(max(0, int(SAMPLE_INTERVAL * 1000) - 900))
+        else:
+            # short heartbeat blink
+            led.on()
+            await sleep_ms(50)
+            led.off()
+            await sleep_ms(max(0, int(SAMPLE_INTERVAL * 1000) - 50))
+
+async def notify_task(state, poll_ms=500):
+    """Drain the outbox, post history batches and empty the notification queues in the background."""
+    while True:
+        delay = poll_ms
+        if state.wifi_ok:
+            # Everything here runs inline, between the sampler's turns: the
+            # sampler appends to the same outbox, history and notification
+            # rings, which have no locks. A slow request makes the next
+            # sample late by its duration; the sampler keeps its fixed grid.
+            drain_outbox(state.outbox, state.sender)
+            state.uploader = upload_history(state.uploader, state.history, state.wifi_ok)
+            for queue in (state.wa, state.tg):
+                if queue.pending():
+                    if not queue.pump():
+                        delay = NOTIFY_RETRY_DELAY * 1000
+                    await sleep_ms(0)  # let a due sample run between the two channels
+            confirm_alerts(state.outbox, state.wa, state.tg)
+        await sleep_ms(delay)
+
+async def mqtt_task(state):
+    """Service the MQTT connection (non-blocking: connects, acks, pings, resends)."""
+    while True:
+        if state.wifi_ok:
+            state.telemetry.client.poll()
+            if state.mq.pending() and state.telemetry.client.connected():
+                state.mq.pump()
+        await sleep_ms(MQTT_POLL_MS)
+
+async def wifi_task(state):
+    """Advance the WiFi connection in small steps; sampling never waits on the radio."""
+    state.wifi = net.wifi(SSID, PASSWORD)
+    while True:
+        state.wifi_ok = state.wifi.tick()
+        if state.wifi_ok and PROFILE.mark("wifi up"):
+            PROFILE.report()
+        if state.wifi_ok and state.uplink is None and state.outbox is None and GATEWAY_HOST is not None:
+            state.uplink = open_uplink()
+        await sleep_ms(WIFI_POLL_MS)
+
+async def async_main(max_cycles=None):
+    """
+    Cooperative version of main(): sampling, LED, notifications and WiFi upkeep
+    run as separate tasks. Returns the MonitorState once max_cycles samples are
+    taken (runs forever when max_cycles is None).
+    """
+    print("Starting system (async)...")
+    led = LEDController(LED_PIN)
+    dht_sensor = DHT22Sensor(DHT_PIN)
+    soil = SoilMoisture(SOIL_ADC_PIN, dry=DRY_VALUE, wet=WET_VALUE)
+    tds = TDSSensor(TDS_ADC_PIN)
+    capture = start_capture(soil, tds)
+    PROFILE.mark("hardware")
+    wa = NotificationQueue(WhatsAppNotifier(CALLMEBOT_PHONE, CALLMEBOT_APIKEY), NOTIFY_QUEUE_SIZE)
+    tg = NotificationQueue(TelegramNotifier(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID), NOTIFY_QUEUE_SIZE)
+
+    state = MonitorState(wa, tg)
+    background = [
+        asyncio.create_task(led_task(state, led)),
+        asyncio.create_task(notify_task(state)),
+        asyncio.create_task(wifi_task(state)),
+    ]
+    if state.telemetry:
+        background.append(asyncio.create_task(mqtt_task(state)))
+    print("Entering main loop. Press Ctrl-C to stop.")
+    try:
+        await sample_task(state, dht_sensor, soil, tds, max_cycles=max_cycles)
+    finally:
+        for task in background:
+            task.cancel()
+        led.off()
+        if state.flash_log:
+            state.flash_log.flush()
+        if state.outbox:
+            state.outbox.flush()
+            print("Outbox:", state.outbox.stats())
+        if state.uploader:
+            print("Upload:", state.uploader.stats())
+        if capture:
+            capture.stop()
+            print("Capture:", capture.stats())
+        print("Cycle jitter: mean {:.1f} ms, max {} ms, skipped {}".format(
+            state.jitter.mean_ms(), state.jitter.max_ms, state.jitter.skipped))
+        print("Notify queue WA:", wa.stats(), "TG:", tg.stats())
+        if state.wifi:
+            print("WiFi:", state.wifi.stats())
+        if state.telemetry:
+            print("MQTT:", state.telemetry.client.stats())
+    return state
+
+# ===== Dual-core main =====
+ALERT_MSG = 1              # kinds of the messages core 1 queues for core 0
+READING_MSG = 2
+STATS_MSG = 3
+READING_FMT = "<Iffff"     # time, temp, hum, soil, tds (NaN = missing)
+
+def _missing(value):
+    return float("nan") if value is None else value
+
+def sensor_core(queue, led, dht_sensor, soil, tds):
+    """Core 1: read the sensors, log, run the rules and queue alerts / readings for core 0."""
+    digest = AlertDigest(ALERT_WINDOW)
+    stats = StreamStats(HISTORY_CHANNELS)
+    rules = RuleSet(RULES, stats.names)
+    history = History(HISTORY_CHANNELS, HISTORY_SIZE)
+    flash_log = open_flash_log()
+    forward = GATEWAY_HOST is not None or MQTT_HOST is not None
+    reading = bytearray(struct.calcsize(READING_FMT))
+    period_ms = int(SAMPLE_INTERVAL * 1000)
+    deadline = ticks_ms()
+    cycle = 0
+    while True:
+        cycle += 1
+        print("\n--- Cycle", cycle, "(core 1) ---")
+        temp, hum = dht_sensor.read()
+        soil_pct, soil_raw = soil.read_percent()
+        tds_info = tds.read_tds(temperature_c=(temp if temp is not None else 25.0))
+        profile_boot(temp, False)      # "wifi up" is marked by core 0
+        now = int(time.time())
+        history.append(now, temp, hum, soil_pct, tds_info["tds"])
+        if flash_log:
+            flash_log.append(now, temp, hum, soil_pct, tds_info["tds"])
+        if forward:
+            struct.pack_into(READING_FMT, reading, 0, now, _missing(temp), _missing(hum), soil_pct, tds_info["tds"])
+            queue.put(READING_MSG, reading)
+        print_readings(temp, hum, soil_raw, soil_pct, tds_info, soil.spread)
+
+        alerting = check_alerts(rules, stats, temp, hum, soil_pct, tds_info["tds"], digest)
+        if MQTT_HOST is not None and stats_due(cycle):
+            queue.put(STATS_MSG, stats.pack(now))
+        # a full queue leaves the alerts in the digest for the next cycle
+        if digest.due() and queue.pending() < queue.slots:
+            queue.put(ALERT_MSG, digest.flush_into(MESSAGE))
+        if alerting:
+            led.blink(times=3, on_s=0.15, off_s=0.15)
+        else:
+            led.blink(times=1, on_s=0.05, off_s=0.05)
+
+        deadline = ticks_add(deadline, period_ms)
+        delay = ticks_diff(deadline, ticks_ms())
+        if delay > 0:
+            safe_sleep(delay / 1000)
+        else:
+            deadline = ticks_ms()      # overran: restart the schedule from now
+
+def network_core(queue, wa, tg):
+    """Core 0: WiFi, notifications, gateway and MQTT, fed by core 1 through `queue`."""
+    wifi = net.wifi(SSID, PASSWORD)
+    uplink = None
+    telemetry = open_mqtt()
+    mq = NotificationQueue(telemetry.alerts, NOTIFY_QUEUE_SIZE) if telemetry else None
+    buf = bytearray(queue.size)
+    mv = memoryview(buf)
+    while True:
+        wifi_ok = wifi.tick()
+        if wifi_ok and PROFILE.mark("wifi up"):
+            PROFILE.report()
+        if wifi_ok and uplink is None and GATEWAY_HOST is not None:
+            uplink = open_uplink()
+        n = queue.get_into(buf)
+        while n >= 0:
+            if queue.kind == ALERT_MSG:
+                msg = bytes(mv[:n])    # the one copy the notify queues keep
+                if GATEWAY_HOST is None:
+                    send_alert(msg, wa, tg)
+                if mq:
+                    mq.send(msg)
+            elif queue.kind == STATS_MSG:
+                if telemetry:
+                    telemetry.summary(mv[:n])
+            else:
+                ts, temp, hum, soil_pct, tds_ppm = struct.unpack_from(READING_FMT, buf)
+                temp = None if temp != temp else temp      # NaN -> None
+                hum = None if hum != hum else hum
+                if uplink and wifi_ok:
+                    uplink.reading(ts, temp, hum, soil_pct, tds_ppm)
+                    uplink.flush()
+                if telemetry:
+                    telemetry.reading(ts, temp, hum, soil_pct, tds_ppm)
+            n = queue.get_into(buf)
+        if wifi_ok:
+            wa.pump()
+            tg.pump()
+            if telemetry:
+                telemetry.client.poll()
+                mq.pump()
+        safe_sleep(WIFI_POLL_MS / 1000)
+
+def dual_main():
+    """
+    Sampling, rules and LED on core 1; WiFi and all notification I/O on core 0
+    (the Pico W radio is serviced on core 0). The timer capture is not used:
+    its scheduled handover would run on core 0 while core 1 reads the sums.
+    Neither is the outbox: core 1 already writes the flash log, and the
+    filesystem must not be used from both cores at once. Nor the batch
+    upload: the history lives on core 1.
+    """
+    from buni.dual_core import SlotQueue, start_sensor_core
+    print("Starting system (dual core)...")
+    led = LEDController(LED_PIN)
+    dht_sensor = DHT22Sensor(DHT_PIN)
+    soil = SoilMoisture(SOIL_ADC_PIN, dry=DRY_VALUE, wet=WET_VALUE)
+    tds = TDSSensor(TDS_ADC_PIN)
+    PROFILE.mark("hardware")
+    wa = NotificationQueue(WhatsAppNotifier(CALLMEBOT_PHONE, CALLMEBOT_APIKEY), NOTIFY_QUEUE_SIZE)
+    tg = NotificationQueue(TelegramNotifier(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID), NOTIFY_QUEUE_SIZE)
+    queue = SlotQueue()
+    start_sensor_core(sensor_core, queue, led, dht_sensor, soil, tds)
+    try:
+        network_core(queue, wa, tg)
+    except KeyboardInterrupt:
+        print("Stopping monitoring (user interrupt).")
+    finally:
+        print("Core queue:", queue.stats())
+        print("Notify queue WA:", wa.stats(), "TG:", tg.stats())
 
 if __name__ == "__main__":
-    main()
+    if USE_DUAL_CORE:
+        dual_main()
+    elif USE_ASYNC:
+        try:
+            asyncio.run(async_main())
+        except KeyboardInterrupt:
+            print("Stopping monitoring (user interrupt).")
+    else:
+        main()
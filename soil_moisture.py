@@ -17,6 +17,7 @@
 import machine
 from machine import Pin, ADC
 import time
+from buni.calibration import SoilTable
 
 # configuration
 ANALOG_PIN = 27          # GPIO27 for analog input (AO)
@@ -32,8 +33,16 @@ WET_THRESHOLD = 70       # Above this = wet warning
 SAMPLE_INTERVAL = 5      # Seconds between readings
 
 
-# Initialize analog pin (ADC)
-adc = ADC(Pin(ANALOG_PIN))
+# Analog pin (ADC), set up by setup() so importing this module claims no pin
+adc = None
+
+def setup():
+    """Initialize the analog pin (ADC)"""
+    global adc
+    adc = ADC(Pin(ANALOG_PIN))
+
+# Raw value -> percentage lookup table (built once from the calibration values)
+moisture_table = SoilTable(DRY_VALUE, WET_VALUE)
 
 def read_moisture_percentage():
     """
@@ -43,14 +52,9 @@ def read_moisture_percentage():
     analog_value = adc.read_u16()
     
     # Invert and map to percentage (lower value = more moisture)
-    if analog_value >= DRY_VALUE:
-        moisture = 0
-    elif analog_value <= WET_VALUE:
-        moisture = 100
-    else:
-        moisture = 100 - ((analog_value - WET_VALUE) * 100 / (DRY_VALUE - WET_VALUE))
+    moisture = moisture_table.percent(analog_value)
     
-    return int(moisture), analog_value
+    return moisture, analog_value
 
 def get_moisture_status(percentage):
     """Returns status message based on moisture level"""
@@ -117,8 +121,9 @@ def monitor_soil():
         print("\n\n Monitoring stopped by user")
 
 # ---------- RUN PROGRAM -----------
-# Uncomment the next line to calibrate the sensor first
-#calibrate_sensor()
-
-# Start monitoring
-monitor_soil()
\ No newline at end of file
+# Start monitoring (only when run, so the module can be imported or frozen)
+if __name__ == "__main__":
+    setup()
+    # Uncomment the next line to calibrate the sensor first
+    #calibrate_sensor()
+    monitor_soil()
\ No newline at end of file
@@ -3,11 +3,17 @@
     TEMPERATURE CONTROL SYSTEM:
     > Components:
         - Raspberry Pi Pico MCU
-        - DHT22 sensor, Relay and signal LED
+        - DHT22 sensor, Relay (on a PCF8574 I2C expander) and signal LED
     > Operation:
         - Monitor temperature against a set threshold
         - Activates relay and turns ON signal LED when temperature exceeds set threshold.
         - Deactivates relay and turns OFF signal LED when temperature normalizes
+          (falls TEMPERATURE_HYSTERESIS below the threshold, so the relay does
+          not chatter around it)
+        - The relay state lives in the expander driver's shadow register
+          (buni/pcf8574.py): one I2C write per change, read back now and
+          then, so a missed write is corrected instead of inverting the
+          cooling logic
     ---
     Author: Angaza Elimu - Buni Team
     Version: 1.0.025
@@ -17,9 +23,13 @@
 # ===== IMPORT ESSENTIALS =====
 import machine
 from time import sleep
-from machine import Pin
+from machine import Pin, I2C
 from PicoDHT22 import PicoDHT22
-from pcf8574 import *
+import time
+from buni.pcf8574 import PCF8574
+from buni.history import History
+from buni.dht_cache import DHTCache
+from buni.rules import RuleSet, ABOVE, WARNING
 
 # ===== CONFIGURATION =====
 # --- LED ---
@@ -29,22 +39,46 @@ OFF_STATE = 0          # led off state value
 
 # --- DHT22 ---
 DHT_PIN = 10                    # GPIO pin connected to DHT22 data pin
-RELAY_PIN = PCF8574_PIN.RELAY1_PIN  # Relay pin on PCF8574 expander
+# --- Relay (PCF8574 I/O expander) ---
+I2C_ID = 0                      # I2C0 on its default pins (GP8 SDA, GP9 SCL)
+EXPANDER_ADDRESS = 0x20         # PCF8574 address (A0..A2 low)
+RELAY_PIN = 0                   # Expander pin P0 = RELAY1
 TEMPERATURE_THRESHOLD = 30.0    # Temperature trigger point in °C
+TEMPERATURE_HYSTERESIS = 0.5    # Relay turns off below threshold - hysteresis
+MIN_ON_DELAY = 0                # Seconds above the threshold before the relay turns on
 READ_INTERVAL = 10.0             # Seconds between sensor readings
+HISTORY_SIZE = 360              # Readings kept in RAM (1 hour at 10 s)
 
 # ===== HARDWARE SETUP =====
-# Initialize LED on specified pin as output
-led = Pin(LED_PIN, Pin.OUT)
+# Set up by setup(), so importing this module claims no pins and no bus
+led = None
+dht_cache = None
+expander = None
 
-# Initialize DHT22 temperature sensor
-dht_sensor = PicoDHT22(Pin(DHT_PIN, Pin.IN, Pin.PULL_UP))
+def setup():
+    """
+    Initialize the LED, the DHT22 and the relay expander
+    """
+    global led, dht_cache, expander
+    # Initialize LED on specified pin as output
+    led = Pin(LED_PIN, Pin.OUT)
 
-# Initialize Relay 1 on PCF8574 I/O expander
-relay = PCF8574_PIN(RELAY_PIN, PCF8574_PIN.OUT)
+    # Initialize DHT22 temperature sensor
+    # All reads go through the cache: at most one measurement every 2 seconds
+    dht_cache = DHTCache(PicoDHT22(Pin(DHT_PIN, Pin.IN, Pin.PULL_UP)))
+
+    # Initialize the PCF8574 I/O expander; the relays are switched through its shadow register
+    expander = PCF8574(I2C(I2C_ID), EXPANDER_ADDRESS)
 
 # ===== VARIABLE INITIALIZATION =====
-current_relay_state = False  # Track whether relay is currently ON or OFF
+history = History(("temp", "hum"), HISTORY_SIZE)  # Recent readings for trend checks
+
+# Cooling rule (buni/rules.py); rebuild with make_rules() after changing the threshold
+def make_rules():
+    return RuleSet((("High temperature", "temp", ABOVE, TEMPERATURE_THRESHOLD,
+                     TEMPERATURE_HYSTERESIS, WARNING, MIN_ON_DELAY, "°C"),), ("temp",))
+
+rules = make_rules()
 
 # ===== FUNCTION DEFINITIONS =====
 
@@ -62,7 +96,7 @@ def read_temperature():
     Returns: temperature in °C or None if reading fails
     """
     try:
-        temperature, humidity = dht_sensor.read()
+        temperature, humidity = dht_cache.read()
 
         # Check if reading was successful
         if temperature is None:
@@ -81,31 +115,32 @@ def read_temperature():
 def control_relay_based_on_temperature(temperature):
     """
     Controls relay based on temperature reading
-    Turns relay ON if temperature > threshold, OFF if temperature < threshold
+    Turns relay ON if temperature > threshold, OFF once temperature < threshold - hysteresis
     """
-    global current_relay_state
-
-    if temperature > TEMPERATURE_THRESHOLD:
+    rules.evaluate((temperature,))
+    if rules.active[0]:
         # Temperature is ABOVE threshold - activate cooling
-        if not current_relay_state:
+        if not expander.value(RELAY_PIN):
             print(f"Temperature {temperature}°C > {TEMPERATURE_THRESHOLD}°C")
             print("ACTIVATING RELAY - Turning on cooling device")
-            relay.toggle()  # Turn relay ON
-            current_relay_state = True
+            expander.set(RELAY_PIN)  # Turn relay ON
 
             # toogle led ON
             blink_led(ON_STATE)
     else:
         # Temperature is BELOW threshold - deactivate cooling
-        if current_relay_state:
-            print(f"Temperature {temperature}°C ≤ {TEMPERATURE_THRESHOLD}°C")
+        if expander.value(RELAY_PIN):
+            print(f"Temperature {temperature}°C < {TEMPERATURE_THRESHOLD - TEMPERATURE_HYSTERESIS}°C")
             print("DEACTIVATING RELAY - Turning off cooling device")
-            relay.toggle()  # Turn relay OFF
-            current_relay_state = False
+            expander.clear(RELAY_PIN)  # Turn relay OFF
 
             # toogle led OFF
             blink_led(OFF_STATE)
 
+    # One I2C transaction at most: writes a change, or now and then reads back
+    if not expander.flush():
+        print("Relay expander not responding, retrying next reading")
+
 
 def display_status(temperature, humidity):
     """
@@ -121,11 +156,11 @@ def display_status(temperature, humidity):
         print(f"Temperature Threshold: {TEMPERATURE_THRESHOLD}°C")
 
         # Show relay status with appropriate icon
-        relay_status = "ON" if current_relay_state else "OFF"
+        relay_status = "ON" if expander.value(RELAY_PIN) else "OFF"
         print(f"Relay Status: {relay_status}")
 
         # Show current action needed
-        if temperature > TEMPERATURE_THRESHOLD:
+        if expander.value(RELAY_PIN):
             print("Action: Cooling required")
         else:
             print("Action: Temperature normal")
@@ -156,7 +191,8 @@ def main():
 
         # If reading successful, control relay and display status
         if temperature is not None:
-            humidity = round(dht_sensor.read()[1], 1)  # Get humidity for display
+            humidity = round(dht_cache.read()[1], 1)  # Cached from the same measurement
+            history.append(time.time(), temperature, humidity)
 
             # Control relay based on temperature
             control_relay_based_on_temperature(temperature)
@@ -164,6 +200,7 @@ def main():
             # Display current system status
             display_status(temperature, humidity)
         else:
+            history.append(time.time(), None, None)
             print("Retrying sensor reading...")
 
         # Wait before next reading
@@ -172,11 +209,10 @@ def main():
 # ===== PROGRAM EXECUTION =====
 if __name__ == "__main__":
     try:
-        # Start with relay OFF
+        # Start with relay OFF (the first flush writes all pins)
         print("Initializing system...")
-        if current_relay_state:  # Ensure relay starts in OFF position
-            relay.toggle()
-            current_relay_state = False
+        setup()
+        expander.clear(RELAY_PIN).flush()
         print("System initialized - Relay is OFF")
 
         main()
@@ -184,13 +220,13 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         print("\n\nProgram stopped by user")
         # Ensure relay is turned off when program exits
-        if current_relay_state:
-            relay.toggle()
+        if expander is not None and expander.value(RELAY_PIN):
+            expander.clear(RELAY_PIN).flush()
             print("Relay turned OFF for safety")
         print("Goodbye!")
 
     except Exception as e:
         print(f"\nUnexpected error: {e}")
         # Safety: Ensure relay is off on error
-        if current_relay_state:
-            relay.toggle()
+        if expander is not None and expander.value(RELAY_PIN):
+            expander.clear(RELAY_PIN).flush()
@@ -0,0 +1,32 @@
+"""
+Calibration tables (buni/calibration.py) against the float formulas they
+replace, over every raw ADC value, for several table shifts and vrefs.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO not in sys.path:
+    sys.path.insert(0, REPO)
+
+from buni.calibration import SHIFT, TDSTable, verify
+
+MAX_SOIL_ERROR = 1     # % (the float formula truncates, the table rounds within a step)
+MAX_TDS_ERROR = 2      # ppm (a table step is near 1 ppm at 4.5 V and SHIFT 4; 1 ppm at 3.3 V)
+
+@pytest.mark.parametrize("shift", (0, 2, SHIFT))
+@pytest.mark.parametrize("vref", (3.0, 3.3, 4.5))
+def test_tables_match_float_formulas(shift, vref):
+    soil_err, tds_err = verify(vref=vref, shift=shift)
+    assert soil_err <= MAX_SOIL_ERROR
+    assert tds_err <= MAX_TDS_ERROR
+
+def test_vref_too_high_for_the_table():
+    with pytest.raises(ValueError):
+        TDSTable(5.0)
+    TDSTable(4.5)
@@ -0,0 +1,65 @@
+"""
+Timer-driven ADC capture (buni/capture.py) on the simulator (sim/): two
+minutes of a monitor-like loop that blocks on prints, LED blinks, requests
+and TLS handshakes while the timer interrupt samples two ADCs.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO not in sys.path:
+    sys.path.insert(0, REPO)
+
+import sim
+
+SECONDS = 120
+CYCLE_S = 5
+
+def foreground(world, capture):
+    """A monitor-like loop: read, print, blink, send; every 3rd cycle opens a new TLS connection."""
+    cycle = 0
+    while world.clock.now < SECONDS:
+        cycle += 1
+        capture.read(1)
+        world.clock.advance(0.02 + world.random.random() * 0.03)   # printing to the console
+        for _ in range(3):
+            world.clock.sleep(0.15)                                # LED blink
+            world.clock.sleep(0.15)
+        world.clock.advance(world.http_latency)                    # notification request
+        if cycle % 3 == 0:
+            world.clock.advance(world.tls_handshake)
+        world.clock.sleep(CYCLE_S)
+
+def start(rate, size=None):
+    world = sim.install(seed=1)
+    from machine import ADC
+    from buni import capture            # imported after install: simulated ticks_us and schedule
+    return world, capture.Capture((ADC(27), ADC(29)), rate_hz=rate, size=size).start()
+
+@pytest.mark.parametrize("rate", (1000, 200, 50))
+def test_no_overruns_with_the_ring_sized_for_the_rate(rate):
+    world, cap = start(rate)
+    foreground(world, cap)
+    cap.stop()
+    stats = cap.stats()
+    assert stats["overruns"] == 0
+    assert stats["missed"] == 0
+    assert stats["samples"] >= rate * (SECONDS - 1)
+
+def test_small_ring_overruns_during_blocking_calls():
+    world, cap = start(1000, 512)
+    foreground(world, cap)
+    cap.stop()
+    assert cap.stats()["overruns"] > 0
+
+def test_rate_the_ring_cannot_hold_is_refused():
+    sim.install(seed=1)
+    from machine import ADC
+    from buni import capture
+    with pytest.raises(ValueError):
+        capture.Capture((ADC(27), ADC(29)), rate_hz=2000)
@@ -0,0 +1,142 @@
+"""
+Circuit breaker states and backoff (buni/circuit_breaker.py), on a stand-in
+clock and an HTTP client that answers from a script.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO not in sys.path:
+    sys.path.insert(0, REPO)
+
+from buni import circuit_breaker
+from buni.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitOpen, GuardedClient
+
+HOST = "api.telegram.org"
+MIN_MS = 1000
+MAX_MS = 8000
+JITTER = 0.25
+
+class FakeApi:
+    """Client with get / post; `answer` is a status code or an exception to raise."""
+    def __init__(self):
+        self.answer = 200
+        self.calls = 0
+
+    def get(self, host, path):
+        return self._reply()
+
+    def post(self, host, path, data, content_type=None, encoding=None):
+        return self._reply()
+
+    def _reply(self):
+        self.calls += 1
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0]
+    monkeypatch.setattr(circuit_breaker, "ticks_ms", lambda: now[0])
+    return now
+
+def guarded(api):
+    return GuardedClient(api, threshold=3, backoff_min_ms=MIN_MS, backoff_max_ms=MAX_MS, jitter=JITTER)
+
+def fail(client, api):
+    """One request that fails; True when it reached the API (not refused by the breaker)."""
+    before = api.calls
+    try:
+        client.get(HOST, "/")
+    except CircuitOpen:
+        return False
+    except OSError:
+        pass
+    return api.calls > before
+
+def test_opens_after_threshold_and_refuses_without_sending(clock):
+    api = FakeApi()
+    client = guarded(api)
+    breaker = client.breaker(HOST)
+    api.answer = 503
+    assert client.get(HOST, "/") == 503
+    assert client.get(HOST, "/") == 503
+    assert breaker.state == CLOSED
+    assert client.get(HOST, "/") == 503
+    assert breaker.state == OPEN and breaker.opens == 1
+    assert MIN_MS * (1 - JITTER) <= breaker.retry_at - clock[0] <= MIN_MS * (1 + JITTER)
+
+    calls = api.calls
+    for _ in range(5):
+        assert not client.available(HOST)
+        with pytest.raises(CircuitOpen):
+            client.post(HOST, "/", b"x")
+    assert api.calls == calls
+    assert breaker.refused == 5
+
+def test_half_open_trial_reopens_with_doubled_backoff_up_to_max(clock):
+    api = FakeApi()
+    client = guarded(api)
+    breaker = client.breaker(HOST)
+    api.answer = OSError(110, "ETIMEDOUT")
+    for _ in range(3):
+        assert fail(client, api)
+    assert breaker.state == OPEN and breaker.timeouts == 3
+
+    backoff = MIN_MS
+    for _ in range(8):
+        delay = breaker.retry_at - clock[0]
+        assert backoff * (1 - JITTER) <= delay <= backoff * (1 + JITTER)
+        clock[0] += delay - 1
+        assert not fail(client, api)           # still open a tick before retry_at
+        clock[0] += 1
+        assert client.available(HOST)
+        assert fail(client, api)               # the one half-open trial goes out ...
+        assert breaker.state == OPEN           # ... and its failure opens the circuit again
+        backoff = min(backoff * 2, MAX_MS)
+    assert breaker.backoff_ms == MAX_MS
+
+def test_half_open_success_closes_and_resets_backoff(clock):
+    api = FakeApi()
+    client = guarded(api)
+    breaker = client.breaker(HOST)
+    api.answer = 500
+    for _ in range(3):
+        fail(client, api)
+    clock[0] = breaker.retry_at
+    api.answer = 200
+    assert client.get(HOST, "/") == 200
+    assert breaker.state == CLOSED
+    assert breaker.backoff_ms == MIN_MS and breaker.streak == 0
+    # a single failure after closing does not open it again
+    api.answer = 503
+    client.get(HOST, "/")
+    assert breaker.state == CLOSED
+
+def test_half_open_allows_one_trial(clock):
+    api = FakeApi()
+    client = guarded(api)
+    breaker = client.breaker(HOST)
+    api.answer = 500
+    for _ in range(3):
+        fail(client, api)
+    clock[0] = breaker.retry_at
+    assert breaker.allow() and breaker.state == HALF_OPEN   # the trial is out
+    with pytest.raises(CircuitOpen):
+        client.get(HOST, "/")
+
+def test_hosts_have_separate_breakers(clock):
+    api = FakeApi()
+    client = guarded(api)
+    api.answer = 503
+    for _ in range(3):
+        client.get(HOST, "/")
+    api.answer = 200
+    assert client.get("other.example", "/") == 200
+    assert not client.available(HOST) and client.available("other.example")
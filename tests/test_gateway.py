@@ -0,0 +1,148 @@
+"""
+The fleet gateway fed reading frames, delta frames and outbox batches
+directly (no sockets), with an in-memory Store and a Fanout pointed at the
+local MessagingStub: stored rows, duplicate and lost counts, the rules that
+fire and the messages the stub receives.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO not in sys.path:
+    sys.path.insert(0, REPO)
+
+from buni import frames, outbox
+from buni.deadband import DeltaEncoder
+from gateway.fanout import Fanout, Telegram, WhatsApp
+from gateway.server import Gateway
+from gateway.store import Store
+from gateway.stub import MessagingStub
+
+T0 = 1700000000
+WINDOW = 300
+
+@pytest.fixture
+def stub():
+    stub = MessagingStub()
+    yield stub
+    stub.close()
+
+@pytest.fixture
+def gateway(stub):
+    fanout = Fanout((Telegram("TOKEN", "1"), WhatsApp("+254700000000", "KEY")),
+                    workers=1, tls=False, resolve=stub.resolve())
+    gateway = Gateway(Store(), fanout, alert_window=WINDOW)
+    yield gateway
+    fanout.close()
+    gateway.store.close()
+
+def reading_frames(node, readings):
+    """One datagram of reading frames: [(seq, ts, temp, hum, soil, tds), ...]."""
+    buf = bytearray(frames.READING_SIZE * len(readings))
+    offset = 0
+    for seq, ts, temp, hum, soil, tds in readings:
+        offset = frames.encode_reading(buf, offset, node, seq, ts, temp, hum, soil, tds)
+    return bytes(buf)
+
+def sent(gateway, stub):
+    """Messages the stub got, per host, after the due digests are sent."""
+    gateway.send_digests(T0 + 2 * WINDOW)
+    assert gateway.fanout.drain(10)
+    got = {}
+    for host, text in stub.messages:
+        got.setdefault(host.split(":")[0], []).append(text)
+    return got
+
+def test_reading_frames(gateway, stub):
+    gateway.ingest(reading_frames(1, [
+        (1, T0, 25.0, 60.0, 50, 400),
+        (2, T0 + 5, 35.5, 60.0, 50, 400),      # High temperature
+        (5, T0 + 20, 25.0, 60.0, 20, 400),     # frames 3 and 4 lost; Soil dry
+        (5, T0 + 20, 25.0, 60.0, 20, 400),     # repeated: not lost, not stored twice
+    ]))
+    gateway.flush()
+    assert gateway.frames == 4
+    assert gateway.lost == 2
+    assert gateway.store.readings(1) == [
+        (T0, 25.0, 60.0, 50.0, 400.0),
+        (T0 + 5, 35.5, 60.0, 50.0, 400.0),
+        (T0 + 20, 25.0, 60.0, 20.0, 400.0),
+    ]
+    assert gateway.store.duplicates == 1
+    assert [a[1] for a in gateway.store.alerts(1)] == ["High temperature", "Soil dry", "Soil dry"]
+
+    got = sent(gateway, stub)
+    assert sorted(got) == ["api.callmebot.com", "api.telegram.org"]
+    for texts in got.values():
+        assert len(texts) == 1
+        assert texts[0].startswith("Node 00000001: ")
+        assert "High temperature" in texts[0] and "Soil dry" in texts[0]
+
+def test_garbage_is_counted(gateway):
+    gateway.ingest(reading_frames(1, [(1, T0, 25.0, 60.0, 50, 400)]) + b"\x00" * 7)
+    assert gateway.frames == 1
+    assert gateway.bad == 1
+
+def test_delta_frames(gateway, stub):
+    encoder = DeltaEncoder(2, smoothing=1.0)
+    addr = ("10.0.0.2", 40000)
+    for i in range(12):
+        if i == 9:
+            encoder.force_keyframe()           # the node resyncs after the gap
+        n = encoder.update(T0 + 5 * i, 24.0 + i, 55.0, 45, 500 + 50 * i)
+        if i != 6:                             # the frame of reading 6 is lost
+            gateway.ingest(bytes(encoder.frame(n)), addr)
+    gateway.flush()
+    assert gateway.lost == 1
+    assert gateway.decoders[addr].skipped == 2  # deltas 7 and 8 wait for the keyframe
+    assert [r[0] for r in gateway.store.readings(2)] == [T0 + 5 * i for i in (0, 1, 2, 3, 4, 5, 9, 10, 11)]
+    assert gateway.store.readings(2)[-1] == (T0 + 55, 35.0, 55.0, 45.0, 1050.0)
+    assert [a[1] for a in gateway.store.alerts(2)] == ["High temperature", "High TDS"] * 3
+
+    got = sent(gateway, stub)
+    assert sorted(got) == ["api.callmebot.com", "api.telegram.org"]
+    for texts in got.values():
+        assert len(texts) == 1
+        assert texts[0].startswith("Node 00000002: ")
+        assert "High temperature" in texts[0] and "High TDS" in texts[0]
+
+def test_outbox_batches(gateway, stub, tmp_path):
+    box = outbox.Outbox(str(tmp_path), node=3)
+    box.put_reading(T0, 25.0, 60.0, 50, 400)
+    box.put_reading(T0 + 5, 25.0, 30.0, 50, 400)     # Low humidity
+    box.put(outbox.MESSAGE, b"Pump relay stuck", outbox.HIGH, T0 + 5)
+    batches = []
+
+    def send(batch, count):
+        batches.append(bytes(batch))
+        return gateway.outbox_batch(batches[-1])
+
+    assert box.drain(send) == 3
+    # the ack was lost: the node sends the same batch again
+    assert gateway.outbox_batch(batches[0]) == 3
+    gateway.flush()
+    assert gateway.keys.duplicates == 3
+    assert gateway.store.readings(3) == [(T0, 25.0, 60.0, 50.0, 400.0), (T0 + 5, 25.0, 30.0, 50.0, 400.0)]
+    assert [a[1] for a in gateway.store.alerts(3)] == ["Low humidity"]
+    assert gateway.messages == 1
+
+    got = sent(gateway, stub)
+    for texts in got.values():
+        assert texts[0] == "Node 00000003: Pump relay stuck"
+        assert texts[1].startswith("Node 00000003: ") and "Low humidity" in texts[1]
+    assert sorted(got) == ["api.callmebot.com", "api.telegram.org"]
+
+def test_outbox_batch_refused_while_store_is_behind(tmp_path):
+    gateway = Gateway(Store(), batch_rows=2)
+    box = outbox.Outbox(str(tmp_path), node=4)
+    for i in range(5):
+        box.put_reading(T0 + 5 * i, 25.0, 60.0, 50, 400)
+    assert box.drain(lambda batch, count: gateway.outbox_batch(bytes(batch))) == 2
+    assert box.stats()["refused"] == 1
+    gateway.flush()
+    assert gateway.store.count() == 2
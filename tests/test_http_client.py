@@ -0,0 +1,65 @@
+"""
+KeepAliveClient (buni/http_client.py) against the local messaging API stub:
+one connection per host while it stays open, a new one per request
+without keep-alive, and one reconnect when a reused socket is dead.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO not in sys.path:
+    sys.path.insert(0, REPO)
+
+from buni.http_client import KeepAliveClient, REQUEST_SIZE
+from gateway.stub import MessagingStub
+
+TELEGRAM = ("api.telegram.org", "/botTOKEN/sendMessage?chat_id=1&text=hi%20there")
+WHATSAPP = ("api.callmebot.com", "/whatsapp.php?phone=1&text=hi%20there&apikey=k")
+
+@pytest.fixture
+def stub():
+    stub = MessagingStub()
+    yield stub
+    stub.close()
+
+def send(client, count):
+    for i in range(count):
+        host, path = WHATSAPP if i % 2 else TELEGRAM
+        assert client.get(host, path) == 200
+
+def test_one_connection_per_host(stub):
+    client = KeepAliveClient(tls=False, resolve=stub.resolve())
+    send(client, 20)
+    assert client.connects == 2
+    assert client.requests == 20
+    assert bytes(client.body()).startswith(b"Message queued")
+    assert [text for _, text in stub.messages] == ["hi there"] * 20
+    assert {host.split(":")[0] for host, _ in stub.messages} == {TELEGRAM[0], WHATSAPP[0]}
+    client.close()
+
+def test_new_connection_without_keep_alive(stub):
+    client = KeepAliveClient(tls=False, keep_alive=False, resolve=stub.resolve())
+    send(client, 6)
+    assert client.connects == 6
+    assert client._conns == {}
+
+def test_dead_connection_is_reopened_once(stub):
+    client = KeepAliveClient(tls=False, resolve=stub.resolve())
+    send(client, 1)
+    client._conns[TELEGRAM[0]].close()     # dropped while idle
+    send(client, 1)
+    assert client.reconnects == 1
+    assert client.connects == 2
+    client.close()
+
+def test_request_longer_than_the_buffer(stub):
+    client = KeepAliveClient(tls=False, resolve=stub.resolve())
+    with pytest.raises(ValueError):
+        client.get(TELEGRAM[0], "/" + "x" * REQUEST_SIZE)
+    assert client.get(*TELEGRAM) == 200     # the builder is usable again
+    client.close()
@@ -0,0 +1,112 @@
+"""
+MQTT publisher (buni/mqtt.py) against the local broker stand-in
+(sim/broker.py): QoS 1 window and acknowledgements, resends and
+reconnects, and batched QoS 0 telemetry.
+
+    python -m pytest tests
+"""
+
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO not in sys.path:
+    sys.path.insert(0, REPO)
+
+from buni import frames, mqtt
+from buni.mqtt import BATCH_READINGS, MQTTChannel, MQTTClient, TelemetryPublisher
+from sim.broker import Broker
+
+TOPIC = "buni/0000abcd/alerts"
+
+@pytest.fixture
+def broker():
+    broker = Broker()
+    yield broker
+    broker.close()
+
+def until(client, condition, timeout=5.0):
+    """Poll the client until condition() holds; False on timeout."""
+    end = time.monotonic() + timeout
+    with redirect_stdout(io.StringIO()):
+        while not condition():
+            if time.monotonic() > end:
+                return False
+            client.poll()
+            time.sleep(0.001)
+    return True
+
+def connect(broker, **kwargs):
+    client = MQTTClient("test", "127.0.0.1", broker.port, **kwargs)
+    assert until(client, client.connected)
+    return client
+
+def test_qos1_window_and_acks(broker):
+    client = connect(broker)
+    for i in range(mqtt.INFLIGHT):
+        assert client.publish(TOPIC, "alert {}".format(i), 1)
+    assert not client.publish(TOPIC, "one too many", 1)   # window full
+    assert until(client, client.idle)
+    assert client.acked == mqtt.INFLIGHT
+    assert [(t, p, q) for _, t, p, q in broker.messages] == \
+        [(TOPIC, "alert {}".format(i).encode(), 1) for i in range(mqtt.INFLIGHT)]
+    assert client.publish(TOPIC, "room again", 1)
+    client.disconnect()
+
+def test_unacknowledged_publish_is_resent(broker, monkeypatch):
+    monkeypatch.setattr(mqtt, "RETRY_MS", 50)
+    broker.ack = False
+    client = connect(broker)
+    assert client.publish(TOPIC, "pump stuck", 1)
+    assert until(client, lambda: broker.duplicates >= 1)
+    assert client.pending() == 1
+    broker.ack = True
+    assert until(client, client.idle)
+    assert client.resent >= 1
+    assert {p for _, _, p, _ in broker.messages} == {b"pump stuck"}
+    client.disconnect()
+
+def test_missing_pingresp_reconnects_and_resends(broker, monkeypatch):
+    monkeypatch.setattr(mqtt, "BACKOFF_MIN_MS", 10)
+    broker.ping = False
+    broker.ack = False
+    client = connect(broker, keepalive=1)
+    assert client.publish(TOPIC, "kept", 1)
+    assert until(client, lambda: client.failures == 1)
+    broker.ping = broker.ack = True
+    assert until(client, lambda: client.connected() and client.idle())
+    assert client.connects == 2
+    assert broker.connects == 2
+    assert broker.duplicates >= 1
+    client.disconnect()
+
+def test_qos0_needs_a_connection(broker):
+    client = MQTTClient("test", "127.0.0.1", broker.port)
+    assert not client.publish(TOPIC, "nobody listening")
+    assert client.dropped == 1
+    assert not MQTTChannel(client, TOPIC).send("alert")
+    assert until(client, client.connected)
+    assert MQTTChannel(client, TOPIC).send("alert")
+    assert until(client, client.idle)
+    client.disconnect()
+
+def test_readings_go_out_in_batches(broker):
+    client = connect(broker)
+    telemetry = TelemetryPublisher(client, "buni/0000abcd", 0xABCD)
+    readings = [(1748736000 + 5 * i, 24.5, 55.0, 40.0, 620.0 + i) for i in range(BATCH_READINGS)]
+    for r in readings[:-1]:
+        telemetry.reading(*r)
+    assert client.published == 0
+    telemetry.reading(*readings[-1])
+    assert client.published == 1
+    assert until(client, lambda: broker.received == 1)
+    _, topic, payload, qos = broker.messages[0]
+    assert (topic, qos) == ("buni/0000abcd/readings", 0)
+    assert [(node, ts) + values for _, node, _, ts, values in frames.decode_all(payload)] == \
+        [(0xABCD,) + r for r in readings]
+    client.disconnect()
@@ -0,0 +1,92 @@
+"""
+The WhatsApp and Telegram notifiers of main.py and soil-moisture-monitor.py
+with the longest message a NotificationQueue lets through (two alerts merged
+up to MAX_MESSAGE_LEN), sent through KeepAliveClient to the simulated APIs.
+
+    python -m pytest tests
+"""
+
+import importlib.util
+import io
+import os
+import sys
+from contextlib import redirect_stdout
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO not in sys.path:
+    sys.path.insert(0, REPO)
+
+import sim
+
+# script, WhatsApp class, Telegram class
+SCRIPTS = (
+    ("soil-moisture-monitor.py", "WhatsAppNotifier", "TelegramNotifier"),
+    ("main.py", "WhatsApp", "Telegram"),
+)
+
+def load(filename):
+    """A device script as a module, loaded after sim.install() so it runs on the simulated board."""
+    spec = importlib.util.spec_from_file_location("script", os.path.join(REPO, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def longest_merged(limit):
+    """Two alerts that merge to exactly `limit` bytes, full of characters that need %XX."""
+    from buni.notify_queue import MERGE_SEPARATOR
+    half = (limit - len(MERGE_SEPARATOR)) // 2
+    first = ("ALERT: High temperature 31.5°C (12:00:00-12:05:00) & rising | " * 8).encode()[:half]
+    second = ("ALERT: Soil dry 25% #3 + TDS 900ppm " * 15).encode()[:limit - len(MERGE_SEPARATOR) - half]
+    return first, second
+
+@pytest.mark.parametrize("script, whatsapp, telegram", SCRIPTS)
+def test_longest_merged_message_is_sent_whole(script, whatsapp, telegram):
+    world = sim.install(seed=1)
+    world.http_fail_rate = 0.0
+    world.http_error_rate = 0.0
+    from network import WLAN
+    wlan = WLAN(0)
+    wlan.active(True)
+    wlan.connect("sim", "sim")
+    world.clock.advance(world.wifi_connect_time)
+    with redirect_stdout(io.StringIO()):
+        m = load(script)
+        from buni.notify_queue import MAX_MESSAGE_LEN, NotificationQueue
+        first, second = longest_merged(MAX_MESSAGE_LEN)
+        notifiers = (getattr(m, whatsapp)("+254700000000", "1234567"),
+                     getattr(m, telegram)("7930559839:AAHzL7RfL2jOMXbK510hS-ytrBZm4qhRfHk", "64854828"))
+        for notifier in notifiers:
+            queue = NotificationQueue(notifier, size=2)
+            queue.send(first)
+            queue.send(second)
+            queue.send(b"next")            # full: the two oldest are merged
+            assert queue.merged == 1
+            assert queue.pump() == 1       # the merged message
+
+    assert m.URL.truncated == 0
+    sent = world.requests[-2:]
+    assert [host for _, host, _ in sent] == [n.HOST for n in notifiers]
+    message = (first + b" | " + second).decode()
+    assert len(message.encode()) == MAX_MESSAGE_LEN
+    for (_, host, path), notifier in zip(sent, notifiers):
+        query = parse_qs(urlsplit(path).query, keep_blank_values=True)
+        assert query["text"] == [message]
+        if host == "api.callmebot.com":
+            assert query["apikey"] == ["1234567"]
+            assert query["phone"] == ["+254700000000"]
+        else:
+            assert query["chat_id"] == ["64854828"]
+
+@pytest.mark.parametrize("script, whatsapp, telegram", SCRIPTS)
+def test_message_too_long_for_the_url_is_not_sent(script, whatsapp, telegram):
+    world = sim.install(seed=1)
+    with redirect_stdout(io.StringIO()):
+        m = load(script)
+        for notifier in (getattr(m, whatsapp)("+254700000000", "1234567"),
+                         getattr(m, telegram)("7930559839:AAHzL7RfL2jOMXbK510hS-ytrBZm4qhRfHk", "64854828")):
+            assert notifier.send(b"%" * len(m.URL.buf)) is False
+    assert m.URL.truncated == 0
+    assert world.counters.get("http_requests", 0) == 0
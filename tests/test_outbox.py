@@ -0,0 +1,126 @@
+"""
+Outbox digests handed to the notification queues with drain(ack=False):
+they stay on flash until the notifier has sent them, so a reboot before
+pump() loses nothing; once confirmed they are gone for good.
+
+    python -m pytest tests
+"""
+
+import importlib.util
+import io
+import os
+import sys
+from contextlib import redirect_stdout
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO not in sys.path:
+    sys.path.insert(0, REPO)
+
+import sim
+
+SCRIPTS = ("main.py", "soil-moisture-monitor.py")
+
+class Notifier:
+    """Records what it sends; refuses everything while `up` is False."""
+    def __init__(self):
+        self.up = True
+        self.sent = []
+
+    def send(self, message):
+        if self.up:
+            self.sent.append(message)
+        return self.up
+
+def load(filename):
+    """A device script as a module, loaded after sim.install() so it runs on the simulated board."""
+    spec = importlib.util.spec_from_file_location("script", os.path.join(REPO, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def setup(script, path):
+    sim.install(seed=1)
+    with redirect_stdout(io.StringIO()):
+        m = load(script)
+    m.SEND_BOTH = True
+    m.GATEWAY_HOST = None
+    from buni.notify_queue import NotificationQueue
+    from buni.outbox import Outbox
+    wa, tg = Notifier(), Notifier()
+    queues = NotificationQueue(wa, 8), NotificationQueue(tg, 8)
+    return m, Outbox(str(path)), queues, (wa, tg)
+
+def confirm(m, outbox, queues):
+    if hasattr(m, "confirm_digests"):
+        m.confirm_digests(outbox, *queues)
+    else:
+        m.confirm_alerts(outbox, *queues)
+
+def drain(m, outbox, queues):
+    sender = m.outbox_sender(*queues)
+    return outbox.drain(sender, 4, ack=False)
+
+@pytest.mark.parametrize("script", SCRIPTS)
+def test_reboot_before_pump_keeps_the_digests(script, tmp_path):
+    from buni.outbox import HIGH, MESSAGE
+    m, outbox, queues, notifiers = setup(script, tmp_path)
+    for i in range(3):
+        assert outbox.put(MESSAGE, b"ALERT %d" % i, HIGH)
+    assert drain(m, outbox, queues) == 3
+    assert [q.pending() for q in queues] == [3, 3]
+
+    # power cut before the queues were pumped: a new outbox on the same flash
+    from buni.outbox import Outbox
+    outbox = Outbox(str(tmp_path))
+    from buni.notify_queue import NotificationQueue
+    queues = NotificationQueue(notifiers[0], 8), NotificationQueue(notifiers[1], 8)
+    assert drain(m, outbox, queues) == 3
+    queues[0].pump(3)
+    assert notifiers[0].sent == [b"ALERT 0", b"ALERT 1", b"ALERT 2"]
+
+@pytest.mark.parametrize("script", SCRIPTS)
+def test_only_delivered_digests_are_acknowledged(script, tmp_path):
+    from buni.outbox import HIGH, MESSAGE, Outbox
+    m, outbox, queues, (wa, tg) = setup(script, tmp_path)
+    for i in range(3):
+        outbox.put(MESSAGE, b"ALERT %d" % i, HIGH)
+    drain(m, outbox, queues)
+
+    # WhatsApp sends two, Telegram one: only the first is on both channels
+    queues[0].pump(2)
+    queues[1].pump(1)
+    confirm(m, outbox, queues)
+    assert outbox.stats()["in_flight"] == 2
+    assert Outbox(str(tmp_path)).drain(lambda batch, count: count) == 2
+
+    # a refused send is retried, not acknowledged
+    tg.up = False
+    queues[0].pump(1)
+    queues[1].pump(1)
+    confirm(m, outbox, queues)
+    assert outbox.stats()["in_flight"] == 2
+
+    tg.up = True
+    queues[1].pump(2)
+    confirm(m, outbox, queues)
+    assert outbox.stats()["in_flight"] == 0
+    assert outbox.backlog() == 0
+    assert wa.sent == tg.sent == [b"ALERT 0", b"ALERT 1", b"ALERT 2"]
+    assert Outbox(str(tmp_path)).drain(lambda batch, count: count) == 0
+
+@pytest.mark.parametrize("script", SCRIPTS)
+def test_full_queues_hold_the_rest_on_flash(script, tmp_path):
+    from buni.outbox import HIGH, MESSAGE
+    m, outbox, queues, notifiers = setup(script, tmp_path)
+    for i in range(10):
+        outbox.put(MESSAGE, b"ALERT %d" % i, HIGH)
+    assert drain(m, outbox, queues) == 8
+    assert outbox.stats()["refused"] == 1
+    for q in queues:
+        q.pump(8)
+    confirm(m, outbox, queues)
+    assert outbox.stats()["in_flight"] == 0
+    outbox.hold_until = outbox.backoff_ms = 0
+    assert drain(m, outbox, queues) == 2
@@ -0,0 +1,36 @@
+"""
+StreamStats.pack_into(): every value as a float32 at its own offset, NaN
+for a channel with no reading yet.
+
+    python -m pytest tests
+"""
+
+import math
+import os
+import struct
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO not in sys.path:
+    sys.path.insert(0, REPO)
+
+from buni.stats import StreamStats, FIELDS, RAW, MEAN
+
+def test_pack_writes_values_and_nan_for_unknown():
+    stats = StreamStats(("temp", "hum"))
+    stats.update((21.5, None), 0)
+    stats.update((22.5, None), 5)
+    frame = stats.pack(1234)
+    ts, *values = struct.unpack("<I" + "f" * len(stats.names), frame)
+    assert ts == 1234
+    assert len(frame) == 4 + 4 * len(stats.names)
+    assert values[RAW] == 22.5
+    assert values[MEAN] == 22.0
+    assert all(math.isnan(x) for x in values[len(FIELDS):])
+
+def test_pack_into_offset():
+    stats = StreamStats(("temp",))
+    stats.update((20.0,), 0)
+    buf = bytearray(3 + stats.size)
+    assert stats.pack_into(buf, 3) == 3 + stats.size
+    assert struct.unpack_from("<f", buf, 3)[0] == 20.0
@@ -0,0 +1,67 @@
+"""
+BatchUploader to the gateway's HTTP upload handler: readings from the time
+of the last upload on are sent, and the gateway keeps one row per node and
+time however often a reading arrives.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO not in sys.path:
+    sys.path.insert(0, REPO)
+
+from buni.history import History
+from buni.upload import BatchUploader
+from gateway.server import Gateway
+from gateway.store import Store
+
+NODE = 7
+
+class GatewayClient:
+    """post() straight into Gateway.http_request(); `lose` drops the next reply."""
+    def __init__(self, gateway):
+        self.gateway = gateway
+        self.lose = False
+
+    def post(self, host, path, body, content_type, encoding=None):
+        headers = {"content-encoding": encoding.decode()} if encoding else {}
+        status, _ = self.gateway.http_request("POST", path.decode(), headers, bytes(body))
+        if self.lose:
+            self.lose = False
+            raise OSError(110, "ETIMEDOUT")
+        return status
+
+def setup():
+    history = History(("temp", "hum", "soil", "tds"), 64)
+    gateway = Gateway(Store())
+    client = GatewayClient(gateway)
+    return history, gateway, client, BatchUploader(history, "gw", node=NODE, client=client)
+
+def test_reading_in_the_last_second_is_sent():
+    history, gateway, client, uploader = setup()
+    history.append(100, 20.0, 50.0, 40, 500)
+    history.append(105, 21.0, 51.0, 41, 510)
+    assert uploader.upload()
+    assert uploader.readings == 2
+    history.append(105, 21.5, 51.5, 42, 520)   # same second as the last one uploaded
+    history.append(110, 22.0, 52.0, 43, 530)
+    assert uploader.upload()
+    assert uploader.readings == 4                # the two uploaded already are not sent again
+    assert [r[0] for r in gateway.store.readings(NODE)] == [100, 105, 110]
+    assert gateway.store.duplicates == 1
+    assert uploader.upload() and uploader.batches == 2   # nothing new: no request
+
+def test_lost_reply_is_resent_and_ignored():
+    history, gateway, client, uploader = setup()
+    for t in range(0, 50, 5):
+        history.append(1000 + t, 20.0 + t, 50.0, 40, 500)
+    client.lose = True
+    assert not uploader.upload()
+    assert gateway.store.count() == 10
+    assert uploader.upload()
+    assert gateway.store.count() == 10
+    assert gateway.upload_replayed == 10
+    assert gateway.frames == 10
@@ -0,0 +1,64 @@
+"""
+WiFi connection manager (buni/wifi_manager.py) on the simulated radio
+(sim/): 6 h with failing connect attempts and three access point outages,
+ticked every 0.5 s like run() does.
+
+    python -m pytest tests
+"""
+
+import io
+import os
+import sys
+from contextlib import redirect_stdout
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO not in sys.path:
+    sys.path.insert(0, REPO)
+
+import sim
+
+OUTAGES = [(1800, 1920), (7200, 9000), (14400, 14405)]
+STEP_S = 0.5               # tick period, as in run()
+
+def test_reconnects_after_outages_within_backoff_bounds():
+    world = sim.install(seed=1)
+    world.wifi_fail_rate = 0.3
+    world.wifi_outages = list(OUTAGES)
+    from buni import wifi_manager       # imported after install: simulated ticks_ms and network
+    from buni.wifi_manager import BACKOFF, BACKOFF_MAX_MS, CONNECT_TIMEOUT_MS, JITTER
+
+    wifi = wifi_manager.WiFiManager("ssid", "password")
+    late = 0                            # ticks that took simulated time
+    backoffs = 0
+    reconnected = []                    # time the link was back after each outage
+    with redirect_stdout(io.StringIO()):
+        while world.clock.now < 6 * 3600:
+            t0 = world.clock.now
+            was_up = wifi.up()
+            backoff_ms = wifi.backoff_ms
+            state = wifi.state
+            up = wifi.tick()
+            if world.clock.now != t0:
+                late += 1
+            if wifi.state == BACKOFF and state != BACKOFF:
+                # the wait chosen is the backoff before doubling, within the jitter
+                delay = wifi_manager.ticks_diff(wifi.retry_at, wifi_manager.ticks_ms())
+                assert backoff_ms <= BACKOFF_MAX_MS
+                assert backoff_ms * (1 - JITTER) <= delay <= backoff_ms * (1 + JITTER)
+                backoffs += 1
+            if up and not was_up and wifi.connects > 1:
+                reconnected.append(world.clock.now)
+            world.clock.sleep(STEP_S)
+
+    assert backoffs > 0
+    assert late == 0
+    assert wifi.drops == len(OUTAGES)
+    assert len(reconnected) == len(OUTAGES)
+    # a reconnect after an outage takes at most a few attempts at the longest backoff
+    bound_s = 3 * (BACKOFF_MAX_MS * (1 + JITTER) + CONNECT_TIMEOUT_MS) / 1000
+    for back, (start, end) in zip(reconnected, OUTAGES):
+        assert end <= back <= end + bound_s
+    # recorded from the tick that saw the link go to the tick that saw it back
+    injected = sum(end - start for start, end in OUTAGES)
+    gaps = sum(back - end for back, (start, end) in zip(reconnected, OUTAGES))
+    assert abs(wifi.outage_ms_total / 1000 - injected - gaps) <= len(reconnected) * STEP_S